@@ -0,0 +1,89 @@
+"""
+Бенчмарк формирования файла обмена данными 1CClientBankExchange.
+
+Сравнивает прежний вывод секций конкатенацией строк (поиск поля в списке обязательных полей и `Decimal('.01')` на
+каждое значение) с текущим выводом по скомпилированному плану секции.
+
+Запуск из корня репозитория::
+
+    PYTHONPATH=. python benchmarks/bench_exchange.py
+"""
+import datetime
+import timeit
+from decimal import Decimal, ROUND_HALF_DOWN
+
+from modulbank import structs
+from modulbank.client import _build_exchange
+
+DOCUMENTS = 1000
+
+
+def legacy_format_value(value):
+    if isinstance(value, datetime.date):
+        return value.strftime('%d.%m.%Y')
+    if isinstance(value, datetime.time):
+        return value.strftime('%H:%M:%S')
+    if isinstance(value, Decimal):
+        return str(value.quantize(Decimal('.01'), rounding=ROUND_HALF_DOWN))
+    return value
+
+
+def legacy_section(section) -> str:
+    """
+    Вывод секции так, как это делало свойство `BaseSection.document` до оптимизации.
+    """
+    s = ""
+    for name in section._mandatory_fields:
+        value = section.__dict__[name]
+        if value is None:
+            value = ''
+        s += "{}={}\n".format(name, legacy_format_value(value))
+    for name in section._fields:
+        if name in section._mandatory_fields or section.__dict__[name] is None:
+            continue
+        s += "{}={}\n".format(name, legacy_format_value(section.__dict__[name]))
+    return s
+
+
+def legacy_document(exchange) -> str:
+    """
+    Вывод файла обмена так, как это делало свойство `ClientBankExchange.document` до оптимизации.
+    """
+    body = legacy_section(exchange.ОбщиеСведения)
+    body += legacy_section(exchange.УсловияОтбора)
+    body += legacy_section(exchange.СекцияОстатков)
+    for document in exchange.documents:
+        body += 'СекцияДокумент=Платежное поручение\n'
+        body += legacy_section(document)
+        body += 'КонецДокумента\n'
+    return "1CClientBankExchange\n{body}КонецФайла".format(body=body)
+
+
+def make_exchange():
+    bank = structs.BankShort(account='40802810670010011008', name='МОСКОВСКИЙ ФИЛИАЛ АО КБ "МОДУЛЬБАНК"',
+                             bic='044525092', corr_acc='30101810645250000092')
+    payer = structs.Contractor(name='ИП Александров Александр Александрович', inn='770400372208', bank=bank)
+    recipient = structs.Contractor(name='ООО "Ромашка"', inn='2204000595', kpp='771543001', bank=bank)
+    orders = [structs.PaymentOrder(doc_num=str(i), account_num=bank.account, amount=Decimal('1234.565') + i,
+                                   purpose='Заработная плата за сентябрь', payer=payer, recipient=recipient)
+              for i in range(DOCUMENTS)]
+    return _build_exchange(list(enumerate(orders)))
+
+
+def bench(name: str, func, exchange) -> float:
+    seconds = min(timeit.repeat(lambda: func(exchange), number=1, repeat=5))
+    print('{name:<28} {ms:8.2f} мс/файл {us:8.2f} мкс/документ'.format(
+        name=name, ms=seconds * 1e3, us=seconds / DOCUMENTS * 1e6))
+    return seconds
+
+
+def main():
+    exchange = make_exchange()
+    assert legacy_document(exchange) == exchange.document
+    legacy = bench('прежний вывод', legacy_document, exchange)
+    current = bench('скомпилированный план', lambda x: x.document, exchange)
+    print('ускорение: x{:.1f}'.format(legacy / current))
+
+
+if __name__ == '__main__':
+    main()
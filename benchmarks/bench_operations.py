@@ -0,0 +1,87 @@
+"""
+Бенчмарк разбора операций по счёту.
+
+Сравнивает прежний способ разбора полей :class:`modulbank.structs.Operation` (часовой пояс на каждую запись,
+`strptime` и `Enum[...]`) с текущим.
+
+Запуск из корня репозитория::
+
+    PYTHONPATH=. python benchmarks/bench_operations.py
+"""
+import datetime
+import json
+import timeit
+from decimal import Decimal
+
+import pytz
+
+from modulbank import structs
+
+RECORDS = 20000
+
+
+def legacy_fields(obj: dict) -> tuple:
+    """
+    Разбор полей операции так, как это делал конструктор :class:`Operation` до оптимизации.
+    """
+    status = structs.OperationStatus[obj.get('status')]
+    category = structs.OperationCategory[obj.get('category')]
+    currency = structs.Currency[obj.get('currency')]
+    amount = Decimal(obj.get('amount'))
+    moscow_tz = pytz.timezone('Europe/Moscow')
+    executed = obj.get('executed') and moscow_tz.localize(
+        datetime.datetime.strptime(obj.get('executed'), '%Y-%m-%dT%H:%M:%S')) or None
+    try:
+        created = obj.get('created') and moscow_tz.localize(
+            datetime.datetime.strptime(obj.get('created'), '%Y-%m-%dT%H:%M:%S')) or None
+    except ValueError:
+        created = obj.get('created') and moscow_tz.localize(
+            datetime.datetime.strptime(obj.get('created'), '%Y-%m-%dT%H:%M:%S.%f')) or None
+    return status, category, currency, amount, executed, created
+
+
+def current_fields(obj: dict) -> tuple:
+    """
+    Разбор тех же полей текущими средствами модуля :mod:`modulbank.structs`.
+    """
+    status = structs._OPERATION_STATUSES.get(obj.get('status'))
+    category = structs._OPERATION_CATEGORIES.get(obj.get('category'))
+    currency = structs._CURRENCIES.get(obj.get('currency'))
+    amount = Decimal(obj.get('amount'))
+    executed = obj.get('executed') and structs._localize(structs._parse_moment(obj.get('executed'), False)) or None
+    created = obj.get('created') and structs._localize(structs._parse_moment(obj.get('created'))) or None
+    return status, category, currency, amount, executed, created
+
+
+def make_records() -> list:
+    with open('tests/data/operations.json') as f:
+        sample = json.load(f)
+    records = []
+    start = datetime.datetime(2016, 1, 1)
+    for i in range(RECORDS):
+        obj = dict(sample[i % len(sample)])
+        moment = start + datetime.timedelta(minutes=37 * i)
+        obj['executed'] = moment.strftime('%Y-%m-%dT%H:%M:%S')
+        obj['created'] = moment.strftime('%Y-%m-%dT%H:%M:%S.%f') if i % 2 else obj['executed']
+        records.append(obj)
+    return records
+
+
+def bench(name: str, func, records: list) -> float:
+    seconds = min(timeit.repeat(lambda: [func(x) for x in records], number=1, repeat=5))
+    print('{name:<28} {us:8.2f} мкс/запись {rate:10.0f} записей/с'.format(
+        name=name, us=seconds / len(records) * 1e6, rate=len(records) / seconds))
+    return seconds
+
+
+def main():
+    records = make_records()
+    assert [legacy_fields(x) for x in records] == [current_fields(x) for x in records]
+    legacy = bench('поля: прежний разбор', legacy_fields, records)
+    current = bench('поля: текущий разбор', current_fields, records)
+    print('ускорение разбора полей: x{:.1f}'.format(legacy / current))
+    bench('Operation(obj) целиком', structs.Operation, records)
+
+
+if __name__ == '__main__':
+    main()
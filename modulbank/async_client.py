@@ -0,0 +1,283 @@
+import asyncio
+import logging
+from decimal import Decimal
+
+import aiohttp
+
+from . import exceptions
+from .client import ModulbankClient, PaymentBatchResponse, PaymentResponse, SearchOptions, _build_exchange, \
+    _check_status, _chunk_orders, _decode_balance, _fill_client_bank_exchange, _match_errors, _patch_paging
+from .client_bank_exchange import ClientBankExchange
+from .decoders import json_decoder
+from .structs import Company, LazyOperation, Operation, PaymentOrder
+from .throttling import RetryPolicy, TokenBucket
+
+log = logging.getLogger(__name__)
+
+
+class AsyncModulbankClient:
+    """
+    Асинхронный (asyncio) клиент МодульБанка.
+
+    Повторяет интерфейс :class:`ModulbankClient`: методы те же, но являются сопрограммами. Запросы выполняются через
+    одну сессию `aiohttp` с пулом соединений, поэтому на одном цикле событий можно одновременно выполнять тысячи
+    запросов.
+    """
+    _api_url = ModulbankClient._api_url
+
+    def __init__(self, token: str, sandbox_mode: bool = False, page_size: int = 50,
+                 session: aiohttp.ClientSession = None, pool_size: int = 100, keep_alive: bool = True,
+                 timeout: float = 30, api_url: str = None, lazy: bool = False, decoder=None, rate_limit=None,
+                 retry: RetryPolicy = None):
+        """
+        Конструктор
+
+        Собственная сессия клиента создаётся при первом запросе внутри работающего цикла событий. Её следует
+        закрывать сопрограммой :meth:`close` либо использовать клиент как асинхронный контекстный менеджер.
+
+        :param str token: Токен из Личного Кабинета пользователя МодульБанка.
+        :param bool sandbox_mode: Нужен ли `режим песочницы`
+        :param int page_size: Размер страницы операций, в штуках. От 0 до 50.
+        :param aiohttp.ClientSession session: (опционально) Внешняя сессия. Клиент не закрывает переданную сессию
+        :param int pool_size: Размер пула соединений собственной сессии клиента
+        :param bool keep_alive: Держать ли соединения открытыми между запросами
+        :param float timeout: Таймаут запроса в секундах
+        :param str api_url: (опционально) Адрес API, например, адрес локального тестового сервера
+        :param bool lazy: Возвращать ли операции с отложенным разбором полей (:class:`LazyOperation`)
+        :param decoder: (опционально) Функция разбора JSON-тела ответа (bytes), например,
+            :func:`modulbank.decoders.orjson_decoder`. По умолчанию :func:`modulbank.decoders.json_decoder`
+        :param rate_limit: (опционально) Допустимое количество запросов в секунду, либо
+            :class:`modulbank.throttling.TokenBucket`, разделяемый клиентами одного токена
+        :param RetryPolicy retry: (опционально) Правила повтора запросов. По умолчанию запросы не повторяются
+        :raises ValueError: Если размер страницы превышает 50 операций
+        """
+        self.__token = token
+        self.__sandbox_mode = sandbox_mode
+        self.__headers = {'Authorization': 'Bearer ' + self.__token}
+        if self.__sandbox_mode:
+            self.__headers['sandbox'] = 'on'
+        if page_size > 50:
+            raise ValueError('page_size превышает допустимый предел в 50: %d' % page_size)
+        self.__page_size = page_size
+        self.__operation_class = lazy and LazyOperation or Operation
+        self.__decoder = decoder or json_decoder
+        self.__pool_size = pool_size
+        self.__keep_alive = keep_alive
+        self.__timeout = aiohttp.ClientTimeout(total=timeout)
+        self.__api_url = api_url or self._api_url
+        self.__own_session = session is None
+        self.__session = session
+        if rate_limit is not None and not isinstance(rate_limit, TokenBucket):
+            rate_limit = TokenBucket(rate_limit)
+        self.__limiter = rate_limit
+        self.__retry = retry
+
+    def __str__(self):
+        return "<AsyncModulbankClient token='…' sandbox_mode='{sandbox_mode}' page_size={page_size}>".format(
+            sandbox_mode=self.__sandbox_mode, page_size=self.__page_size)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Закрытие соединений собственной сессии клиента.
+
+        Внешняя сессия, переданная в конструктор, не закрывается.
+
+        :return: None
+        :rtype: None
+        """
+        if self.__own_session and self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    @property
+    def token(self) -> str:
+        """
+        Токен API
+
+        :return: Токен API
+        :rtype: str
+        """
+        return self.__token
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Сессия, через которую выполняются запросы к API
+
+        :return: Сессия `aiohttp`, либо None, если ещё не было запросов
+        :rtype: aiohttp.ClientSession
+        """
+        return self.__session
+
+    async def __post(self, method: str, payload: dict, idempotent: bool = True) -> bytes:
+        """
+        Выполнение запроса к методу API и проверка статуса ответа.
+
+        Перед запросом выдерживается ограничение частоты, а отклонённый запрос повторяется по правилам `retry`.
+
+        :param str method: Метод API относительно базового адреса
+        :param dict payload: Тело запроса
+        :param bool idempotent: Безопасен ли повтор запроса, дошедшего до сервера
+        :return: Тело ответа сервера
+        :rtype: bytes
+        :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+        :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+        """
+        if self.__session is None:
+            connector = aiohttp.TCPConnector(limit=self.__pool_size, force_close=not self.__keep_alive)
+            self.__session = aiohttp.ClientSession(connector=connector, timeout=self.__timeout)
+        attempt = 0
+        while True:
+            if self.__limiter is not None:
+                delay = self.__limiter.reserve()
+                if delay:
+                    await asyncio.sleep(delay)
+            try:
+                async with self.__session.post(self.__api_url + method, json=payload, headers=self.__headers) as r:
+                    if r.status == 200:
+                        return await r.read()
+                    status = r.status
+                    retry_after = r.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = self.__retry and self.__retry.retry_delay(
+                    attempt, sent=not isinstance(e, aiohttp.ClientConnectorError), idempotent=idempotent)
+                if delay is None:
+                    raise
+                log.debug('Retrying %s in %.2fs after %r', method, delay, e)
+            else:
+                delay = self.__retry and self.__retry.retry_delay(attempt, status, retry_after, idempotent=idempotent)
+                if delay is None:
+                    _check_status(status)
+                log.debug('Retrying %s in %.2fs after status %d', method, delay, status)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def accounts(self) -> list:
+        """
+        Получение информации о компаниях пользователя
+
+        Метод в API: https://api.modulbank.ru/v1/account-info
+
+        :return: Массив компаний, представленных структурой :class:`Company`
+        :rtype: list(Company)
+        :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+        :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+        :raises UnexpectedResponseBodyModulbankException: Если не удалось обработать полученные данные.
+        """
+        content = await self.__post('account-info', {})
+        try:
+            res = [Company(x) for x in self.__decoder(content)]
+        except ValueError:
+            raise exceptions.UnexpectedResponseBodyModulbankException(content.decode('utf-8', 'replace'))
+        return res
+
+    async def balance(self, account_id: str) -> Decimal:
+        """
+        Получение баланса по счёту
+
+        Метод в API: https://api.modulbank.ru/v1/account-info/balance/<account_id>
+
+        :param str account_id: Системный идентификатор счёта
+        :return: Сумма остатка денежных средств на счёте
+        :rtype: Decimal
+        :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+        :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+        :raises UnexpectedValueModulbankException: Если не удалось конвертировать полученное значение.
+        """
+        content = await self.__post('account-info/balance/{id}'.format(id=account_id), {})
+        return _decode_balance(self.__decoder, content)
+
+    async def operations(self, account_id: str, search: SearchOptions = None) -> list:
+        """
+        Просмотр истории операций
+
+        Метод в API: https://api.modulbank.ru/v1/operation-history/<account_id>
+
+        :param str account_id: Системный идентификатор счёта
+        :param SearchOptions search: Опциональные параметры поиска операций
+        :return: Массив операций, представленных структурой :class:`Operation` (:class:`LazyOperation` при `lazy`)
+        :rtype: list(Operation)
+        :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+        :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+        :raises UnexpectedResponseBodyModulbankException: Если не удалось обработать полученные данные.
+        """
+        if search is None:
+            search = SearchOptions()
+        criteria = _patch_paging(search.to_dict(), self.__page_size)
+        content = await self.__post('operation-history/{id}'.format(id=account_id), criteria)
+        try:
+            res = [self.__operation_class(x) for x in self.__decoder(content)]
+        except ValueError:
+            raise exceptions.UnexpectedResponseBodyModulbankException(content.decode('utf-8', 'replace'))
+        return res
+
+    async def create_payment_draft(self, order: PaymentOrder) -> PaymentResponse:
+        """
+        Создание черновика платёжки.
+
+        Все создаваемые через API платежные поручения имеют статус "Черновик". Подписание поручений возможно только
+        внутри личного кабинета.
+
+        Метод в API: https://api.modulbank.ru/v1/operation-upload/1c
+
+        :param PaymentOrder order: Объект платёжного поручения
+        :return: Ответ API МодульБанка, содержащий количество загруженных платёжных поручений и ошибки по незагруженным платёжным поручениям при их наличии
+        :rtype: PaymentResponse
+        :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+        :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+        :raises UnexpectedResponseBodyModulbankException: Если не удалось обработать полученные данные.
+        """
+        exchange = ClientBankExchange()
+        _fill_client_bank_exchange(order, exchange)
+        document = exchange.document
+        content = await self.__post('operation-upload/1c', {"document": document}, idempotent=False)
+        try:
+            res = PaymentResponse(self.__decoder(content), document=document)
+        except ValueError:
+            raise exceptions.UnexpectedResponseBodyModulbankException(content.decode('utf-8', 'replace'))
+        return res
+
+    async def create_payment_drafts(self, orders, chunk_size: int = 100) -> PaymentBatchResponse:
+        """
+        Пакетное создание черновиков платёжек.
+
+        Поручения загружаются файлами 1CClientBankExchange, в каждом из которых до `chunk_size` секций документов с
+        одного расчётного счёта. Ошибки из ответов API сопоставляются поручениям по номеру документа. Ошибка загрузки
+        файла не прерывает загрузку остальных: см. :meth:`ModulbankClient.create_payment_drafts`.
+
+        Метод в API: https://api.modulbank.ru/v1/operation-upload/1c
+
+        :param orders: Объекты платёжных поручений
+        :param int chunk_size: Максимальное количество платёжных поручений в одном файле
+        :return: Ответы API МодульБанка, ошибки, сопоставленные платёжным поручениям, и исключения по файлам
+        :rtype: PaymentBatchResponse
+        :raises ValueError: Если размер пачки меньше 1
+        """
+        orders = list(orders)
+        responses = []
+        order_errors = {}
+        unmatched_errors = []
+        chunk_errors = []
+        for chunk in _chunk_orders(orders, chunk_size):
+            document = _build_exchange(chunk).document
+            try:
+                content = await self.__post('operation-upload/1c', {"document": document}, idempotent=False)
+                try:
+                    res = PaymentResponse(self.__decoder(content), document=document)
+                except ValueError:
+                    raise exceptions.UnexpectedResponseBodyModulbankException(content.decode('utf-8', 'replace'))
+            except (exceptions.ModulbankException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log.warning('Upload of %d payment orders failed: %r', len(chunk), e)
+                chunk_errors.append(([index for index, _ in chunk], e))
+                continue
+            responses.append(res)
+            matched, unmatched = _match_errors(res.errors, chunk)
+            order_errors.update(matched)
+            unmatched_errors.extend(unmatched)
+        return PaymentBatchResponse(len(orders), responses, order_errors, unmatched_errors, chunk_errors)
@@ -0,0 +1,209 @@
+import datetime
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import ModulbankClient, SearchOptions
+from .storage import OperationStore
+
+log = logging.getLogger(__name__)
+
+_PERIODS = ('day', 'week', 'month')
+
+
+def plan_shards(date_from: datetime.date, date_till: datetime.date, period: str = 'month') -> list:
+    """
+    Разбиение периода на календарные отрезки.
+
+    Отрезки не пересекаются, выровнены по границам дней, недель (с понедельника) или месяцев и обрезаны по краям
+    периода.
+
+    :param datetime.date date_from: Начало периода (включительно)
+    :param datetime.date date_till: Конец периода (включительно)
+    :param str period: Длина отрезка: `day`, `week` или `month`
+    :return: Пары (начало, конец) отрезков, включительно, в хронологическом порядке
+    :rtype: list(tuple(datetime.date, datetime.date))
+    :raises ValueError: Если длина отрезка неизвестна
+    """
+    if period not in _PERIODS:
+        raise ValueError('Неизвестная длина отрезка: %s' % period)
+    res = []
+    start = date_from
+    while start <= date_till:
+        if period == 'day':
+            end = start
+        elif period == 'week':
+            end = start + datetime.timedelta(days=6 - start.weekday())
+        else:
+            following = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+            end = following - datetime.timedelta(days=1)
+        end = min(end, date_till)
+        res.append((start, end))
+        start = end + datetime.timedelta(days=1)
+    return res
+
+
+class ShardStore:
+    """
+    Хранилище загруженных отрезков истории в SQLite, по которому прерванная загрузка продолжается с места остановки.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        """
+        Конструктор
+
+        :param str path: Путь к файлу базы SQLite, например, тот же, что у :class:`OperationStore`. По умолчанию база
+            в памяти
+        """
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(path, check_same_thread=False)
+        with self.__conn:
+            self.__conn.execute('CREATE TABLE IF NOT EXISTS backfill_shards ('
+                                'account_id TEXT NOT NULL, date_from TEXT NOT NULL, date_till TEXT NOT NULL, '
+                                'operations INTEGER NOT NULL, PRIMARY KEY (account_id, date_from, date_till))')
+
+    def __str__(self):
+        return "<ShardStore path='{path}'>".format(path=self.__path)
+
+    def close(self) -> None:
+        """
+        Закрытие базы.
+
+        :return: None
+        :rtype: None
+        """
+        self.__conn.close()
+
+    def done(self, account_id: str) -> set:
+        """
+        Загруженные отрезки счёта
+
+        :param str account_id: Системный идентификатор счёта
+        :return: Пары (начало, конец) загруженных отрезков
+        :rtype: set(tuple(datetime.date, datetime.date))
+        """
+        with self.__lock:
+            rows = self.__conn.execute('SELECT date_from, date_till FROM backfill_shards WHERE account_id = ?',
+                                       (account_id,)).fetchall()
+        return {tuple(datetime.datetime.strptime(x, '%Y-%m-%d').date() for x in row) for row in rows}
+
+    def mark(self, account_id: str, shard: tuple, operations: int) -> None:
+        """
+        Отметка отрезка загруженным.
+
+        :param str account_id: Системный идентификатор счёта
+        :param tuple shard: Пара (начало, конец) отрезка
+        :param int operations: Количество операций отрезка
+        :return: None
+        :rtype: None
+        """
+        with self.__lock, self.__conn:
+            self.__conn.execute('INSERT OR REPLACE INTO backfill_shards (account_id, date_from, date_till, operations) '
+                                'VALUES (?, ?, ?, ?)', (account_id, shard[0].strftime('%Y-%m-%d'),
+                                                        shard[1].strftime('%Y-%m-%d'), operations))
+
+
+class Backfill:
+    """
+    Параллельная загрузка истории операций за большой период.
+
+    Период каждого счёта разбивается на отрезки (:func:`plan_shards`), которые загружаются одновременно, каждый со
+    своей постраничной выборкой, поэтому глубокие смещения `skip` не нужны. Операции сохраняются в
+    :class:`OperationStore`, который убирает повторы по `operation_id` и выдаёт операции по дате проведения.
+    Загруженный отрезок отмечается в :class:`ShardStore` только после сохранения его операций, поэтому после сбоя
+    повторный запуск загружает только оставшиеся отрезки.
+    """
+
+    def __init__(self, client: ModulbankClient, store: OperationStore, shards: ShardStore, period: str = 'month',
+                 workers: int = 4):
+        """
+        Конструктор
+
+        :param ModulbankClient client: Клиент МодульБанка
+        :param OperationStore store: Хранилище операций
+        :param ShardStore shards: Хранилище загруженных отрезков
+        :param str period: Длина отрезка: `day`, `week` или `month`
+        :param int workers: Количество одновременно загружаемых отрезков
+        :raises ValueError: Если длина отрезка неизвестна или количество потоков меньше 1
+        """
+        if period not in _PERIODS:
+            raise ValueError('Неизвестная длина отрезка: %s' % period)
+        if workers < 1:
+            raise ValueError('workers должен быть не меньше 1: %d' % workers)
+        self.__client = client
+        self.__store = store
+        self.__shards = shards
+        self.__period = period
+        self.__workers = workers
+
+    def __str__(self):
+        return "<Backfill period='{period}' workers={workers}>".format(period=self.__period, workers=self.__workers)
+
+    def pending(self, account_ids, date_from: datetime.date, date_till: datetime.date) -> list:
+        """
+        Ещё не загруженные отрезки
+
+        :param account_ids: Системные идентификаторы счетов
+        :param datetime.date date_from: Начало периода (включительно)
+        :param datetime.date date_till: Конец периода (включительно)
+        :return: Пары (идентификатор счёта, отрезок)
+        :rtype: list(tuple(str, tuple(datetime.date, datetime.date)))
+        """
+        plan = plan_shards(date_from, date_till, self.__period)
+        res = []
+        for account_id in account_ids:
+            done = self.__shards.done(account_id)
+            res.extend((account_id, shard) for shard in plan if shard not in done)
+        return res
+
+    def run(self, account_ids, date_from: datetime.date, date_till: datetime.date) -> int:
+        """
+        Загрузка ещё не загруженных отрезков истории операций.
+
+        Ошибка загрузки отрезка не прерывает загрузку остальных: после завершения всех отрезков выбрасывается первая
+        из ошибок, а при повторном запуске загружаются только незагруженные отрезки.
+
+        Метод в API: https://api.modulbank.ru/v1/operation-history/<account_id>
+
+        :param account_ids: Системные идентификаторы счетов
+        :param datetime.date date_from: Начало периода (включительно)
+        :param datetime.date date_till: Конец периода (включительно)
+        :return: Количество загруженных за запуск операций (с учётом повторов на границах отрезков)
+        :rtype: int
+        :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+        :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+        :raises UnexpectedResponseBodyModulbankException: Если не удалось обработать полученные данные.
+        """
+        tasks = self.pending(account_ids, date_from, date_till)
+
+        def fetch(task):
+            account_id, shard = task
+            ops = list(self.__client.iter_operations(account_id, SearchOptions(date_from=shard[0],
+                                                                               date_till=shard[1])))
+            self.__store.save(ops, account_id)
+            self.__shards.mark(account_id, shard, len(ops))
+            return len(ops)
+
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            futures = [executor.submit(fetch, task) for task in tasks]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        total = sum(f.result() for f in futures if f.exception() is None)
+        log.debug('Backfilled %d operations in %d of %d shards', total, len(tasks) - len(errors), len(tasks))
+        if errors:
+            raise errors[0]
+        return total
+
+    def operations(self, account_id: str = None, date_from: datetime.date = None,
+                   date_till: datetime.date = None) -> list:
+        """
+        Загруженные операции без повторов, по дате проведения.
+
+        :param str account_id: (опционально) Системный идентификатор счёта
+        :param datetime.date date_from: (опционально) Дата проведения от (включительно)
+        :param datetime.date date_till: (опционально) Дата проведения до (включительно)
+        :return: Массив операций, представленных структурой :class:`Operation`
+        :rtype: list(Operation)
+        """
+        return self.__store.query(account_id=account_id, date_from=date_from, date_till=date_till)
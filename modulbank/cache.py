@@ -0,0 +1,158 @@
+import abc
+import threading
+import time
+from collections import OrderedDict
+
+# Время жизни записей кэша по умолчанию, в секундах, по методам API
+DEFAULT_TTL = {
+    'account-info': 60,
+    'balance': 10,
+}
+
+
+class BaseCache(abc.ABC):
+    """
+    Абстрактный базовый класс хранилища кэша ответов API.
+
+    Наследники реализуют :meth:`get`, :meth:`set`, :meth:`delete_prefix` и :meth:`clear`; учёт попаданий и промахов
+    выполняется в :meth:`lookup`.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    def __str__(self):
+        return '<{name} hits={hits} misses={misses}>'.format(name=self.__class__.__name__, hits=self.__hits,
+                                                             misses=self.__misses)
+
+    @property
+    def hits(self) -> int:
+        """
+        Количество попаданий в кэш
+
+        :return: Количество попаданий
+        :rtype: int
+        """
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """
+        Количество промахов кэша
+
+        :return: Количество промахов
+        :rtype: int
+        """
+        return self.__misses
+
+    def lookup(self, key: str):
+        """
+        Получение значения с учётом попаданий и промахов.
+
+        :param str key: Ключ
+        :return: Значение, либо None, если значения нет или оно устарело
+        """
+        value = self.get(key)
+        with self.__lock:
+            if value is None:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+        return value
+
+    @abc.abstractmethod
+    def get(self, key: str):
+        """
+        Получение значения.
+
+        :param str key: Ключ
+        :return: Значение, либо None, если значения нет или оно устарело
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, key: str, value, ttl: float) -> None:
+        """
+        Сохранение значения.
+
+        :param str key: Ключ
+        :param value: Значение (не None)
+        :param float ttl: Время жизни значения, в секундах
+        :return: None
+        :rtype: None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_prefix(self, prefix: str) -> None:
+        """
+        Удаление всех значений, ключи которых начинаются с `prefix`.
+
+        :param str prefix: Префикс ключей
+        :return: None
+        :rtype: None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """
+        Удаление всех значений.
+
+        :return: None
+        :rtype: None
+        """
+        raise NotImplementedError
+
+
+class MemoryCache(BaseCache):
+    """
+    Кэш в памяти процесса с вытеснением давно не использованных записей (LRU).
+    """
+
+    def __init__(self, max_size: int = 1024):
+        """
+        Конструктор
+
+        :param int max_size: Максимальное количество записей
+        :raises ValueError: Если максимальное количество записей меньше 1
+        """
+        BaseCache.__init__(self)
+        if max_size < 1:
+            raise ValueError('max_size должен быть не меньше 1: %d' % max_size)
+        self.__max_size = max_size
+        self.__items = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__items)
+
+    def get(self, key: str):
+        with self.__lock:
+            item = self.__items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.__items[key]
+                return None
+            self.__items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float) -> None:
+        with self.__lock:
+            self.__items[key] = (time.monotonic() + ttl, value)
+            self.__items.move_to_end(key)
+            while len(self.__items) > self.__max_size:
+                self.__items.popitem(last=False)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self.__lock:
+            for key in [k for k in self.__items if k.startswith(prefix)]:
+                del self.__items[key]
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__items.clear()
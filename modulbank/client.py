@@ -1,15 +1,28 @@
 import datetime
-from decimal import Decimal, InvalidOperation
+import hashlib
+import re
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 
-from .client_bank_exchange import ClientBankExchange
+from .cache import DEFAULT_TTL, BaseCache
+from .client_bank_exchange import ClientBankExchange, DocumentSection
 from . import exceptions
-from .structs import Company, Operation, OperationCategory, PaymentOrder
+from .decoders import iter_json_array, json_decoder
+from .structs import Company, LazyOperation, Operation, OperationCategory, PaymentOrder, _to_decimal
+from .throttling import RetryPolicy, TokenBucket
 
 log = logging.getLogger(__name__)
 
+# Размер куска тела ответа при потоковом разборе истории операций, в байтах
+_STREAM_CHUNK_SIZE = 16384
+
 
 class SearchOptions:
     """
@@ -111,8 +124,7 @@ class PaymentResponse:
         :param dict obj: JSON-объект ответа на импорт платежек в API МодульБанка.
         :param str document: Платёжное поручение в формате 1CClientBankExchange
         """
-        if 'totalLoaded' in obj:
-            self.__total_loaded = obj['totalLoaded']
+        self.__total_loaded = obj.get('totalLoaded', 0)
         if 'errors' in obj:
             self.__errors = obj['errors']
         else:
@@ -150,19 +162,144 @@ class PaymentResponse:
         return self.__document
 
 
+class PaymentBatchResponse:
+    """
+    Ответ на пакетный импорт платёжек: ответы API по каждому загруженному файлу, ошибки, сопоставленные платёжным
+    поручениям, и исключения по файлам, загрузка которых не удалась
+    """
+
+    def __init__(self, orders_count: int, responses: list, order_errors: dict, unmatched_errors: list,
+                 chunk_errors: list = None):
+        """
+        Конструктор
+
+        :param int orders_count: Количество платёжных поручений
+        :param list responses: Ответы API МодульБанка по каждому файлу, в порядке загрузки
+        :param dict order_errors: Ошибки по номерам поручений
+        :param list unmatched_errors: Ошибки, которые не удалось отнести к конкретному поручению
+        :param list chunk_errors: (опционально) Пары (номера поручений файла, исключение) по незагруженным файлам
+        """
+        self.__responses = responses
+        self.__order_errors = [order_errors.get(i, []) for i in range(orders_count)]
+        self.__unmatched_errors = unmatched_errors
+        self.__chunk_errors = chunk_errors or []
+
+    def __str__(self):
+        return '<{name} loaded={loaded} errors={errors} failed_orders={failed}>'.format(
+            name=self.__class__.__name__, loaded=self.total_loaded, errors=len(self.errors),
+            failed=len(self.failed_orders))
+
+    @property
+    def responses(self) -> list:
+        """
+        Ответы API по каждому загруженному файлу
+
+        :return: Ответы API МодульБанка в порядке загрузки файлов
+        :rtype: list(PaymentResponse)
+        """
+        return self.__responses
+
+    @property
+    def total_loaded(self) -> int:
+        """
+        Количество загруженных платежных поручений
+
+        :return: Количество загруженных платежных поручений по всем файлам
+        :rtype: int
+        """
+        return sum(x.total_loaded for x in self.__responses)
+
+    @property
+    def errors(self) -> list:
+        """
+        Ошибки по незагруженным платежным поручениям
+
+        :return: Ошибки по всем файлам
+        :rtype: list(str)
+        """
+        return [error for x in self.__responses for error in x.errors]
+
+    @property
+    def order_errors(self) -> list:
+        """
+        Ошибки, сопоставленные платёжным поручениям
+
+        :return: Списки ошибок в порядке переданных поручений; пустой список - ошибок по поручению нет
+        :rtype: list(list(str))
+        """
+        return self.__order_errors
+
+    @property
+    def unmatched_errors(self) -> list:
+        """
+        Ошибки, которые не удалось отнести к конкретному поручению
+
+        :return: Несопоставленные ошибки
+        :rtype: list(str)
+        """
+        return self.__unmatched_errors
+
+    @property
+    def chunk_errors(self) -> list:
+        """
+        Исключения по файлам, загрузка которых не удалась (ошибка сервера, авторизации, нераспознанный ответ)
+
+        Поручения таких файлов могли не загрузиться: их следует проверить в личном кабинете либо загрузить повторно
+        только их, а не всю пачку.
+
+        :return: Пары (номера поручений файла, исключение) в порядке загрузки
+        :rtype: list(tuple(list(int), Exception))
+        """
+        return self.__chunk_errors
+
+    @property
+    def failed_orders(self) -> list:
+        """
+        Номера поручений из файлов, загрузка которых не удалась
+
+        :return: Номера поручений в порядке переданных поручений
+        :rtype: list(int)
+        """
+        return sorted(index for indexes, _ in self.__chunk_errors for index in indexes)
+
+
 class ModulbankClient:
     """
     МодульБанк для Python-разработчиков.
     """
     _api_url = "https://api.modulbank.ru/v1/"
 
-    def __init__(self, token: str, sandbox_mode: bool = False, page_size: int = 50):
+    def __init__(self, token: str, sandbox_mode: bool = False, page_size: int = 50, session: requests.Session = None,
+                 pool_size: int = 10, keep_alive: bool = True, timeout=30, api_url: str = None, cache: BaseCache = None,
+                 cache_ttl: dict = None, lazy: bool = False, decoder=None, rate_limit=None,
+                 retry: RetryPolicy = None):
         """
         Конструктор
 
+        Все методы клиента используют одну долгоживущую HTTP-сессию с пулом соединений, поэтому TCP и TLS
+        рукопожатия с API выполняются один раз на соединение, а не на каждый запрос. Сессию следует закрывать
+        методом :meth:`close` либо использовать клиент как контекстный менеджер.
+
+        С `rate_limit` запросы не превышают заданную частоту, а с `retry` запросы, отклонённые статусом 429 или
+        ошибкой сервера, повторяются по правилам :class:`modulbank.throttling.RetryPolicy`.
+
         :param str token: Токен из Личного Кабинета пользователя МодульБанка.
         :param bool sandbox_mode: Нужен ли `режим песочницы`
         :param int page_size: Размер страницы операций, в штуках. От 0 до 50.
+        :param requests.Session session: (опционально) Внешняя HTTP-сессия. Клиент не закрывает переданную сессию
+        :param int pool_size: Размер пула соединений собственной сессии клиента
+        :param bool keep_alive: Держать ли соединения открытыми между запросами
+        :param timeout: Таймаут запроса в секундах, либо кортеж (таймаут соединения, таймаут чтения)
+        :param str api_url: (опционально) Адрес API, например, адрес локального тестового сервера
+        :param BaseCache cache: (опционально) Кэш ответов `account-info` и балансов, например, :class:`MemoryCache`
+        :param dict cache_ttl: (опционально) Время жизни записей кэша в секундах по методам API, поверх
+            :data:`modulbank.cache.DEFAULT_TTL`
+        :param bool lazy: Возвращать ли операции с отложенным разбором полей (:class:`LazyOperation`)
+        :param decoder: (опционально) Функция разбора JSON-тела ответа (bytes), например,
+            :func:`modulbank.decoders.orjson_decoder`. По умолчанию :func:`modulbank.decoders.json_decoder`
+        :param rate_limit: (опционально) Допустимое количество запросов в секунду, либо
+            :class:`modulbank.throttling.TokenBucket`, разделяемый клиентами одного токена
+        :param RetryPolicy retry: (опционально) Правила повтора запросов. По умолчанию запросы не повторяются
         :raises ValueError: Если размер страницы превышает 50 операций
         """
         self.__token = token
@@ -170,14 +307,56 @@ class ModulbankClient:
         self.__headers = {'Authorization': 'Bearer ' + self.__token}
         if self.__sandbox_mode:
             self.__headers['sandbox'] = 'on'
+        if not keep_alive:
+            self.__headers['Connection'] = 'close'
         if page_size > 50:  # TODO: развязать местный page_size и records в API
             raise ValueError('page_size превышает допустимый предел в 50: %d' % page_size)
         self.__page_size = page_size
+        self.__operation_class = lazy and LazyOperation or Operation
+        self.__decoder = decoder or json_decoder
+        self.__timeout = timeout
+        self.__api_url = api_url or self._api_url
+        self.__own_session = session is None
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.__session = session
+        self.__balances_snapshot = None
+        self.__cache = cache
+        self.__cache_ttl = dict(DEFAULT_TTL, **(cache_ttl or {}))
+        # Ответы песочницы и разных адресов API не должны смешиваться в общем кэше
+        cache_scope = '{url}|{sandbox}|{token}'.format(url=self.__api_url, sandbox=sandbox_mode and 'sandbox' or 'live',
+                                                       token=token)
+        self.__cache_prefix = hashlib.sha1(cache_scope.encode()).hexdigest()[:16] + ':'
+        if rate_limit is not None and not isinstance(rate_limit, TokenBucket):
+            rate_limit = TokenBucket(rate_limit)
+        self.__limiter = rate_limit
+        self.__retry = retry
 
     def __str__(self):
         return "<ModulbankClient token='…' sandbox_mode='{sandbox_mode}' page_size={page_size}>".format(
             sandbox_mode=self.__sandbox_mode, page_size=self.__page_size)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Закрытие соединений собственной HTTP-сессии клиента.
+
+        Внешняя сессия, переданная в конструктор, не закрывается.
+
+        :return: None
+        :rtype: None
+        """
+        if self.__own_session:
+            self.__session.close()
+
     @property
     def token(self) -> str:
         """
@@ -188,6 +367,84 @@ class ModulbankClient:
         """
         return self.__token
 
+    @property
+    def session(self) -> requests.Session:
+        """
+        HTTP-сессия, через которую выполняются запросы к API
+
+        :return: HTTP-сессия
+        :rtype: requests.Session
+        """
+        return self.__session
+
+    @property
+    def cache(self) -> BaseCache:
+        """
+        Кэш ответов API
+
+        :return: Кэш, либо None, если кэширование не используется
+        :rtype: BaseCache
+        """
+        return self.__cache
+
+    def __cached(self, endpoint: str, key: str, fetch):
+        """
+        Получение значения из кэша, либо запросом к API с сохранением в кэш.
+
+        :param str endpoint: Метод API, определяющий время жизни записи
+        :param str key: Ключ записи
+        :param fetch: Функция получения значения из API
+        :return: Значение
+        """
+        if self.__cache is None:
+            return fetch()
+        key = self.__cache_prefix + key
+        value = self.__cache.lookup(key)
+        if value is None:
+            value = fetch()
+            self.__cache.set(key, value, self.__cache_ttl[endpoint])
+        return value
+
+    def __post(self, method: str, payload: dict, stream: bool = False, idempotent: bool = True) -> requests.Response:
+        """
+        Выполнение запроса к методу API и проверка статуса ответа.
+
+        Перед запросом выдерживается ограничение частоты, а отклонённый запрос повторяется по правилам `retry`.
+
+        :param str method: Метод API относительно базового адреса
+        :param dict payload: Тело запроса
+        :param bool stream: Читать ли тело ответа по мере потребления. Такой ответ следует закрыть
+        :param bool idempotent: Безопасен ли повтор запроса, дошедшего до сервера
+        :return: Ответ сервера
+        :rtype: requests.Response
+        :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+        :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+        """
+        attempt = 0
+        while True:
+            if self.__limiter is not None:
+                self.__limiter.acquire()
+            try:
+                r = self.__session.post(self.__api_url + method, json=payload, headers=self.__headers,
+                                        timeout=self.__timeout, stream=stream)
+            except requests.RequestException as e:
+                delay = self.__retry and self.__retry.retry_delay(attempt, sent=not _connect_failed(e),
+                                                                  idempotent=idempotent)
+                if delay is None:
+                    raise
+                log.debug('Retrying %s in %.2fs after %r', method, delay, e)
+            else:
+                if r.status_code == 200:
+                    return r
+                delay = self.__retry and self.__retry.retry_delay(attempt, r.status_code, r.headers.get('Retry-After'),
+                                                                  idempotent=idempotent)
+                r.close()
+                if delay is None:
+                    _check_status(r.status_code)
+                log.debug('Retrying %s in %.2fs after status %d', method, delay, r.status_code)
+            time.sleep(delay)
+            attempt += 1
+
     def accounts(self) -> list:
         """
         Получение информации о компаниях пользователя
@@ -200,15 +457,16 @@ class ModulbankClient:
         :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
         :raises UnexpectedResponseBodyModulbankException: Если не удалось обработать полученные данные.
         """
-        r = requests.post(self._api_url + 'account-info', json={}, headers=self.__headers)
-        if r.status_code == 401:
-            raise exceptions.NotAuthorizedModulbankException()
-        if r.status_code != 200:
-            raise exceptions.UnexpectedResponseStatusModulbankException(r.status_code)
+        return list(self.__cached('account-info', 'account-info', self.__fetch_accounts))
+
+    def __fetch_accounts(self) -> list:
+        r = self.__post('account-info', {})
         try:
-            res = [Company(x) for x in r.json()]
+            res = [Company(x) for x in self.__decoder(r.content)]
         except ValueError:
             raise exceptions.UnexpectedResponseBodyModulbankException(r.text)
+        self.__balances_snapshot = (time.monotonic(),
+                                    {acc.account_id: acc.balance for company in res for acc in company.bank_accounts})
         return res
 
     def balance(self, account_id: str) -> Decimal:
@@ -224,16 +482,47 @@ class ModulbankClient:
         :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
         :raises UnexpectedValueModulbankException: Если не удалось конвертировать полученное значение.
         """
-        r = requests.post(self._api_url + 'account-info/balance/{id}'.format(id=account_id), json={},
-                          headers=self.__headers)
-        if r.status_code == 401:
-            raise exceptions.NotAuthorizedModulbankException()
-        if r.status_code != 200:
-            raise exceptions.UnexpectedResponseStatusModulbankException(r.status_code)
-        try:
-            res = Decimal(r.text)
-        except InvalidOperation:
-            raise exceptions.UnexpectedValueModulbankException('Balance %s as Decimal' % r.text)
+        return self.__cached('balance', 'balance:' + account_id, lambda: self.__fetch_balance(account_id))
+
+    def __fetch_balance(self, account_id: str) -> Decimal:
+        r = self.__post('account-info/balance/{id}'.format(id=account_id), {})
+        return _decode_balance(self.__decoder, r.content)
+
+    def balances(self, account_ids, max_age: float = None, workers: int = 8) -> dict:
+        """
+        Получение балансов по нескольким счетам
+
+        Балансы всех счетов пользователя берутся из одного запроса `account-info` (либо из кэша, если он задан).
+        Если последний ответ `account-info` моложе `max_age` секунд, он используется повторно без запроса. Балансы
+        счетов, которых нет в ответе `account-info`, запрашиваются по отдельности в пуле из не более чем `workers`
+        потоков.
+
+        Методы в API: https://api.modulbank.ru/v1/account-info и
+        https://api.modulbank.ru/v1/account-info/balance/<account_id>
+
+        :param account_ids: Системные идентификаторы счетов
+        :param float max_age: (опционально) Допустимый возраст ранее полученных данных `account-info`, в секундах
+        :param int workers: Максимальное количество одновременных запросов баланса
+        :return: Словарь сумм остатков денежных средств по идентификаторам счетов
+        :rtype: dict(str, Decimal)
+        :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+        :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+        :raises UnexpectedResponseBodyModulbankException: Если не удалось обработать полученные данные.
+        :raises UnexpectedValueModulbankException: Если не удалось конвертировать полученное значение.
+        """
+        account_ids = list(OrderedDict.fromkeys(account_ids))
+        if not account_ids:
+            return {}
+        snapshot = self.__balances_snapshot
+        if snapshot is None or max_age is None or time.monotonic() - snapshot[0] > max_age:
+            known = {acc.account_id: acc.balance for company in self.accounts() for acc in company.bank_accounts}
+        else:
+            known = snapshot[1]
+        res = {x: known[x] for x in account_ids if x in known}
+        missing = [x for x in account_ids if x not in res]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as executor:
+                res.update(zip(missing, executor.map(self.balance, missing)))
         return res
 
     def operations(self, account_id: str, search: SearchOptions = None) -> list:
@@ -244,7 +533,7 @@ class ModulbankClient:
 
         :param str account_id: Системный идентификатор счёта
         :param SearchOptions search: Опциональные параметры поиска операций
-        :return: Массив операций, представленных структурой :class:`Operation`
+        :return: Массив операций, представленных структурой :class:`Operation` (:class:`LazyOperation` при `lazy`)
         :rtype: list(Operation)
         :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
         :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
@@ -252,43 +541,124 @@ class ModulbankClient:
         """
         if search is None:
             search = SearchOptions()
-        criteria = self.__patch_paging(search.to_dict())
-        r = requests.post(self._api_url + 'operation-history/{id}'.format(id=account_id),
-                          json=criteria,
-                          headers=self.__headers)
-        if r.status_code == 401:
-            raise exceptions.NotAuthorizedModulbankException()
-        if r.status_code != 200:
-            raise exceptions.UnexpectedResponseStatusModulbankException(r.status_code)
+        criteria = _patch_paging(search.to_dict(), self.__page_size)
+        r = self.__post('operation-history/{id}'.format(id=account_id), criteria)
         try:
-            res = [Operation(x) for x in r.json()]
+            res = [self.__operation_class(x) for x in self.__decoder(r.content)]
         except ValueError:
             raise exceptions.UnexpectedResponseBodyModulbankException(r.text)
         return res
 
-    def __patch_paging(self, param: dict):
+    def __stream_operations(self, account_id: str, search: SearchOptions):
         """
-        Правка критериев поиска в плане пейджинга.
+        Потоковый разбор одной страницы истории операций.
 
-        :param dict param: Критерии поиска
-        :return: Поправленные критерии поиска
-        :rtype: dict
+        :param str account_id: Системный идентификатор счёта
+        :param SearchOptions search: Параметры поиска операций
+        :return: Генератор операций страницы
+        :rtype: collections.abc.Iterator(Operation)
+        :raises UnexpectedResponseBodyModulbankException: Если не удалось обработать полученные данные.
         """
-        if 'page' not in param:
-            return param
-        page = param['page']
-        param['skip'] = page * self.__page_size
-        param['records'] = self.__page_size
-        del param['page']
+        criteria = _patch_paging(search.to_dict(), self.__page_size)
+        r = self.__post('operation-history/{id}'.format(id=account_id), criteria, stream=True)
+        try:
+            for obj in iter_json_array(r.iter_content(_STREAM_CHUNK_SIZE)):
+                yield self.__operation_class(obj)
+        except ValueError:
+            raise exceptions.UnexpectedResponseBodyModulbankException(
+                'Operation history of account %s: malformed stream' % account_id)
+        finally:
+            r.close()
 
-        return param
+    def iter_operations(self, account_id: str, search: SearchOptions = None, prefetch: int = 1,
+                        stream: bool = False):
+        """
+        Постраничный обход истории операций
+
+        Страницы запрашиваются по мере потребления, начиная со страницы из `search` (или с первой), до первой
+        неполной страницы. При `prefetch` больше 1 в пуле потоков одновременно выполняется до `prefetch` запросов
+        следующих страниц; операции всё равно выдаются по порядку. Без предвыборки в памяти держится не более одной
+        страницы, с предвыборкой — не более `prefetch` страниц.
+
+        При `stream` тело каждой страницы разбирается по мере получения (:func:`modulbank.decoders.iter_json_array`):
+        операция выдаётся, как только из сети пришёл её JSON-объект, а ни тело ответа, ни разобранная страница
+        целиком в памяти не держатся. Функция `decoder` клиента при этом не используется, суммы разбираются сразу в
+        Decimal.
+
+        Метод в API: https://api.modulbank.ru/v1/operation-history/<account_id>
+
+        :param str account_id: Системный идентификатор счёта
+        :param SearchOptions search: Опциональные параметры поиска операций
+        :param int prefetch: Количество одновременно запрашиваемых страниц
+        :param bool stream: Разбирать ли страницы по мере получения. Несовместимо с `prefetch` больше 1
+        :return: Генератор операций, представленных структурой :class:`Operation`
+        :rtype: collections.abc.Iterator(Operation)
+        :raises ValueError: Если количество одновременно запрашиваемых страниц меньше 1 или запрошена предвыборка
+            потоковых страниц
+        :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+        :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+        :raises UnexpectedResponseBodyModulbankException: Если не удалось обработать полученные данные.
+        """
+        if prefetch < 1:
+            raise ValueError('prefetch должен быть не меньше 1: %d' % prefetch)
+        if stream and prefetch > 1:
+            raise ValueError('Потоковый разбор страниц несовместим с prefetch: %d' % prefetch)
+        return self.__iter_operations(account_id, search or SearchOptions(), prefetch, stream)
+
+    def __iter_operations(self, account_id: str, search: SearchOptions, prefetch: int, stream: bool):
+        first_page = search.page or 0
+
+        def fetch(page):
+            return self.operations(account_id, SearchOptions(category=search.category, date_from=search.date_from,
+                                                             date_till=search.date_till, page=page))
+
+        if stream:
+            page = first_page
+            while True:
+                count = 0
+                for op in self.__stream_operations(account_id, SearchOptions(
+                        category=search.category, date_from=search.date_from, date_till=search.date_till, page=page)):
+                    count += 1
+                    yield op
+                if not count or count < self.__page_size:
+                    return
+                page += 1
+
+        if prefetch == 1:
+            page = first_page
+            while True:
+                res = fetch(page)
+                for op in res:
+                    yield op
+                if not res or len(res) < self.__page_size:
+                    return
+                page += 1
+
+        executor = ThreadPoolExecutor(max_workers=prefetch)
+        pending = deque()
+        try:
+            for page in range(first_page, first_page + prefetch):
+                pending.append(executor.submit(fetch, page))
+            next_page = first_page + prefetch
+            while pending:
+                res = pending.popleft().result()
+                for op in res:
+                    yield op
+                if not res or len(res) < self.__page_size:
+                    return
+                pending.append(executor.submit(fetch, next_page))
+                next_page += 1
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
 
     def create_payment_draft(self, order: PaymentOrder) -> PaymentResponse:
         """
         Создание черновика платёжки.
 
         Все создаваемые через API платежные поручения имеют статус "Черновик". Подписание поручений возможно только
-        внутри личного кабинета.
+        внутри личного кабинета. Закэшированные `account-info` и балансы после загрузки сбрасываются.
 
         Метод в API: https://api.modulbank.ru/v1/operation-upload/1c
 
@@ -300,54 +670,258 @@ class ModulbankClient:
         :raises UnexpectedResponseBodyModulbankException: Если не удалось обработать полученные данные.
         """
         exchange = ClientBankExchange()
-        self.__fill_client_bank_exchange(order, exchange)
-        r = requests.post(self._api_url + 'operation-upload/1c', json={"document": exchange.document},
-                          headers=self.__headers)
-        if r.status_code == 401:
-            raise exceptions.NotAuthorizedModulbankException()
-        if r.status_code != 200:
-            raise exceptions.UnexpectedResponseStatusModulbankException(r.status_code)
+        _fill_client_bank_exchange(order, exchange)
+        r = self.__post('operation-upload/1c', {"document": exchange.document}, idempotent=False)
+        self.__invalidate_balances()
         try:
-            res = PaymentResponse(r.json(), document=exchange.document)
+            res = PaymentResponse(self.__decoder(r.content), document=exchange.document)
         except ValueError:
             raise exceptions.UnexpectedResponseBodyModulbankException(r.text)
         return res
 
-    @staticmethod
-    def __fill_client_bank_exchange(order: PaymentOrder, exchange: ClientBankExchange) -> None:
+    def create_payment_drafts(self, orders, chunk_size: int = 100) -> PaymentBatchResponse:
         """
-        Заполнение полей платежного поручения
+        Пакетное создание черновиков платёжек.
+
+        Поручения загружаются файлами 1CClientBankExchange, в каждом из которых до `chunk_size` секций документов с
+        одного расчётного счёта, поэтому тысяча платёжек загружается десятком запросов. Ошибки из ответов API
+        сопоставляются поручениям по номеру документа, поэтому номера в пределах пачки должны различаться.
+
+        Загрузка не повторяется, а уже загруженные файлы создали черновики, поэтому ошибка загрузки файла (статус
+        ответа, авторизация, нераспознанный ответ, сбой соединения) не прерывает загрузку остальных: исключение
+        сохраняется в :attr:`PaymentBatchResponse.chunk_errors`, а поручения файла - в
+        :attr:`PaymentBatchResponse.failed_orders`.
+
+        Метод в API: https://api.modulbank.ru/v1/operation-upload/1c
+
+        :param orders: Объекты платёжных поручений
+        :param int chunk_size: Максимальное количество платёжных поручений в одном файле
+        :return: Ответы API МодульБанка, ошибки, сопоставленные платёжным поручениям, и исключения по файлам
+        :rtype: PaymentBatchResponse
+        :raises ValueError: Если размер пачки меньше 1
+        """
+        orders = list(orders)
+        responses = []
+        order_errors = {}
+        unmatched_errors = []
+        chunk_errors = []
+        chunks = _chunk_orders(orders, chunk_size)
+        try:
+            for chunk in chunks:
+                document = _build_exchange(chunk).document
+                try:
+                    r = self.__post('operation-upload/1c', {"document": document}, idempotent=False)
+                    try:
+                        res = PaymentResponse(self.__decoder(r.content), document=document)
+                    except ValueError:
+                        raise exceptions.UnexpectedResponseBodyModulbankException(r.text)
+                except (exceptions.ModulbankException, requests.RequestException) as e:
+                    log.warning('Upload of %d payment orders failed: %r', len(chunk), e)
+                    chunk_errors.append(([index for index, _ in chunk], e))
+                    continue
+                responses.append(res)
+                matched, unmatched = _match_errors(res.errors, chunk)
+                order_errors.update(matched)
+                unmatched_errors.extend(unmatched)
+        finally:
+            self.__invalidate_balances()
+        return PaymentBatchResponse(len(orders), responses, order_errors, unmatched_errors, chunk_errors)
+
+    def __invalidate_balances(self) -> None:
+        """
+        Сброс закэшированных `account-info` и балансов, а также снимка балансов :meth:`balances`, которые могли
+        измениться после загрузки платёжек.
 
-        :param PaymentOrder order: Объект платёжного поручения
-        :param ClientBankExchange exchange: Объект обмена данными в формате 1С
         :return: None
         :rtype: None
         """
-        exchange.УсловияОтбора.РасчСчет = order.account_num
-        exchange.СекцияПлатежногоДокумента.Номер = order.doc_num
-        exchange.СекцияПлатежногоДокумента.Дата = order.date
-        exchange.СекцияПлатежногоДокумента.Сумма = order.amount
-        exchange.СекцияПлатежногоДокумента.НазначениеПлатежа = order.purpose
-        exchange.СекцияПлатежногоДокумента.НазначениеПлатежа1 = order.purpose
-
-        exchange.СекцияПлатежногоДокумента.Плательщик = "%s %s" % (order.payer.inn, order.payer.name)
-        exchange.СекцияПлатежногоДокумента.ПлательщикИНН = order.payer.inn
-        exchange.СекцияПлатежногоДокумента.ПлательщикКПП = order.payer.kpp
-        exchange.СекцияПлатежногоДокумента.ПлательщикСчет = order.payer.bank.account
-        exchange.СекцияПлатежногоДокумента.ПлательщикРасчСчет = order.payer.bank.account
-        exchange.СекцияПлатежногоДокумента.ПлательщикБанк1 = order.payer.bank.name
-        exchange.СекцияПлатежногоДокумента.ПлательщикБИК = order.payer.bank.bic
-        exchange.СекцияПлатежногоДокумента.ПлательщикКорсчет = order.payer.bank.corr_acc
-
-        exchange.СекцияПлатежногоДокумента.Получатель = order.recipient.name
-        exchange.СекцияПлатежногоДокумента.ПолучательИНН = order.recipient.inn
-        exchange.СекцияПлатежногоДокумента.ПолучательКПП = order.recipient.kpp
-        exchange.СекцияПлатежногоДокумента.ПолучательСчет = order.recipient.bank.account
-        exchange.СекцияПлатежногоДокумента.ПолучательРасчСчет = order.recipient.bank.account
-        exchange.СекцияПлатежногоДокумента.ПолучательБанк1 = order.recipient.bank.name
-        exchange.СекцияПлатежногоДокумента.ПолучательБИК = order.recipient.bank.bic
-        exchange.СекцияПлатежногоДокумента.ПолучательКорсчет = order.recipient.bank.corr_acc
-
-        exchange.СекцияПлатежногоДокумента.ВидОплаты = order.payment_type
-        exchange.СекцияПлатежногоДокумента.Очередность = order.priority
-        exchange.СекцияПлатежногоДокумента.ДатаСписано = order.date
+        self.__balances_snapshot = None
+        if self.__cache is not None:
+            self.__cache.delete_prefix(self.__cache_prefix + 'account-info')
+            self.__cache.delete_prefix(self.__cache_prefix + 'balance:')
+
+
+def _connect_failed(error: requests.RequestException) -> bool:
+    """
+    Проверка, что запрос не дошёл до сервера, потому что не удалось установить соединение.
+
+    :param requests.RequestException error: Ошибка запроса
+    :return: True, если соединение не было установлено
+    :rtype: bool
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args and getattr(error.args[0], 'reason', None)
+    return isinstance(reason, NewConnectionError)
+
+
+def _check_status(status_code: int) -> None:
+    """
+    Проверка статуса ответа сервера.
+
+    :param int status_code: HTTP-статус ответа
+    :return: None
+    :rtype: None
+    :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+    :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+    """
+    if status_code == 401:
+        raise exceptions.NotAuthorizedModulbankException()
+    if status_code != 200:
+        raise exceptions.UnexpectedResponseStatusModulbankException(status_code)
+
+
+def _decode_balance(decoder, content: bytes) -> Decimal:
+    """
+    Разбор ответа на запрос баланса.
+
+    :param decoder: Функция разбора JSON-тела ответа
+    :param bytes content: Тело ответа
+    :return: Сумма остатка денежных средств на счёте
+    :rtype: Decimal
+    :raises UnexpectedValueModulbankException: Если не удалось конвертировать полученное значение.
+    """
+    try:
+        return _to_decimal(decoder(content))
+    except (ValueError, TypeError, ArithmeticError):
+        raise exceptions.UnexpectedValueModulbankException(
+            'Balance %s as Decimal' % content.decode('utf-8', 'replace'))
+
+
+def _patch_paging(param: dict, page_size: int) -> dict:
+    """
+    Правка критериев поиска в плане пейджинга.
+
+    :param dict param: Критерии поиска
+    :param int page_size: Размер страницы операций
+    :return: Поправленные критерии поиска
+    :rtype: dict
+    """
+    if 'page' not in param:
+        return param
+    page = param['page']
+    param['skip'] = page * page_size
+    param['records'] = page_size
+    del param['page']
+
+    return param
+
+
+def _fill_client_bank_exchange(order: PaymentOrder, exchange: ClientBankExchange) -> None:
+    """
+    Заполнение полей платежного поручения
+
+    :param PaymentOrder order: Объект платёжного поручения
+    :param ClientBankExchange exchange: Объект обмена данными в формате 1С
+    :return: None
+    :rtype: None
+    """
+    exchange.УсловияОтбора.РасчСчет = order.account_num
+    _fill_document_section(order, exchange.СекцияПлатежногоДокумента)
+
+
+def _fill_document_section(order: PaymentOrder, section: DocumentSection) -> None:
+    """
+    Заполнение секции платёжного документа
+
+    :param PaymentOrder order: Объект платёжного поручения
+    :param DocumentSection section: Секция документа в файле обмена данными в формате 1С
+    :return: None
+    :rtype: None
+    """
+    section.Номер = order.doc_num
+    section.Дата = order.date
+    section.Сумма = order.amount
+    section.НазначениеПлатежа = order.purpose
+    section.НазначениеПлатежа1 = order.purpose
+
+    section.Плательщик = "%s %s" % (order.payer.inn, order.payer.name)
+    section.ПлательщикИНН = order.payer.inn
+    section.ПлательщикКПП = order.payer.kpp
+    section.ПлательщикСчет = order.payer.bank.account
+    section.ПлательщикРасчСчет = order.payer.bank.account
+    section.ПлательщикБанк1 = order.payer.bank.name
+    section.ПлательщикБИК = order.payer.bank.bic
+    section.ПлательщикКорсчет = order.payer.bank.corr_acc
+
+    section.Получатель = order.recipient.name
+    section.ПолучательИНН = order.recipient.inn
+    section.ПолучательКПП = order.recipient.kpp
+    section.ПолучательСчет = order.recipient.bank.account
+    section.ПолучательРасчСчет = order.recipient.bank.account
+    section.ПолучательБанк1 = order.recipient.bank.name
+    section.ПолучательБИК = order.recipient.bank.bic
+    section.ПолучательКорсчет = order.recipient.bank.corr_acc
+
+    section.ВидОплаты = order.payment_type
+    section.Очередность = order.priority
+    section.ДатаСписано = order.date
+
+
+def _chunk_orders(orders, chunk_size: int) -> list:
+    """
+    Разбиение платёжных поручений на пачки для загрузки одним файлом.
+
+    В один файл попадают только поручения с одного расчётного счёта (`УсловияОтбора.РасчСчет` у файла один), порядок
+    поручений внутри счёта сохраняется.
+
+    :param orders: Платёжные поручения
+    :param int chunk_size: Максимальное количество поручений в файле
+    :return: Пачки пар (номер поручения в `orders`, поручение)
+    :rtype: list(list(tuple(int, PaymentOrder)))
+    :raises ValueError: Если размер пачки меньше 1
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size должен быть не меньше 1: %d' % chunk_size)
+    by_account = OrderedDict()
+    for index, order in enumerate(orders):
+        by_account.setdefault(order.account_num, []).append((index, order))
+    res = []
+    for items in by_account.values():
+        for start in range(0, len(items), chunk_size):
+            res.append(items[start:start + chunk_size])
+    return res
+
+
+def _build_exchange(chunk: list) -> ClientBankExchange:
+    """
+    Формирование файла обмена данными с несколькими платёжными документами.
+
+    :param list chunk: Пачка пар (номер поручения, поручение) с одного расчётного счёта
+    :return: Объект обмена данными в формате 1С
+    :rtype: ClientBankExchange
+    """
+    exchange = ClientBankExchange()
+    _fill_client_bank_exchange(chunk[0][1], exchange)
+    for _, order in chunk[1:]:
+        _fill_document_section(order, exchange.add_document())
+    return exchange
+
+
+def _match_errors(errors: list, chunk: list) -> tuple:
+    """
+    Сопоставление ошибок загрузки файла платёжным поручениям.
+
+    API возвращает ошибки текстом. Ошибка относится к поручению, если в её тексте отдельным числом встречается номер
+    документа ровно одного поручения пачки; в пачке из одного поручения все ошибки относятся к нему.
+
+    :param list errors: Ошибки из ответа API
+    :param list chunk: Пачка пар (номер поручения, поручение)
+    :return: Словарь ошибок по номерам поручений и список несопоставленных ошибок
+    :rtype: tuple(dict(int, list(str)), list(str))
+    """
+    matched = {}
+    unmatched = []
+    if len(chunk) == 1:
+        if errors:
+            matched[chunk[0][0]] = list(errors)
+        return matched, unmatched
+    patterns = [(index, re.compile(r'(?<!\w){}(?!\w)'.format(re.escape(str(order.doc_num)))))
+                for index, order in chunk if order.doc_num]
+    for error in errors:
+        owners = [index for index, pattern in patterns if pattern.search(str(error))]
+        if len(owners) == 1:
+            matched.setdefault(owners[0], []).append(error)
+        else:
+            unmatched.append(error)
+    return matched, unmatched
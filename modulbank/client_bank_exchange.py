@@ -1,9 +1,78 @@
+import codecs
 import datetime
+import re
 
 from decimal import Decimal, ROUND_HALF_DOWN
 
 import pytz
 
+from .structs import BankShort, Contractor, PaymentOrder
+
+
+_CENTS = Decimal('.01')
+# Скомпилированные планы вывода секций по классам: (обязательные поля, необязательные поля)
+_PLANS = {}
+
+
+def _format_value(value) -> str:
+    """
+    Форматирование значения поля в формате 1С.
+
+    :param value: Значение поля
+    :return: Текст значения
+    :rtype: str
+    """
+    if type(value) is str:
+        return value
+    if isinstance(value, datetime.date):
+        return value.strftime('%d.%m.%Y')
+    if isinstance(value, datetime.time):
+        return value.strftime('%H:%M:%S')
+    if isinstance(value, Decimal):
+        # noinspection PyArgumentList
+        return str(value.quantize(_CENTS, rounding=ROUND_HALF_DOWN))
+    return str(value)
+
+
+def _section_plan(cls) -> tuple:
+    """
+    План вывода секции, компилируемый один раз на класс.
+
+    :param cls: Класс секции
+    :return: Пары (имя поля, префикс строки "Имя=") обязательных и необязательных полей в порядке вывода
+    :rtype: tuple(tuple, tuple)
+    """
+    plan = _PLANS.get(cls)
+    if plan is None:
+        mandatory = frozenset(cls._mandatory_fields)
+        plan = (tuple((name, name + '=') for name in cls._mandatory_fields),
+                tuple((name, name + '=') for name in cls._fields if name not in mandatory))
+        _PLANS[cls] = plan
+    return plan
+
+
+def _render_section(section, parts: list) -> None:
+    """
+    Вывод строк секции в формате 1С в список частей документа.
+
+    Обязательные поля выводятся всегда (пустые - с пустым значением), необязательные - только заполненные.
+
+    :param BaseSection section: Секция документа
+    :param list parts: Список частей документа, дополняемый строками секции
+    :return: None
+    :rtype: None
+    """
+    mandatory, optional = _section_plan(type(section))
+    values = section.__dict__
+    append = parts.append
+    for name, prefix in mandatory:
+        value = values[name]
+        append(prefix + ('' if value is None else _format_value(value)) + '\n')
+    for name, prefix in optional:
+        value = values[name]
+        if value is not None:
+            append(prefix + _format_value(value) + '\n')
+
 
 class BaseSection:
     """
@@ -26,31 +95,9 @@ class BaseSection:
         :return: Текст секции
         :rtype: str
         """
-        s = ""
-        for name in self._mandatory_fields:
-            value = self.__dict__[name]
-            if value is None:
-                value = ''
-            value = self.__format_value(value)
-            s += "{}={}\n".format(name, value)
-        for name in self._fields:
-            if name in self._mandatory_fields or self.__dict__[name] is None:
-                continue
-            value = self.__dict__[name]
-            value = self.__format_value(value)
-            s += "{}={}\n".format(name, value)
-        return s
-
-    @staticmethod
-    def __format_value(value) -> str:
-        if isinstance(value, datetime.date):
-            return value.strftime('%d.%m.%Y')
-        if isinstance(value, datetime.time):
-            return value.strftime('%H:%M:%S')
-        if isinstance(value, Decimal):
-            # noinspection PyArgumentList
-            return str(value.quantize(Decimal('.01'), rounding=ROUND_HALF_DOWN))
-        return value
+        parts = []
+        _render_section(self, parts)
+        return ''.join(parts)
 
 
 class GeneralSection(BaseSection):
@@ -146,13 +193,37 @@ class ClientBankExchange:
         self.__dict__['УсловияОтбора'] = FilterSection()
         self.__dict__['СекцияОстатков'] = BalancesSection()
         self.__dict__['СекцияПлатежногоДокумента'] = DocumentSection()
+        self.__documents = [self.__dict__['СекцияПлатежногоДокумента']]
 
     def __str__(self):
         s = ""
         for item in ['ОбщиеСведения', 'УсловияОтбора', 'СекцияОстатков', 'СекцияПлатежногоДокумента']:
             s += "\n{}: \n{}".format(item, str(self.__dict__[item]))
+        for document in self.__documents[1:]:
+            s += "\n{}: \n{}".format('СекцияПлатежногоДокумента', str(document))
         return s
 
+    @property
+    def documents(self) -> list:
+        """
+        Секции платёжных документов файла. Первая из них - `СекцияПлатежногоДокумента`
+
+        :return: Секции документов в порядке следования в файле
+        :rtype: list(DocumentSection)
+        """
+        return self.__documents
+
+    def add_document(self) -> DocumentSection:
+        """
+        Добавление в файл ещё одной секции платёжного документа.
+
+        :return: Новая пустая секция документа
+        :rtype: DocumentSection
+        """
+        section = DocumentSection()
+        self.__documents.append(section)
+        return section
+
     @property
     def document(self) -> str:
         """
@@ -161,11 +232,299 @@ class ClientBankExchange:
         :return: Текст документа
         :rtype: str
         """
-        s = "1CClientBankExchange\n{body}КонецФайла"
-        body = self.__dict__['ОбщиеСведения'].document
-        body += self.__dict__['УсловияОтбора'].document
-        body += self.__dict__['СекцияОстатков'].document
-        body += 'СекцияДокумент=Платежное поручение\n'
-        body += self.__dict__['СекцияПлатежногоДокумента'].document
-        body += 'КонецДокумента\n'
-        return s.format(body=body)
+        parts = ['1CClientBankExchange\n']
+        _render_section(self.__dict__['ОбщиеСведения'], parts)
+        _render_section(self.__dict__['УсловияОтбора'], parts)
+        _render_section(self.__dict__['СекцияОстатков'], parts)
+        for document in self.__documents:
+            parts.append('СекцияДокумент=Платежное поручение\n')
+            _render_section(document, parts)
+            parts.append('КонецДокумента\n')
+        parts.append('КонецФайла')
+        return ''.join(parts)
+
+    def write(self, fileobj, encoding: str = 'cp1251') -> None:
+        """
+        Запись документа обмена данными в двоичный файловый объект.
+
+        :param fileobj: Двоичный файловый объект с методом `write(bytes)`
+        :param str encoding: Кодировка файла
+        :return: None
+        :rtype: None
+        :raises UnicodeEncodeError: Если текст документа не представим в кодировке файла
+        """
+        with ExchangeWriter(fileobj, self.__dict__['ОбщиеСведения'], self.__dict__['УсловияОтбора'],
+                            self.__dict__['СекцияОстатков'], encoding=encoding) as writer:
+            writer.write_documents(self.__documents)
+
+
+class ExchangeWriter:
+    """
+    Потоковая запись файла обмена данными 1С в двоичный файловый объект (файл, `socket.makefile('wb')` и т.п.).
+
+    Заголовок и общие секции записываются при открытии, каждая секция документа - сразу при добавлении, окончание
+    файла - при закрытии, поэтому расход памяти не зависит от количества документов. Текст совпадает с
+    :attr:`ClientBankExchange.document` и кодируется в Windows-1251, как объявляет `Кодировка=Windows`.
+    """
+
+    def __init__(self, fileobj, general: GeneralSection = None, filter_section: FilterSection = None,
+                 balances: BalancesSection = None, encoding: str = 'cp1251'):
+        """
+        Конструктор
+
+        :param fileobj: Двоичный файловый объект с методом `write(bytes)`. Не закрывается писателем
+        :param GeneralSection general: (опционально) Общая секция. По умолчанию новая :class:`GeneralSection`
+        :param FilterSection filter_section: (опционально) Секция фильтров. По умолчанию новая :class:`FilterSection`
+        :param BalancesSection balances: (опционально) Секция остатков. По умолчанию новая :class:`BalancesSection`
+        :param str encoding: Кодировка файла
+        :raises UnicodeEncodeError: Если текст секции не представим в кодировке файла
+        """
+        self.__fileobj = fileobj
+        self.__encoding = encoding
+        self.__count = 0
+        self.__closed = False
+        parts = ['1CClientBankExchange\n']
+        _render_section(general or GeneralSection(), parts)
+        _render_section(filter_section or FilterSection(), parts)
+        _render_section(balances or BalancesSection(), parts)
+        self.__write(parts)
+
+    def __str__(self):
+        return "<ExchangeWriter encoding='{encoding}' documents={count}>".format(encoding=self.__encoding,
+                                                                                 count=self.__count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+
+    @property
+    def count(self) -> int:
+        """
+        Количество записанных секций документов
+
+        :return: Количество документов
+        :rtype: int
+        """
+        return self.__count
+
+    def __write(self, parts: list) -> None:
+        self.__fileobj.write(''.join(parts).encode(self.__encoding))
+
+    def write_document(self, section: DocumentSection) -> None:
+        """
+        Запись секции платёжного документа.
+
+        :param DocumentSection section: Секция документа
+        :return: None
+        :rtype: None
+        :raises ValueError: Если файл уже закрыт
+        :raises UnicodeEncodeError: Если текст секции не представим в кодировке файла
+        """
+        if self.__closed:
+            raise ValueError('Файл обмена уже закрыт')
+        parts = ['СекцияДокумент=Платежное поручение\n']
+        _render_section(section, parts)
+        parts.append('КонецДокумента\n')
+        self.__write(parts)
+        self.__count += 1
+
+    def write_documents(self, sections) -> int:
+        """
+        Запись секций платёжных документов из итерируемого объекта, например, генератора.
+
+        :param sections: Секции документов
+        :return: Количество записанных за вызов документов
+        :rtype: int
+        :raises ValueError: Если файл уже закрыт
+        :raises UnicodeEncodeError: Если текст секции не представим в кодировке файла
+        """
+        count = self.__count
+        for section in sections:
+            self.write_document(section)
+        return self.__count - count
+
+    def close(self) -> None:
+        """
+        Запись окончания файла. Файловый объект не закрывается.
+
+        :return: None
+        :rtype: None
+        """
+        if not self.__closed:
+            self.__closed = True
+            self.__write(['КонецФайла'])
+
+
+# Поля файла обмена, значения которых разбираются не в строку
+_DATE_FIELDS = frozenset(['ДатаСоздания', 'ДатаНачала', 'ДатаКонца', 'Дата', 'КвитанцияДата', 'ДатаСписано',
+                          'ДатаПоступило', 'ДатаОтсылкиДок'])
+_TIME_FIELDS = frozenset(['ВремяСоздания', 'КвитанцияВремя'])
+_DECIMAL_FIELDS = frozenset(['Сумма', 'НачальныйОстаток', 'ВсегоПоступило', 'ВсегоСписано', 'КонечныйОстаток'])
+
+
+def _parse_date(value: str) -> datetime.date:
+    day, month, year = value.split('.')
+    return datetime.date(int(year), int(month), int(day))
+
+
+def _parse_time(value: str) -> datetime.time:
+    return datetime.datetime.strptime(value, '%H:%M:%S').time()
+
+
+def _dispatch_table(*classes) -> dict:
+    """
+    Таблица разбора строк секции: функция преобразования значения по имени поля.
+
+    :param classes: Классы секций, поля которых встречаются в блоке файла
+    :return: Словарь пар (класс секции, функция преобразования) по имени поля
+    :rtype: dict(str, tuple)
+    """
+    table = {}
+    for cls in classes:
+        for name in cls._fields:
+            if name in _DATE_FIELDS:
+                parse = _parse_date
+            elif name in _TIME_FIELDS:
+                parse = _parse_time
+            elif name in _DECIMAL_FIELDS:
+                parse = Decimal
+            else:
+                parse = str
+            table.setdefault(name, (cls, parse))
+    return table
+
+
+_NON_ASCII = re.compile(b'[\x80-\xff]')
+_HEADER_FIELDS = _dispatch_table(GeneralSection, FilterSection)
+_BALANCES_FIELDS = _dispatch_table(BalancesSection)
+_DOCUMENT_FIELDS = _dispatch_table(DocumentSection)
+
+
+def _empty_section(cls) -> BaseSection:
+    """
+    Секция без значений по умолчанию (например, без текущей даты создания), для заполнения из файла.
+    """
+    section = cls.__new__(cls)
+    section.__dict__.update(dict.fromkeys(cls._fields))
+    return section
+
+
+def _decoded_lines(fileobj, encoding: str):
+    """
+    Строки файла без символов конца строки.
+
+    Кодировка двоичного файла, если не указана, определяется по первой строке с не-ASCII символами: текст в UTF-8
+    (в том числе с BOM), иначе - в Windows-1251.
+    """
+    for line in fileobj:
+        if isinstance(line, bytes):
+            if encoding is None and _NON_ASCII.search(line):
+                if line.startswith(codecs.BOM_UTF8):
+                    line = line[len(codecs.BOM_UTF8):]
+                    encoding = 'utf-8'
+                else:
+                    try:
+                        line.decode('utf-8')
+                        encoding = 'utf-8'
+                    except UnicodeDecodeError:
+                        encoding = 'cp1251'
+            line = line.decode(encoding or 'ascii')
+        yield line.rstrip('\r\n')
+
+
+def _document_to_payment_order(section: DocumentSection) -> PaymentOrder:
+    """
+    Платёжное поручение по секции документа.
+
+    :param DocumentSection section: Секция документа
+    :return: Платёжное поручение
+    :rtype: PaymentOrder
+    """
+    def contractor(prefix: str) -> Contractor:
+        values = section.__dict__
+        inn = values[prefix + 'ИНН']
+        name = values[prefix + '1'] or values[prefix]
+        if name and inn and name.startswith(inn + ' '):
+            name = name[len(inn) + 1:]
+        return Contractor(name=name, inn=inn, kpp=values[prefix + 'КПП'], bank=BankShort(
+            account=values[prefix + 'РасчСчет'] or values[prefix + 'Счет'], name=values[prefix + 'Банк1'],
+            bic=values[prefix + 'БИК'], corr_acc=values[prefix + 'Корсчет']))
+
+    return PaymentOrder(doc_num=section.Номер, account_num=section.ПлательщикСчет, amount=section.Сумма,
+                        purpose=section.НазначениеПлатежа, payer=contractor('Плательщик'),
+                        recipient=contractor('Получатель'), payment_type=section.ВидОплаты,
+                        priority=section.Очередность, date=section.Дата)
+
+
+def iter_exchange(fileobj, encoding: str = None, orders: bool = False):
+    """
+    Потоковый разбор файла обмена данными 1CClientBankExchange (например, выписки из бухгалтерской программы).
+
+    Файл читается построчно и в память целиком не загружается. Значения разбираются по таблице полей секций: даты -
+    в `datetime.date`, время - в `datetime.time`, суммы - в Decimal, пустые значения - в None. Поля, не известные
+    секции, сохраняются в ней как атрибуты.
+
+    Выдаются секции в порядке следования в файле: :class:`GeneralSection` и :class:`FilterSection` заголовка файла,
+    :class:`BalancesSection` для каждой `СекцияРасчСчет` и :class:`DocumentSection` (либо :class:`PaymentOrder` при
+    `orders`) для каждой `СекцияДокумент`. Вид документа сохраняется в атрибуте `СекцияДокумент` секции.
+
+    :param fileobj: Файловый объект, двоичный или текстовый, либо любой итерируемый объект строк
+    :param str encoding: (опционально) Кодировка двоичного файла. По умолчанию определяется автоматически
+    :param bool orders: Выдавать ли документы платёжными поручениями :class:`PaymentOrder`
+    :return: Генератор секций
+    :rtype: collections.abc.Iterator
+    :raises ValueError: Если текст не является файлом обмена данными или значение поля не удалось разобрать
+    """
+    lines = _decoded_lines(fileobj, encoding)
+    first = next(lines, '').lstrip('\ufeff')
+    if first != '1CClientBankExchange':
+        raise ValueError('Файл не является файлом обмена данными 1CClientBankExchange')
+    header = {GeneralSection: _empty_section(GeneralSection), FilterSection: _empty_section(FilterSection)}
+    header_done = False
+    section = None
+    fields = _HEADER_FIELDS
+    for number, line in enumerate(lines, 2):
+        if not line:
+            continue
+        key, sep, value = line.partition('=')
+        if section is None:
+            if key == 'СекцияРасчСчет' or key == 'СекцияДокумент' or key == 'КонецФайла':
+                if not header_done:
+                    header_done = True
+                    yield header[GeneralSection]
+                    yield header[FilterSection]
+                if key == 'КонецФайла':
+                    return
+                if key == 'СекцияРасчСчет':
+                    section = BalancesSection()
+                    fields = _BALANCES_FIELDS
+                else:
+                    section = DocumentSection()
+                    section.__dict__['СекцияДокумент'] = value
+                    fields = _DOCUMENT_FIELDS
+                continue
+        elif key == 'КонецРасчСчет' or key == 'КонецДокумента':
+            if orders and fields is _DOCUMENT_FIELDS:
+                yield _document_to_payment_order(section)
+            else:
+                yield section
+            section = None
+            fields = _HEADER_FIELDS
+            continue
+        if not sep:
+            raise ValueError('Строка {number}: ожидалось "Ключ=Значение": {line!r}'.format(number=number, line=line))
+        cls, parse = fields.get(key, (GeneralSection, str))
+        target = section if section is not None else header[cls]
+        if value:
+            try:
+                value = parse(value)
+            except (ValueError, ArithmeticError):
+                raise ValueError('Строка {number}: значение поля {key} не разобрано: {value!r}'.format(
+                    number=number, key=key, value=value))
+        else:
+            value = None
+        target.__dict__[key] = value
+    raise ValueError('Файл обмена данными не завершён строкой КонецФайла')
@@ -0,0 +1,308 @@
+import datetime
+import json
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+import pytz
+
+from . import structs
+from .exceptions import UnexpectedValueModulbankException
+
+# Значение отсутствующего момента времени в колонках `executed` и `created` (как NaT в numpy)
+NULL_TIMESTAMP = -2 ** 63
+# Значение отсутствующей суммы в колонке `amount_with_commission`
+NULL_AMOUNT = -2 ** 63
+
+_CENTS = Decimal('.01')
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+_EPOCH_DAYS = 719163  # datetime.date(1970, 1, 1).toordinal()
+_DAYS_BEFORE_MONTH = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+# Коды перечислений в колонках: значение элемента перечисления, 0 - значение отсутствует
+_STATUS_CODES = {x.name: x.value for x in structs.OperationStatus}
+_CATEGORY_CODES = {x.name: x.value for x in structs.OperationCategory}
+_CURRENCY_CODES = {x.name: x.value for x in structs.Currency}
+
+
+def _kopecks(value) -> int:
+    """
+    Перевод суммы в копейки без промежуточного float (дробная часть копеек округляется половиной вверх).
+
+    :param value: Сумма: строка с числом из JSON, int, Decimal или float
+    :return: Сумма в копейках
+    :rtype: int
+    :raises ValueError: Если значение не является числом
+    """
+    if isinstance(value, int):
+        return value * 100
+    if isinstance(value, str):
+        units, sep, fraction = value.partition('.')
+        if len(fraction) <= 2 and units.lstrip('-').isdigit() and (not fraction or fraction.isdigit()):
+            return int(units) * 100 + int(fraction.ljust(2, '0')) * (-1 if units.startswith('-') else 1)
+        value = Decimal(value)
+    elif isinstance(value, float):
+        value = Decimal(repr(value))
+    return int((value * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _days_from_civil(year: int, month: int, day: int) -> int:
+    """
+    Количество дней от 01.01.1970 по григорианскому календарю.
+    """
+    y = year - 1
+    days = y * 365 + y // 4 - y // 100 + y // 400 + _DAYS_BEFORE_MONTH[month] + day
+    if month > 2 and (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)):
+        days += 1
+    return days - _EPOCH_DAYS
+
+
+@lru_cache(maxsize=16384)
+def _day_offset(year: int, month: int, day: int) -> int:
+    """
+    Смещение московского времени от UTC, действовавшее весь указанный день.
+
+    :return: Смещение в секундах, либо None, если в этот день смещение менялось
+    :rtype: int
+    """
+    tzinfo = structs._moscow_day_tzinfo(year, month, day)
+    if tzinfo is None:
+        return None
+    return int(datetime.datetime(year, month, day, tzinfo=tzinfo).utcoffset().total_seconds())
+
+
+def _timestamp(value: str) -> int:
+    """
+    Перевод момента времени API (по московскому времени) в микросекунды от начала эпохи UTC.
+
+    :param str value: Строка с моментом времени
+    :return: Микросекунды от 01.01.1970 00:00:00 UTC, либо :data:`NULL_TIMESTAMP`
+    :rtype: int
+    :raises ValueError: Если строка не соответствует формату
+    """
+    if not value:
+        return NULL_TIMESTAMP
+    m = structs._MOMENT_RE.match(value)
+    if m is not None:
+        year, month, day, hour, minute, second, fraction = m.groups()
+        year, month, day = int(year), int(month), int(day)
+        offset = _day_offset(year, month, day)
+        if offset is not None:
+            seconds = _days_from_civil(year, month, day) * 86400 + int(hour) * 3600 + int(minute) * 60 + int(
+                second) - offset
+            return seconds * 1000000 + (int(fraction.ljust(6, '0')) if fraction else 0)
+    moment = structs._localize(structs._parse_moment(value))
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+class OperationColumns:
+    """
+    Колоночное представление операций по счёту.
+
+    Каждое поле хранится отдельным массивом: суммы - в копейках (`array('q')`), моменты времени - в микросекундах от
+    начала эпохи UTC (`array('q')`), статусы, направления и валюты - кодами перечислений (`array('b')`, значение
+    элемента перечисления, 0 - значение отсутствует). Объекты :class:`Operation` не создаются, но JSON-текст страницы
+    разбирается стандартным `json.loads`, поэтому на время разбора страницы каждая операция представлена словарём;
+    после разбора в колонках остаются только массивы и строки идентификаторов, номеров и ИНН.
+
+    Массивы поддерживают протокол буфера, поэтому их можно без копирования передать, например, в
+    `numpy.frombuffer(columns.amount, dtype=numpy.int64)`.
+    """
+
+    def __init__(self):
+        self.__operation_id = []
+        self.__company_id = []
+        self.__doc_number = []
+        self.__contractor_inn = []
+        self.__amount = array('q')
+        self.__amount_with_commission = array('q')
+        self.__executed = array('q')
+        self.__created = array('q')
+        self.__status = array('b')
+        self.__category = array('b')
+        self.__currency = array('b')
+
+    def __len__(self):
+        return len(self.__operation_id)
+
+    def __str__(self):
+        return '<{name} rows={rows}>'.format(name=self.__class__.__name__, rows=len(self))
+
+    @property
+    def operation_id(self) -> list:
+        """
+        Системные идентификаторы транзакций
+
+        :rtype: list(str)
+        """
+        return self.__operation_id
+
+    @property
+    def company_id(self) -> list:
+        """
+        Системные идентификаторы компаний
+
+        :rtype: list(str)
+        """
+        return self.__company_id
+
+    @property
+    def doc_number(self) -> list:
+        """
+        Номера документов
+
+        :rtype: list(str)
+        """
+        return self.__doc_number
+
+    @property
+    def contractor_inn(self) -> list:
+        """
+        ИНН контрагентов
+
+        :rtype: list(str)
+        """
+        return self.__contractor_inn
+
+    @property
+    def amount(self) -> array:
+        """
+        Суммы платежей без учета банковской комиссии, в копейках
+
+        :rtype: array.array
+        """
+        return self.__amount
+
+    @property
+    def amount_with_commission(self) -> array:
+        """
+        Суммы платежей с учетом банковской комиссии, в копейках (:data:`NULL_AMOUNT`, если суммы нет)
+
+        :rtype: array.array
+        """
+        return self.__amount_with_commission
+
+    @property
+    def executed(self) -> array:
+        """
+        Даты проведения платежей, в микросекундах от начала эпохи UTC (:data:`NULL_TIMESTAMP`, если даты нет)
+
+        :rtype: array.array
+        """
+        return self.__executed
+
+    @property
+    def created(self) -> array:
+        """
+        Даты создания транзакций, в микросекундах от начала эпохи UTC (:data:`NULL_TIMESTAMP`, если даты нет)
+
+        :rtype: array.array
+        """
+        return self.__created
+
+    @property
+    def status(self) -> array:
+        """
+        Коды статусов транзакций (значения :class:`OperationStatus`)
+
+        :rtype: array.array
+        """
+        return self.__status
+
+    @property
+    def category(self) -> array:
+        """
+        Коды направлений платежей (значения :class:`OperationCategory`)
+
+        :rtype: array.array
+        """
+        return self.__category
+
+    @property
+    def currency(self) -> array:
+        """
+        Коды валют (значения :class:`Currency`)
+
+        :rtype: array.array
+        """
+        return self.__currency
+
+    def extend(self, page) -> None:
+        """
+        Добавление страницы истории операций.
+
+        :param page: Ответ `operation-history`: JSON-текст (str или bytes) либо уже разобранный массив объектов
+        :return: None
+        :rtype: None
+        :raises UnexpectedValueModulbankException: Если не удалось конвертировать значение
+        """
+        if isinstance(page, (bytes, bytearray)):
+            page = page.decode('utf-8')
+        if isinstance(page, str):
+            page = json.loads(page, parse_float=str)
+        for obj in page:
+            get = obj.get
+            try:
+                status = _STATUS_CODES[get('status')]
+                category = _CATEGORY_CODES[get('category')]
+                currency = _CURRENCY_CODES[get('currency')]
+            except KeyError:
+                raise UnexpectedValueModulbankException('Operation %s enum values' % get('id'))
+            try:
+                amount = _kopecks(get('amount'))
+                commission = get('amountWithCommission')
+                commission = NULL_AMOUNT if commission is None else _kopecks(commission)
+                executed = _timestamp(get('executed'))
+                created = _timestamp(get('created'))
+            except (ValueError, ArithmeticError, TypeError):
+                raise UnexpectedValueModulbankException('Operation %s amounts or dates' % get('id'))
+            self.__operation_id.append(get('id'))
+            self.__company_id.append(get('companyId'))
+            self.__doc_number.append(get('docNumber'))
+            self.__contractor_inn.append(get('contragentInn'))
+            self.__status.append(status)
+            self.__category.append(category)
+            self.__currency.append(currency)
+            self.__amount.append(amount)
+            self.__amount_with_commission.append(commission)
+            self.__executed.append(executed)
+            self.__created.append(created)
+
+    def sum_amount(self, category: structs.OperationCategory = None,
+                   status: structs.OperationStatus = None) -> Decimal:
+        """
+        Сумма платежей с отбором по направлению и статусу.
+
+        :param OperationCategory category: (опционально) Направление платежа
+        :param OperationStatus status: (опционально) Статус транзакции
+        :return: Сумма платежей в рублях (в валюте операций)
+        :rtype: Decimal
+        """
+        if category is None and status is None:
+            total = sum(self.__amount)
+        else:
+            category = category and category.value
+            status = status and status.value
+            total = sum(a for a, c, s in zip(self.__amount, self.__category, self.__status)
+                        if (category is None or c == category) and (status is None or s == status))
+        return (Decimal(total) / 100).quantize(_CENTS)
+
+
+def decode_operations(pages) -> OperationColumns:
+    """
+    Разбор страниц истории операций сразу в колоночное представление.
+
+    :param pages: Страницы ответа `operation-history`: JSON-тексты (str или bytes) либо разобранные массивы объектов.
+        Одна страница (текст или разобранный массив объектов) также допускается
+    :return: Колоночное представление операций
+    :rtype: OperationColumns
+    :raises UnexpectedValueModulbankException: Если не удалось конвертировать значение
+    """
+    columns = OperationColumns()
+    single = isinstance(pages, list) and pages and isinstance(pages[0], dict)
+    if single or isinstance(pages, (str, bytes, bytearray)):
+        pages = [pages]
+    for page in pages:
+        columns.extend(page)
+    return columns
@@ -0,0 +1,130 @@
+import codecs
+import json
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def json_decoder(content: bytes):
+    """
+    Разбор JSON-ответа API стандартной библиотекой.
+
+    Дробные числа (суммы) разбираются сразу в Decimal, минуя float. Используется клиентами по умолчанию.
+
+    :param bytes content: Тело ответа в UTF-8
+    :return: Разобранный JSON-объект
+    :raises ValueError: Если тело ответа не является корректным JSON
+    """
+    return json.loads(content.decode('utf-8'), parse_float=Decimal)
+
+
+def orjson_decoder(content: bytes):
+    """
+    Разбор JSON-ответа библиотекой `orjson`.
+
+    Заметно быстрее :func:`json_decoder` на больших страницах истории операций, но не заменяет его для любых сумм:
+    `orjson` разбирает дробные числа только в float. Структуры :mod:`modulbank.structs` переводят float в Decimal по
+    кратчайшему десятичному представлению, поэтому суммы до 15 значащих цифр (например, `9999999999999.99`) совпадают
+    с полученными :func:`json_decoder`, а у более длинных чисел младшие цифры искажаются. Если такие значения
+    возможны, используйте :func:`json_decoder`.
+
+    :param bytes content: Тело ответа в UTF-8
+    :return: Разобранный JSON-объект
+    :raises ValueError: Если тело ответа не является корректным JSON
+    :raises ImportError: Если `orjson` не установлен
+    """
+    if orjson is None:
+        raise ImportError('orjson не установлен')
+    return orjson.loads(content)
+
+
+# Самый быстрый из доступных декодеров. Если установлен `orjson`, дробные числа проходят через float: см. ограничение
+# точности у :func:`orjson_decoder`
+fast_decoder = orjson is not None and orjson_decoder or json_decoder
+
+
+# Состояния потокового разбора JSON-массива
+_BEFORE_ARRAY, _BEFORE_ITEM, _AFTER_ITEM, _AFTER_COMMA, _AFTER_ARRAY = range(5)
+_WHITESPACE = frozenset(' \t\n\r')
+
+
+def _parse_items(decoder: json.JSONDecoder, buf: str, state: int, final: bool) -> tuple:
+    """
+    Разбор всех закрытых элементов JSON-массива в накопленном тексте.
+
+    :param json.JSONDecoder decoder: Декодер элементов
+    :param str buf: Накопленный и ещё не разобранный текст
+    :param int state: Состояние разбора на начало текста
+    :param bool final: Является ли текст окончанием тела ответа
+    :return: Разобранные элементы, позиция первого неразобранного символа и новое состояние
+    :rtype: tuple(list, int, int)
+    :raises ValueError: Если текст не является корректным JSON-массивом
+    """
+    items = []
+    pos = 0
+    end = len(buf)
+    while True:
+        while pos < end and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos == end:
+            return items, pos, state
+        char = buf[pos]
+        if state == _BEFORE_ARRAY:
+            if char != '[':
+                raise ValueError('Ожидалось начало JSON-массива: позиция %d' % pos)
+            state = _BEFORE_ITEM
+            pos += 1
+        elif char == ']' and state in (_BEFORE_ITEM, _AFTER_ITEM):
+            state = _AFTER_ARRAY
+            pos += 1
+        elif state == _AFTER_ITEM:
+            if char != ',':
+                raise ValueError('Ожидалась запятая: позиция %d' % pos)
+            state = _AFTER_COMMA
+            pos += 1
+        elif state == _AFTER_ARRAY:
+            raise ValueError('Лишние данные после JSON-массива: позиция %d' % pos)
+        else:
+            try:
+                value, next_pos = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if final:
+                    raise
+                return items, pos, state
+            if next_pos == end and not final:
+                # Число могло оборваться на границе куска: дожидаемся следующего
+                return items, pos, state
+            items.append(value)
+            state = _AFTER_ITEM
+            pos = next_pos
+
+
+def iter_json_array(chunks, parse_float=Decimal):
+    """
+    Потоковый разбор JSON-массива верхнего уровня.
+
+    Тело ответа читается кусками, и каждый элемент массива выдаётся, как только закрывается его JSON-значение. В
+    памяти держится только ещё не разобранный хвост данных, а не всё тело ответа.
+
+    :param chunks: Куски тела ответа в UTF-8 (bytes), например, `requests.Response.iter_content()`
+    :param parse_float: Функция разбора дробных чисел. По умолчанию Decimal
+    :return: Генератор элементов массива
+    :raises ValueError: Если тело ответа не является корректным JSON-массивом
+    """
+    decoder = json.JSONDecoder(parse_float=parse_float)
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    state = _BEFORE_ARRAY
+    for chunk in chunks:
+        buf += utf8.decode(chunk)
+        items, pos, state = _parse_items(decoder, buf, state, final=False)
+        buf = buf[pos:]
+        yield from items
+    buf += utf8.decode(b'', final=True)
+    items, pos, state = _parse_items(decoder, buf, state, final=True)
+    yield from items
+    if state != _AFTER_ARRAY:
+        raise ValueError('JSON-массив не закрыт')
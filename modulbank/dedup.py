@@ -0,0 +1,129 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .structs import OperationStatus
+
+
+def _key(operation_id: str, status) -> tuple:
+    """
+    Ключ уведомления: идентификатор операции и имя статуса.
+    """
+    if isinstance(status, OperationStatus):
+        status = status.name
+    return operation_id, status
+
+
+class DedupStore:
+    """
+    Хранилище уже обработанных уведомлений для отсева повторных доставок.
+
+    Уведомление определяется парой (идентификатор операции, статус), поэтому смена статуса операции, например,
+    `SendToBank` → `Executed`, считается новым уведомлением. Пары хранятся в ограниченном LRU-словаре в памяти и,
+    если задан путь, в базе SQLite, которая переживает перезапуск процесса. Проверка повтора в памяти выполняется за
+    O(1), к базе обращаются только при промахе. Записи старше `retention` секунд забываются.
+    """
+
+    def __init__(self, path: str = None, max_size: int = 100000, retention: float = 7 * 86400, clock=time.time):
+        """
+        Конструктор
+
+        :param str path: (опционально) Путь к файлу базы SQLite. По умолчанию уведомления хранятся только в памяти
+        :param int max_size: Максимальное количество уведомлений в памяти
+        :param float retention: Время хранения уведомления в секундах
+        :param clock: (опционально) Часы, возвращающие секунды от начала эпохи
+        :raises ValueError: Если размер или время хранения не положительны
+        """
+        if max_size < 1:
+            raise ValueError('max_size должен быть не меньше 1: %d' % max_size)
+        if retention <= 0:
+            raise ValueError('retention должен быть положительным: %s' % retention)
+        self.__path = path
+        self.__max_size = max_size
+        self.__retention = retention
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__memory = OrderedDict()
+        self.__writes = 0
+        self.__conn = None
+        if path is not None:
+            self.__conn = sqlite3.connect(path, check_same_thread=False)
+            with self.__conn:
+                self.__conn.execute('CREATE TABLE IF NOT EXISTS webhook_dedup ('
+                                    'operation_id TEXT NOT NULL, status TEXT NOT NULL, seen_at REAL NOT NULL, '
+                                    'PRIMARY KEY (operation_id, status))')
+                self.__conn.execute('CREATE INDEX IF NOT EXISTS webhook_dedup_seen_at ON webhook_dedup (seen_at)')
+
+    def __str__(self):
+        return "<DedupStore path='{path}' max_size={max_size} retention={retention}>".format(
+            path=self.__path, max_size=self.__max_size, retention=self.__retention)
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__memory)
+
+    def close(self) -> None:
+        """
+        Закрытие базы.
+
+        :return: None
+        :rtype: None
+        """
+        if self.__conn is not None:
+            self.__conn.close()
+
+    def add(self, operation_id: str, status) -> bool:
+        """
+        Отметка уведомления обработанным с проверкой повтора.
+
+        :param str operation_id: Системный идентификатор транзакции
+        :param status: Статус транзакции, :class:`OperationStatus` или его имя
+        :return: True, если уведомление новое, False - если это повторная доставка
+        :rtype: bool
+        """
+        key = _key(operation_id, status)
+        now = self.__clock()
+        expired = now - self.__retention
+        with self.__lock:
+            seen_at = self.__memory.get(key)
+            if seen_at is not None and seen_at >= expired:
+                self.__memory.move_to_end(key)
+                return False
+            if seen_at is None and self.__conn is not None:
+                row = self.__conn.execute('SELECT seen_at FROM webhook_dedup WHERE operation_id = ? AND status = ?',
+                                          key).fetchone()
+                if row is not None and row[0] >= expired:
+                    self.__remember(key, row[0])
+                    return False
+            self.__remember(key, now)
+            if self.__conn is not None:
+                with self.__conn:
+                    self.__conn.execute('INSERT OR REPLACE INTO webhook_dedup (operation_id, status, seen_at) '
+                                        'VALUES (?, ?, ?)', key + (now,))
+                    self.__writes += 1
+                    if self.__writes % 1000 == 0:
+                        self.__conn.execute('DELETE FROM webhook_dedup WHERE seen_at < ?', (expired,))
+        return True
+
+    def discard(self, operation_id: str, status) -> None:
+        """
+        Удаление отметки, например, если обработка уведомления не удалась и его нужно принять при повторной доставке.
+
+        :param str operation_id: Системный идентификатор транзакции
+        :param status: Статус транзакции, :class:`OperationStatus` или его имя
+        :return: None
+        :rtype: None
+        """
+        key = _key(operation_id, status)
+        with self.__lock:
+            self.__memory.pop(key, None)
+            if self.__conn is not None:
+                with self.__conn:
+                    self.__conn.execute('DELETE FROM webhook_dedup WHERE operation_id = ? AND status = ?', key)
+
+    def __remember(self, key: tuple, seen_at: float) -> None:
+        self.__memory[key] = seen_at
+        self.__memory.move_to_end(key)
+        while len(self.__memory) > self.__max_size:
+            self.__memory.popitem(last=False)
@@ -0,0 +1,242 @@
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .client import ModulbankClient, SearchOptions
+from .structs import OperationCategory
+from .throttling import RetryPolicy, TokenBucket
+
+log = logging.getLogger(__name__)
+
+
+class PoolResult:
+    """
+    Результат выполнения запроса для всех токенов пула: результаты по успешным токенам и ошибки по остальным.
+    """
+
+    def __init__(self, results: dict, errors: dict):
+        """
+        Конструктор
+
+        :param dict results: Результаты по токенам
+        :param dict errors: Исключения по токенам, запросы которых завершились ошибкой
+        """
+        self.__results = results
+        self.__errors = errors
+
+    def __str__(self):
+        return '<{name} results={results} errors={errors}>'.format(name=self.__class__.__name__,
+                                                                   results=len(self.__results),
+                                                                   errors=len(self.__errors))
+
+    @property
+    def results(self) -> dict:
+        """
+        Результаты по токенам, запросы которых выполнены успешно
+
+        :rtype: dict
+        """
+        return self.__results
+
+    @property
+    def errors(self) -> dict:
+        """
+        Исключения по токенам, запросы которых завершились ошибкой
+
+        :rtype: dict(str, Exception)
+        """
+        return self.__errors
+
+    @property
+    def ok(self) -> bool:
+        """
+        Выполнены ли запросы для всех токенов
+
+        :rtype: bool
+        """
+        return not self.__errors
+
+
+class ModulbankClientPool:
+    """
+    Пул клиентов МодульБанка для многих компаний, каждая со своим токеном API.
+
+    Все клиенты пула выполняют запросы через одну HTTP-сессию с общим пулом соединений, а ограничение частоты
+    запросов у каждого токена своё. Методы пула выполняют запросы для всех токенов одновременно в пуле потоков; ошибка
+    одного токена (например, отозванного) не прерывает запросы остальных и возвращается в :attr:`PoolResult.errors`.
+    """
+
+    def __init__(self, tokens, sandbox_mode: bool = False, rate_limit: float = None, retry: RetryPolicy = None,
+                 workers: int = 8, pool_size: int = None, session: requests.Session = None, **kwargs):
+        """
+        Конструктор
+
+        :param tokens: Токены API
+        :param bool sandbox_mode: Нужен ли `режим песочницы`
+        :param float rate_limit: (опционально) Допустимое количество запросов в секунду для каждого токена
+        :param RetryPolicy retry: (опционально) Правила повтора запросов
+        :param int workers: Количество одновременно выполняемых запросов
+        :param int pool_size: (опционально) Размер общего пула соединений. По умолчанию равен `workers`
+        :param requests.Session session: (опционально) Внешняя HTTP-сессия. Пул не закрывает переданную сессию
+        :param kwargs: Прочие параметры :class:`ModulbankClient`, например, `page_size` или `lazy`
+        :raises ValueError: Если количество одновременно выполняемых запросов меньше 1
+        """
+        if workers < 1:
+            raise ValueError('workers должен быть не меньше 1: %d' % workers)
+        self.__workers = workers
+        self.__own_session = session is None
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or workers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.__session = session
+        self.__clients = {}
+        for token in tokens:
+            if token in self.__clients:
+                continue
+            self.__clients[token] = ModulbankClient(
+                token, sandbox_mode=sandbox_mode, session=session, retry=retry,
+                rate_limit=rate_limit and TokenBucket(rate_limit) or None, **kwargs)
+
+    def __str__(self):
+        return '<{name} tokens={tokens} workers={workers}>'.format(name=self.__class__.__name__,
+                                                                   tokens=len(self.__clients),
+                                                                   workers=self.__workers)
+
+    def __len__(self):
+        return len(self.__clients)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Закрытие соединений собственной HTTP-сессии пула.
+
+        :return: None
+        :rtype: None
+        """
+        if self.__own_session:
+            self.__session.close()
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        Общая HTTP-сессия клиентов пула
+
+        :rtype: requests.Session
+        """
+        return self.__session
+
+    @property
+    def tokens(self) -> list:
+        """
+        Токены API пула
+
+        :rtype: list(str)
+        """
+        return list(self.__clients)
+
+    def client(self, token: str) -> ModulbankClient:
+        """
+        Клиент пула для токена
+
+        :param str token: Токен API
+        :return: Клиент МодульБанка
+        :rtype: ModulbankClient
+        :raises KeyError: Если токена нет в пуле
+        """
+        return self.__clients[token]
+
+    def map(self, func, tokens=None) -> PoolResult:
+        """
+        Одновременное выполнение функции для клиентов пула.
+
+        :param func: Функция от :class:`ModulbankClient`, например, `lambda client: client.balance(account_id)`
+        :param tokens: (опционально) Токены, для клиентов которых выполняется функция. По умолчанию все токены пула
+        :return: Результаты функции и исключения по токенам
+        :rtype: PoolResult
+        """
+        tokens = list(self.__clients if tokens is None else tokens)
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            futures = [(token, executor.submit(func, self.__clients[token])) for token in tokens]
+        results = {}
+        errors = {}
+        for token, future in futures:
+            error = future.exception()
+            if error is None:
+                results[token] = future.result()
+            else:
+                log.warning('Request for one of the pool tokens failed: %r', error)
+                errors[token] = error
+        return PoolResult(results, errors)
+
+    def accounts(self) -> PoolResult:
+        """
+        Получение информации о компаниях для всех токенов
+
+        Метод в API: https://api.modulbank.ru/v1/account-info
+
+        :return: Массивы компаний :class:`Company` по токенам и ошибки по токенам
+        :rtype: PoolResult
+        """
+        return self.map(lambda client: client.accounts())
+
+    def operations(self, date_from: datetime.date, date_till: datetime.date = None,
+                   category: OperationCategory = None) -> PoolResult:
+        """
+        Получение операций по всем счетам всех токенов за период
+
+        Сначала для всех токенов одновременно запрашиваются счета, затем одновременно обходится история операций
+        каждого счёта. Операции всех счетов токена объединяются в один массив, упорядоченный по дате проведения.
+        Ошибка получения счетов или операций любого счёта токена переносит токен в :attr:`PoolResult.errors`.
+
+        Метод в API: https://api.modulbank.ru/v1/operation-history/<account_id>
+
+        :param datetime.date date_from: Начало периода (включительно)
+        :param datetime.date date_till: (опционально) Конец периода (включительно)
+        :param OperationCategory category: (опционально) Направление платежа
+        :return: Массивы операций :class:`Operation` по токенам и ошибки по токенам
+        :rtype: PoolResult
+        """
+        accounts = self.accounts()
+        errors = dict(accounts.errors)
+        tasks = [(token, account.account_id) for token, companies in accounts.results.items()
+                 for company in companies for account in company.bank_accounts]
+        search = SearchOptions(category=category, date_from=date_from, date_till=date_till)
+
+        def fetch(task):
+            token, account_id = task
+            return list(self.__clients[token].iter_operations(account_id, search))
+
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            futures = [(task[0], executor.submit(fetch, task)) for task in tasks]
+        results = {token: [] for token in accounts.results}
+        for token, future in futures:
+            error = future.exception()
+            if error is not None:
+                if token not in errors:
+                    log.warning('Operations for one of the pool tokens failed: %r', error)
+                    errors[token] = error
+                continue
+            results[token].extend(future.result())
+        for token in errors:
+            results.pop(token, None)
+        for ops in results.values():
+            ops.sort(key=_executed_key)
+        return PoolResult(results, errors)
+
+
+def _executed_key(op) -> tuple:
+    """
+    Ключ сортировки операций по дате проведения; операции без даты проведения - в конце по дате создания.
+    """
+    executed = op.executed
+    return (executed is None, executed or op.created)
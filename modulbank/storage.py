@@ -0,0 +1,228 @@
+import datetime
+import sqlite3
+import threading
+from decimal import ROUND_HALF_UP, Decimal
+
+from .structs import Operation, OperationCategory, OperationStatus
+
+# Колонки таблицы операций и соответствующие им поля JSON-объекта операции API МодульБанка
+_COLUMNS = [
+    ('operation_id', 'id'),
+    ('company_id', 'companyId'),
+    ('status', 'status'),
+    ('category', 'category'),
+    ('currency', 'currency'),
+    ('amount', 'amount'),
+    ('amount_with_commission', 'amountWithCommission'),
+    ('account_number', 'bankAccountNumber'),
+    ('purpose', 'paymentPurpose'),
+    ('executed', 'executed'),
+    ('created', 'created'),
+    ('doc_number', 'docNumber'),
+    ('contractor_name', 'contragentName'),
+    ('contractor_inn', 'contragentInn'),
+    ('contractor_kpp', 'contragentKpp'),
+    ('contractor_bank_account', 'contragentBankAccountNumber'),
+    ('contractor_bank_name', 'contragentBankName'),
+    ('contractor_bank_bic', 'contragentBankBic'),
+    ('kbk', 'kbk'),
+    ('oktmo', 'oktmo'),
+    ('payment_basis', 'paymentBasis'),
+    ('tax_code', 'taxCode'),
+    ('tax_doc_num', 'taxDocNum'),
+    ('tax_doc_date', 'taxDocDate'),
+    ('payer_status', 'payerStatus'),
+    ('uin', 'uin'),
+]
+_COLUMN_NAMES = ', '.join(x[0] for x in _COLUMNS)
+
+
+def _format_moment(value: datetime.datetime) -> str:
+    """
+    Форматирование момента времени операции так же, как его передаёт API МодульБанка.
+
+    :param datetime.datetime value: Момент времени
+    :return: Строка с моментом по московскому времени, либо None
+    :rtype: str
+    """
+    if value is None:
+        return None
+    if value.microsecond:
+        return value.strftime('%Y-%m-%dT%H:%M:%S.%f')
+    return value.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _to_kopecks(amount) -> int:
+    """
+    Перевод суммы в рублях в целое количество копеек для сравнения в базе.
+
+    Доли копейки округляются половиной вверх, одинаково для сохраняемых сумм и для границ поиска.
+
+    :param amount: Сумма в рублях: Decimal, int или строка
+    :return: Сумма в копейках
+    :rtype: int
+    """
+    return int((Decimal(amount) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def _operation_to_row(op: Operation, account_id: str) -> tuple:
+    """
+    Преобразование операции в строку таблицы.
+
+    :param Operation op: Операция по счёту
+    :param str account_id: Системный идентификатор счёта
+    :return: Значения колонок: идентификатор счёта, сумма в копейках и колонки из `_COLUMNS`
+    :rtype: tuple
+    """
+    contractor = op.contractor
+    bank = contractor and contractor.bank
+    tax = op.budgetary_and_tax
+    return (
+        account_id, _to_kopecks(op.amount),
+        op.operation_id, op.company_id, op.status.name, op.category.name, op.currency.name,
+        str(op.amount), op.amount_with_commission is not None and str(op.amount_with_commission) or None,
+        op.account_number, op.purpose, _format_moment(op.executed), _format_moment(op.created), op.doc_number,
+        contractor and contractor.name, contractor and contractor.inn, contractor and contractor.kpp,
+        bank and bank.account, bank and bank.name, bank and bank.bic,
+        tax and tax.kbk, tax and tax.oktmo, tax and tax.payment_basis, tax and tax.tax_code, tax and tax.tax_doc_num,
+        tax and tax.tax_doc_date, tax and tax.payer_status, tax and tax.uin,
+    )
+
+
+def _row_to_operation(row: tuple) -> Operation:
+    """
+    Восстановление операции из строки таблицы.
+
+    :param tuple row: Значения колонок из `_COLUMNS`
+    :return: Операция по счёту
+    :rtype: Operation
+    """
+    return Operation({key: value for (_, key), value in zip(_COLUMNS, row) if value is not None})
+
+
+class OperationStore:
+    """
+    Локальное хранилище операций в SQLite с индексами по дате проведения, ИНН контрагента, направлению и статусу.
+
+    Операции хранятся по системному идентификатору: повторное сохранение операции обновляет запись. Кроме точной
+    суммы в колонке `amount` хранится индексированная сумма в целых копейках, по которой :meth:`query` ищет по сумме.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        """
+        Конструктор
+
+        :param str path: Путь к файлу базы SQLite. По умолчанию база в памяти
+        """
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(path, check_same_thread=False)
+        with self.__conn:
+            self.__conn.execute('CREATE TABLE IF NOT EXISTS operations (account_id TEXT, amount_kopecks INTEGER, '
+                                '{columns}, PRIMARY KEY (operation_id))'.format(columns=_COLUMN_NAMES))
+            for column in ('executed', 'contractor_inn', 'category', 'status', 'account_id', 'amount_kopecks'):
+                self.__conn.execute('CREATE INDEX IF NOT EXISTS operations_{column} ON operations ({column})'.format(
+                    column=column))
+
+    def __str__(self):
+        return "<OperationStore path='{path}'>".format(path=self.__path)
+
+    def __len__(self):
+        with self.__lock:
+            return self.__conn.execute('SELECT COUNT(*) FROM operations').fetchone()[0]
+
+    def close(self) -> None:
+        """
+        Закрытие базы.
+
+        :return: None
+        :rtype: None
+        """
+        self.__conn.close()
+
+    def save(self, operations, account_id: str = None) -> int:
+        """
+        Сохранение операций.
+
+        :param operations: Операции, представленные структурой :class:`Operation`
+        :param str account_id: (опционально) Системный идентификатор счёта операций
+        :return: Количество сохранённых операций
+        :rtype: int
+        """
+        rows = [_operation_to_row(op, account_id) for op in operations]
+        with self.__lock, self.__conn:
+            self.__conn.executemany(
+                'INSERT OR REPLACE INTO operations (account_id, amount_kopecks, {columns}) VALUES ({values})'.format(
+                    columns=_COLUMN_NAMES, values=', '.join('?' * (len(_COLUMNS) + 2))), rows)
+        return len(rows)
+
+    def get(self, operation_id: str) -> Operation:
+        """
+        Получение операции по идентификатору.
+
+        :param str operation_id: Системный идентификатор транзакции
+        :return: Операция, либо None, если её нет в хранилище
+        :rtype: Operation
+        """
+        with self.__lock:
+            row = self.__conn.execute('SELECT {columns} FROM operations WHERE operation_id = ?'.format(
+                columns=_COLUMN_NAMES), (operation_id,)).fetchone()
+        return row and _row_to_operation(row) or None
+
+    def query(self, account_id: str = None, date_from: datetime.date = None, date_till: datetime.date = None,
+              inn: str = None, category: OperationCategory = None, status: OperationStatus = None,
+              amount_min=None, amount_max=None, limit: int = None) -> list:
+        """
+        Поиск операций в хранилище без обращения к API.
+
+        Все критерии необязательны и объединяются по "И". Результат упорядочен по дате проведения.
+
+        :param str account_id: Системный идентификатор счёта
+        :param datetime.date date_from: Дата проведения операции от (включительно)
+        :param datetime.date date_till: Дата проведения операции до (включительно)
+        :param str inn: ИНН контрагента
+        :param OperationCategory category: Направление платежа
+        :param OperationStatus status: Статус транзакции
+        :param Decimal amount_min: Минимальная сумма платежа (включительно). Суммы сравниваются с точностью до
+            копейки: доли копейки у сумм и границ округляются половиной вверх
+        :param Decimal amount_max: Максимальная сумма платежа (включительно)
+        :param int limit: Максимальное количество операций
+        :return: Массив операций, представленных структурой :class:`Operation`
+        :rtype: list(Operation)
+        """
+        where = []
+        params = []
+        if account_id is not None:
+            where.append('account_id = ?')
+            params.append(account_id)
+        if date_from is not None:
+            where.append('executed >= ?')
+            params.append(date_from.strftime('%Y-%m-%d'))
+        if date_till is not None:
+            where.append('executed < ?')
+            params.append((date_till + datetime.timedelta(days=1)).strftime('%Y-%m-%d'))
+        if inn is not None:
+            where.append('contractor_inn = ?')
+            params.append(inn)
+        if category is not None:
+            where.append('category = ?')
+            params.append(category.name)
+        if status is not None:
+            where.append('status = ?')
+            params.append(status.name)
+        if amount_min is not None:
+            where.append('amount_kopecks >= ?')
+            params.append(_to_kopecks(amount_min))
+        if amount_max is not None:
+            where.append('amount_kopecks <= ?')
+            params.append(_to_kopecks(amount_max))
+        sql = 'SELECT {columns} FROM operations'.format(columns=_COLUMN_NAMES)
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY executed, operation_id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self.__lock:
+            rows = self.__conn.execute(sql, params).fetchall()
+        return [_row_to_operation(row) for row in rows]
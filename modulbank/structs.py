@@ -1,10 +1,14 @@
 import datetime
 import hashlib
+import hmac
+import re
 from decimal import Decimal, InvalidOperation
 from enum import Enum
+from functools import lru_cache
 
 import pytz
 
+from .decoders import json_decoder
 from .exceptions import UnexpectedValueModulbankException
 
 # noinspection PyArgumentList
@@ -19,6 +23,111 @@ OperationStatus = Enum('OperationStatus', 'SendToBank Executed RejectByBank Canc
 # noinspection PyArgumentList
 OperationCategory = Enum('OperationCategory', 'Debet Credit')
 
+# Словари разбора строковых значений API в перечисления (быстрее, чем Enum[...])
+_ACCOUNT_CATEGORIES = {x.name: x for x in AccountCategory}
+_CURRENCIES = {x.name: x for x in Currency}
+_ACCOUNT_STATUSES = {x.name: x for x in AccountStatus}
+_OPERATION_STATUSES = {x.name: x for x in OperationStatus}
+_OPERATION_CATEGORIES = {x.name: x for x in OperationCategory}
+
+_MOSCOW_TZ = pytz.timezone('Europe/Moscow')
+_MOMENT_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?\Z', re.ASCII)
+
+
+def _parse_moment(value: str, fractional: bool = True) -> datetime.datetime:
+    """
+    Разбор момента времени в формате API МодульБанка (`2016-04-01T00:00:00` или `2016-04-01T00:00:00.123`).
+
+    Значения фиксированного формата разбираются заранее скомпилированным регулярным выражением, остальные -
+    через :meth:`datetime.datetime.strptime`, как и раньше.
+
+    :param str value: Строка с моментом времени
+    :param bool fractional: Допустимы ли доли секунды
+    :return: Момент времени без часового пояса
+    :rtype: datetime.datetime
+    :raises ValueError: Если строка не соответствует формату
+    """
+    m = _MOMENT_RE.match(value)
+    if m is None or (m.group(7) and not fractional):
+        try:
+            return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S')
+        except ValueError:
+            if not fractional:
+                raise
+            return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f')
+    year, month, day, hour, minute, second, fraction = m.groups()
+    return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                             int(fraction.ljust(6, '0')) if fraction else 0)
+
+
+@lru_cache(maxsize=16384)
+def _moscow_day_tzinfo(year: int, month: int, day: int) -> datetime.tzinfo:
+    """
+    Часовой пояс Москвы, действовавший весь указанный день.
+
+    :return: Часовой пояс с фиксированным смещением, либо None, если в этот день смещение менялось
+    :rtype: datetime.tzinfo
+    """
+    first = _MOSCOW_TZ.localize(datetime.datetime(year, month, day))
+    last = _MOSCOW_TZ.localize(datetime.datetime(year, month, day, 23, 59, 59))
+    return first.tzinfo if first.tzinfo is last.tzinfo else None
+
+
+def _localize(value: datetime.datetime) -> datetime.datetime:
+    """
+    Привязка момента времени к московскому часовому поясу, как `pytz.timezone('Europe/Moscow').localize`.
+
+    :param datetime.datetime value: Момент времени без часового пояса
+    :return: Момент времени по московскому времени
+    :rtype: datetime.datetime
+    """
+    tzinfo = _moscow_day_tzinfo(value.year, value.month, value.day)
+    if tzinfo is None:
+        return _MOSCOW_TZ.localize(value)
+    return value.replace(tzinfo=tzinfo)
+
+
+def _to_decimal(value) -> Decimal:
+    """
+    Перевод числа из JSON в Decimal.
+
+    Значения, уже разобранные в Decimal, возвращаются как есть; float переводится по кратчайшему десятичному
+    представлению (`0.1` -> `Decimal('0.1')`), а не по точному двоичному значению. Так восстанавливаются числа до 15
+    значащих цифр; более длинные искажены ещё при разборе в float.
+
+    :param value: Число: Decimal, float, int или строка
+    :return: Число
+    :rtype: Decimal
+    :raises InvalidOperation: Если строка не является числом
+    """
+    if value.__class__ is Decimal:
+        return value
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def _slots_str(obj, names: dict = None, cls: type = None) -> str:
+    """
+    Строковое представление структуры с `__slots__` в том же виде, что и у структур со словарём атрибутов.
+
+    :param obj: Структура
+    :param dict names: (опционально) Подписи полей
+    :param type cls: (опционально) Класс, объявивший выводимые поля. По умолчанию класс структуры
+    :return: Строковое представление
+    :rtype: str
+    """
+    cls = cls or obj.__class__
+    items = []
+    for slot in cls.__slots__:
+        key = slot.lstrip('_')
+        try:
+            value = getattr(obj, '_%s%s' % (cls.__name__, slot))
+        except AttributeError:
+            continue
+        items.append('%s:%s' % (names and names.get(key, key) or key, str(value)))
+    return ('<%s ' % obj.__class__.__name__) + ' '.join(items) + '>'
+
 
 class Company:
     """
@@ -76,6 +185,8 @@ class Bank:
     Реквизиты банка (из платежных реквизитов организации).
     """
 
+    __slots__ = ('__bic', '__inn', '__kpp', '__corr_acc', '__name')
+
     def __init__(self, obj: dict):
         """
         Конструктор
@@ -89,11 +200,7 @@ class Bank:
         self.__name = obj.get('bankName')
 
     def __str__(self):
-        names = {'bic': 'БИК', 'inn': 'ИНН', 'kpp': 'КПП', 'corr_acc': 'к/сч'}
-        return ('<%s ' % self.__class__.__name__) + ' '.join(
-            ['%s:%s' % (names.get(k.replace('_' + self.__class__.__name__, '').lstrip('_'),
-                                  k.replace('_' + self.__class__.__name__, '').lstrip('_')), str(self.__dict__[k]))
-             for k in self.__dict__]) + '>'
+        return _slots_str(self, {'bic': 'БИК', 'inn': 'ИНН', 'kpp': 'КПП', 'corr_acc': 'к/сч'})
 
     @property
     def bic(self) -> str:
@@ -151,6 +258,9 @@ class BankAccount:
     Счёт компании-пользователя МодульБанка.
     """
 
+    __slots__ = ('__account_id', '__name', '__balance', '__begin_date', '__category', '__currency', '__number',
+                 '__status', '__bank')
+
     def __init__(self, obj: dict):
         """
         Конструктор
@@ -160,35 +270,31 @@ class BankAccount:
         self.__account_id = obj.get('id')
         self.__name = obj.get('accountName')
         try:
-            self.__balance = Decimal(obj.get('balance'))
+            self.__balance = _to_decimal(obj.get('balance'))
         except InvalidOperation:
             raise UnexpectedValueModulbankException('Balance %s as Decimal' % obj.get('balance'))
         try:
-            self.__begin_date = obj.get('beginDate') and datetime.datetime.strptime(obj.get('beginDate'),
-                                                                                    '%Y-%m-%dT%H:%M:%S').date() or None
+            self.__begin_date = obj.get('beginDate') and _parse_moment(obj.get('beginDate'), False).date() or None
         except ValueError:
             raise UnexpectedValueModulbankException('BeginDate %s as datetime.date' % obj.get('beginDate'))
-        try:
-            self.__category = AccountCategory[obj.get('category')]
-        except KeyError:
+        self.__category = _ACCOUNT_CATEGORIES.get(obj.get('category'))
+        if self.__category is None:
             raise UnexpectedValueModulbankException('AccountCategory %s as AccountCategory' % obj.get('category'))
-        try:
-            self.__currency = Currency[obj.get('currency')]
-        except KeyError:
+        self.__currency = _CURRENCIES.get(obj.get('currency'))
+        if self.__currency is None:
             raise UnexpectedValueModulbankException('Currency %s as Currency' % obj.get('currency'))
         self.__number = obj.get('number')
-        try:
-            self.__status = AccountStatus[obj.get('status')]
-        except KeyError:
+        self.__status = _ACCOUNT_STATUSES.get(obj.get('status'))
+        if self.__status is None:
             raise UnexpectedValueModulbankException('AccountStatus %s as AccountStatus' % obj.get('status'))
         if 'bankBic' in obj or 'bankInn' in obj or 'bankKpp' in obj or 'bankCorrespondentAccount' in obj \
                 or 'bankName' in obj:
             self.__bank = Bank(obj)
+        else:
+            self.__bank = None
 
     def __str__(self):
-        return ('<%s ' % self.__class__.__name__) + ' '.join(
-            ['%s:%s' % (k.replace('_' + self.__class__.__name__, '').lstrip('_'), str(self.__dict__[k]))
-             for k in self.__dict__]) + '>'
+        return _slots_str(self)
 
     @property
     def account_id(self) -> str:
@@ -312,6 +418,8 @@ class BankShort:
     Номер счета, Название банка, БИК и корр. счёт.
     """
 
+    __slots__ = ('__account', '__name', '__bic', '__corr_acc')
+
     def __init__(self, account: str = None, name: str = None, bic: str = None, corr_acc: str = None):
         """
         Конструктор
@@ -327,9 +435,7 @@ class BankShort:
         self.__corr_acc = corr_acc
 
     def __str__(self):
-        return ('<%s ' % self.__class__.__name__) + ' '.join(
-            ['%s:%s' % (k.replace('_' + self.__class__.__name__, '').lstrip('_'), str(self.__dict__[k]))
-             for k in self.__dict__]) + '>'
+        return _slots_str(self)
 
     @property
     def account(self) -> str:
@@ -377,6 +483,8 @@ class Contractor:
     Контрагент в операции.
     """
 
+    __slots__ = ('__name', '__inn', '__kpp', '__bank')
+
     def __init__(self, obj: dict = None, name: str = None, inn: str = None, kpp: str = None, bank: BankShort = None):
         """
         Конструктор
@@ -395,6 +503,8 @@ class Contractor:
                 self.__bank = BankShort(account=obj.get('contragentBankAccountNumber'),
                                         name=obj.get('contragentBankName'),
                                         bic=obj.get('contragentBankBic'))
+            else:
+                self.__bank = None
         else:
             self.__name = name
             self.__inn = inn
@@ -402,9 +512,7 @@ class Contractor:
             self.__bank = bank
 
     def __str__(self):
-        return ('<%s ' % self.__class__.__name__) + ' '.join(
-            ['%s:%s' % (k.replace('_' + self.__class__.__name__, '').lstrip('_'), str(self.__dict__[k]))
-             for k in self.__dict__]) + '>'
+        return _slots_str(self)
 
     @property
     def name(self) -> str:
@@ -452,6 +560,9 @@ class BudgetaryAndTax:
     Параметры бюджетных и налоговых платежей в операции.
     """
 
+    __slots__ = ('__kbk', '__oktmo', '__payment_basis', '__tax_code', '__tax_doc_num', '__tax_doc_date',
+                 '__payer_status', '__uin')
+
     def __init__(self, obj: dict):
         """
         Конструктор
@@ -468,9 +579,7 @@ class BudgetaryAndTax:
         self.__uin = obj.get('uin')
 
     def __str__(self):
-        return ('<%s ' % self.__class__.__name__) + ' '.join(
-            ['%s:%s' % (k.replace('_' + self.__class__.__name__, '').lstrip('_'), str(self.__dict__[k]))
-             for k in self.__dict__]) + '>'
+        return _slots_str(self)
 
     @property
     def kbk(self) -> str:
@@ -553,11 +662,87 @@ class BudgetaryAndTax:
         return self.__uin
 
 
+_BUDGETARY_AND_TAX_KEYS = ('kbk', 'oktmo', 'paymentBasis', 'taxCode', 'taxDocNum', 'taxDocDate', 'payerStatus', 'uin')
+# Общий неизменяемый экземпляр для операций, в которых все параметры бюджетных и налоговых платежей пусты
+_EMPTY_BUDGETARY_AND_TAX = BudgetaryAndTax({})
+
+
+# Разбор отдельных полей операции. Используется конструктором Operation и ленивыми полями LazyOperation
+def _operation_status(obj: dict) -> OperationStatus:
+    value = _OPERATION_STATUSES.get(obj.get('status'))
+    if value is None:
+        raise UnexpectedValueModulbankException('OperationStatus %s as OperationStatus' % obj.get('status'))
+    return value
+
+
+def _operation_category(obj: dict) -> OperationCategory:
+    value = _OPERATION_CATEGORIES.get(obj.get('category'))
+    if value is None:
+        raise UnexpectedValueModulbankException('OperationCategory %s as OperationCategory' % obj.get('category'))
+    return value
+
+
+def _operation_currency(obj: dict) -> Currency:
+    value = _CURRENCIES.get(obj.get('currency'))
+    if value is None:
+        raise UnexpectedValueModulbankException('Currency %s as Currency' % obj.get('currency'))
+    return value
+
+
+def _operation_amount(obj: dict) -> Decimal:
+    try:
+        return _to_decimal(obj.get('amount'))
+    except InvalidOperation:
+        raise UnexpectedValueModulbankException('Amount %s as Decimal' % obj.get('amount'))
+
+
+def _operation_amount_with_commission(obj: dict) -> Decimal:
+    if obj.get('amountWithCommission') is None:
+        return None
+    try:
+        return _to_decimal(obj.get('amountWithCommission'))
+    except InvalidOperation:
+        raise UnexpectedValueModulbankException('AmountWithCommission %s as Decimal' % obj.get('amountWithCommission'))
+
+
+def _operation_executed(obj: dict) -> datetime.datetime:
+    try:
+        return obj.get('executed') and _localize(_parse_moment(obj.get('executed'), False)) or None
+    except ValueError:
+        raise UnexpectedValueModulbankException('Executed %s as datetime.datetime' % obj.get('executed'))
+
+
+def _operation_created(obj: dict) -> datetime.datetime:
+    try:
+        return obj.get('created') and _localize(_parse_moment(obj.get('created'))) or None
+    except ValueError:
+        raise UnexpectedValueModulbankException('Created %s as datetime.datetime' % obj.get('created'))
+
+
+def _operation_contractor(obj: dict) -> Contractor:
+    if 'contragentName' in obj or 'contragentInn' in obj or 'contragentKpp' in obj \
+            or 'contragentBankAccountNumber' in obj or 'contragentBankName' in obj or 'contragentBankBic' in obj:
+        return Contractor(obj)
+    return None
+
+
+def _operation_budgetary_and_tax(obj: dict) -> BudgetaryAndTax:
+    if any(obj.get(x) is not None for x in _BUDGETARY_AND_TAX_KEYS):
+        return BudgetaryAndTax(obj)
+    if any(x in obj for x in _BUDGETARY_AND_TAX_KEYS):
+        return _EMPTY_BUDGETARY_AND_TAX
+    return None
+
+
 class Operation:
     """
     Операция по счёту
     """
 
+    __slots__ = ('__operation_id', '__company_id', '__status', '__category', '__currency', '__amount',
+                 '__amount_with_commission', '__account_number', '__purpose', '__executed', '__created', '__doc_number',
+                 '__contractor', '__budgetary_and_tax')
+
     def __init__(self, obj: dict):
         """
         Конструктор
@@ -566,61 +751,21 @@ class Operation:
         """
         self.__operation_id = obj.get('id')
         self.__company_id = obj.get('companyId')
-        try:
-            self.__status = OperationStatus[obj.get('status')]
-        except KeyError:
-            raise UnexpectedValueModulbankException('OperationStatus %s as OperationStatus' % obj.get('status'))
-        try:
-            self.__category = OperationCategory[obj.get('category')]
-        except KeyError:
-            raise UnexpectedValueModulbankException('OperationCategory %s as OperationCategory' % obj.get('category'))
-        try:
-            self.__currency = Currency[obj.get('currency')]
-        except KeyError:
-            raise UnexpectedValueModulbankException('Currency %s as Currency' % obj.get('currency'))
-        try:
-            self.__amount = Decimal(obj.get('amount'))
-        except InvalidOperation:
-            raise UnexpectedValueModulbankException('Amount %s as Decimal' % obj.get('amount'))
-        if obj.get('amountWithCommission') is None:
-            self.__amount_with_commission = None
-        else:
-            try:
-                self.__amount_with_commission = Decimal(obj.get('amountWithCommission'))
-            except InvalidOperation:
-                raise UnexpectedValueModulbankException(
-                    'AmountWithCommission %s as Decimal' % obj.get('amountWithCommission'))
+        self.__status = _operation_status(obj)
+        self.__category = _operation_category(obj)
+        self.__currency = _operation_currency(obj)
+        self.__amount = _operation_amount(obj)
+        self.__amount_with_commission = _operation_amount_with_commission(obj)
         self.__account_number = obj.get('bankAccountNumber')
         self.__purpose = obj.get('paymentPurpose')
-        moscow_tz = pytz.timezone('Europe/Moscow')
-        try:
-            self.__executed = obj.get('executed') and moscow_tz.localize(
-                datetime.datetime.strptime(obj.get('executed'), '%Y-%m-%dT%H:%M:%S')) or None
-        except ValueError:
-            raise UnexpectedValueModulbankException('Executed %s as datetime.datetime' % obj.get('executed'))
-        try:
-            self.__created = obj.get('created') and moscow_tz.localize(
-                datetime.datetime.strptime(obj.get('created'), '%Y-%m-%dT%H:%M:%S')) or None
-        except ValueError:
-            try:
-                self.__created = obj.get('created') and moscow_tz.localize(
-                    datetime.datetime.strptime(obj.get('created'), '%Y-%m-%dT%H:%M:%S.%f')) or None
-            except ValueError:
-                raise UnexpectedValueModulbankException('Created %s as datetime.datetime' % obj.get('created'))
+        self.__executed = _operation_executed(obj)
+        self.__created = _operation_created(obj)
         self.__doc_number = obj.get('docNumber')
-        if 'contragentName' in obj or 'contragentInn' in obj or 'contragentKpp' in obj \
-                or 'contragentBankAccountNumber' in obj or 'contragentBankName' in obj or 'contragentBankBic' in obj:
-            self.__contractor = Contractor(obj)
-        if 'kbk' in obj or 'oktmo' in obj or 'paymentBasis' in obj or 'taxCode' in obj or 'taxDocNum' in obj \
-                or 'taxDocDate' in obj or 'payerStatus' in obj or '	' in obj:
-            self.__budgetary_and_tax = BudgetaryAndTax(obj)
-        else:
-            self.__budgetary_and_tax = None
+        self.__contractor = _operation_contractor(obj)
+        self.__budgetary_and_tax = _operation_budgetary_and_tax(obj)
 
     def __str__(self):
-        return ('<%s ' % self.__class__.__name__) + ' '.join(
-            ['%s:%s' % (k.replace('_' + self.__class__.__name__, '').lstrip('_'), str(self.__dict__[k]))
-             for k in self.__dict__]) + '>'
+        return _slots_str(self)
 
     @property
     def operation_id(self) -> str:
@@ -783,6 +928,91 @@ class Operation:
         return self.__budgetary_and_tax
 
 
+class _LazyField:
+    """
+    Поле :class:`LazyOperation`: разбирается из JSON-объекта при первом чтении и запоминается в слоте
+    :class:`Operation`.
+    """
+
+    def __init__(self, name: str, parse):
+        self.__slot = '_Operation__' + name
+        self.__parse = parse
+        self.__doc__ = getattr(Operation, name).__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.__slot)
+        except AttributeError:
+            value = self.__parse(instance.raw)
+            setattr(instance, self.__slot, value)
+            return value
+
+
+class LazyOperation(Operation):
+    """
+    Операция по счёту с отложенным разбором.
+
+    Хранит JSON-объект операции и разбирает каждое поле при первом обращении к нему. Ошибки в данных поля
+    обнаруживаются только при чтении этого поля; для проверки всех полей сразу служит :meth:`validate`.
+    """
+
+    __slots__ = ('__obj',)
+
+    def __init__(self, obj: dict):
+        """
+        Конструктор
+
+        :param dict obj: JSON-объект операции по счёту из API МодульБанка.
+        """
+        self.__obj = obj
+
+    def __str__(self):
+        self.validate()
+        return _slots_str(self, cls=Operation)
+
+    @property
+    def raw(self) -> dict:
+        """
+        JSON-объект операции
+
+        :return: JSON-объект операции по счёту из API МодульБанка
+        :rtype: dict
+        """
+        return self.__obj
+
+    def validate(self) -> 'LazyOperation':
+        """
+        Разбор и проверка всех полей сразу, как в конструкторе :class:`Operation`.
+
+        :return: Эта же операция
+        :rtype: LazyOperation
+        :raises UnexpectedValueModulbankException: Если не удалось конвертировать значение какого-либо поля.
+        """
+        for name in _LAZY_OPERATION_FIELDS:
+            getattr(self, name)
+        return self
+
+    operation_id = _LazyField('operation_id', lambda obj: obj.get('id'))
+    company_id = _LazyField('company_id', lambda obj: obj.get('companyId'))
+    status = _LazyField('status', _operation_status)
+    category = _LazyField('category', _operation_category)
+    currency = _LazyField('currency', _operation_currency)
+    amount = _LazyField('amount', _operation_amount)
+    amount_with_commission = _LazyField('amount_with_commission', _operation_amount_with_commission)
+    account_number = _LazyField('account_number', lambda obj: obj.get('bankAccountNumber'))
+    purpose = _LazyField('purpose', lambda obj: obj.get('paymentPurpose'))
+    executed = _LazyField('executed', _operation_executed)
+    created = _LazyField('created', _operation_created)
+    doc_number = _LazyField('doc_number', lambda obj: obj.get('docNumber'))
+    contractor = _LazyField('contractor', _operation_contractor)
+    budgetary_and_tax = _LazyField('budgetary_and_tax', _operation_budgetary_and_tax)
+
+
+_LAZY_OPERATION_FIELDS = [x.lstrip('_') for x in Operation.__slots__]
+
+
 class PaymentOrder:
     """
     Платёжное поручение
@@ -921,14 +1151,42 @@ class NotifyRequest:
         :param dict obj: JSON-объект уведомления о произошедшей транзакции из API МодульБанка.
         """
         self.__inn = obj.get('companyInn', '')
-        self.__kpp = obj.get('contragentKpp', '')
-        self.__operation = Operation(obj.get('operation'))
+        self.__kpp = obj.get('companyKpp', obj.get('contragentKpp', ''))
+        self.__raw_operation = obj.get('operation')
+        self.__operation = Operation(self.__raw_operation)
         self.__signature = obj.get('SHA1Hash')
 
+    @classmethod
+    def from_bytes(cls, content: bytes, decoder=None):
+        """
+        Разбор уведомления прямо из тела запроса.
+
+        Тело разбирается один раз, а :class:`Operation` создаётся только при первом обращении к :attr:`operation`,
+        поэтому проверка подписи (:meth:`check_signature`) и выбор компании по :attr:`inn` и :attr:`kpp` обходятся
+        без разбора полей операции.
+
+        :param bytes content: Тело запроса (JSON в UTF-8)
+        :param decoder: (опционально) Функция разбора JSON, например, :func:`modulbank.decoders.orjson_decoder`. По
+            умолчанию :func:`modulbank.decoders.json_decoder`
+        :return: Уведомление о транзакции
+        :rtype: NotifyRequest
+        :raises ValueError: Если тело запроса не является уведомлением
+        """
+        obj = (decoder or json_decoder)(content)
+        if not isinstance(obj, dict) or not isinstance(obj.get('operation'), dict):
+            raise ValueError('Тело запроса не является уведомлением о транзакции')
+        res = cls.__new__(cls)
+        res.__inn = obj.get('companyInn', '')
+        res.__kpp = obj.get('companyKpp', obj.get('contragentKpp', ''))
+        res.__raw_operation = obj['operation']
+        res.__operation = None
+        res.__signature = obj.get('SHA1Hash')
+        return res
+
     def __str__(self):
-        return ('<%s ' % self.__class__.__name__) + ' '.join(
-            ['%s:%s' % (k.replace('_' + self.__class__.__name__, '').lstrip('_'), str(self.__dict__[k]))
-             for k in self.__dict__]) + '>'
+        return '<{name} inn:{inn} kpp:{kpp} operation:{operation} signature:{signature}>'.format(
+            name=self.__class__.__name__, inn=self.__inn, kpp=self.__kpp, operation=str(self.operation),
+            signature=self.__signature)
 
     @property
     def inn(self) -> str:
@@ -957,9 +1215,22 @@ class NotifyRequest:
 
         :return: Операция по счёту
         :rtype: Operation
+        :raises UnexpectedValueModulbankException: Если не удалось конвертировать значение поля операции
         """
+        if self.__operation is None:
+            self.__operation = Operation(self.__raw_operation)
         return self.__operation
 
+    @property
+    def operation_id(self) -> str:
+        """
+        Системный идентификатор транзакции, без разбора остальных полей операции
+
+        :return: Системный идентификатор транзакции
+        :rtype: str
+        """
+        return self.__raw_operation.get('id')
+
     @property
     def signature(self) -> str:
         """
@@ -973,12 +1244,14 @@ class NotifyRequest:
 
     def check_signature(self, token) -> bool:
         """
-        Проверка SHA1-подписи.
+        Проверка SHA1-подписи. Дайджесты сравниваются за постоянное время.
 
         :param str token: Токен из ЛК МодульБанка
         :return: Успешность проверки цифровой подписи
         :rtype: bool
         """
-        s = "{}&{}".format(token[:10], self.operation.operation_id)
+        if not self.signature:
+            return False
+        s = "{}&{}".format(token[:10], self.operation_id)
         digest = hashlib.sha1(s.encode()).hexdigest()
-        return digest.lower() == self.signature.lower()
+        return hmac.compare_digest(digest.encode(), self.signature.lower().encode())
@@ -0,0 +1,163 @@
+import datetime
+import logging
+import sqlite3
+import threading
+
+from .client import ModulbankClient, SearchOptions
+from .structs import OperationStatus
+
+log = logging.getLogger(__name__)
+
+_MOMENT_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+class WatermarkStore:
+    """
+    Хранилище отметок синхронизации операций в SQLite.
+
+    Для каждого счёта хранится момент самой поздней полученной операции и идентификаторы операций со статусами, ещё
+    требующие внимания: операции дня отметки (фильтр API работает с точностью до дня) и неисполненные исходящие
+    операции (`SendToBank`), статус которых ещё может измениться.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        """
+        Конструктор
+
+        :param str path: Путь к файлу базы SQLite. По умолчанию база в памяти
+        """
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__conn = sqlite3.connect(path, check_same_thread=False)
+        with self.__conn:
+            self.__conn.execute('CREATE TABLE IF NOT EXISTS sync_watermarks ('
+                                'account_id TEXT PRIMARY KEY, moment TEXT NOT NULL)')
+            self.__conn.execute('CREATE TABLE IF NOT EXISTS sync_seen ('
+                                'account_id TEXT NOT NULL, operation_id TEXT NOT NULL, status TEXT NOT NULL, '
+                                'moment TEXT NOT NULL, PRIMARY KEY (account_id, operation_id))')
+
+    def __str__(self):
+        return "<WatermarkStore path='{path}'>".format(path=self.__path)
+
+    def close(self) -> None:
+        """
+        Закрытие базы.
+
+        :return: None
+        :rtype: None
+        """
+        self.__conn.close()
+
+    def watermark(self, account_id: str) -> datetime.datetime:
+        """
+        Момент самой поздней полученной операции по счёту
+
+        :param str account_id: Системный идентификатор счёта
+        :return: Момент по московскому времени (без часового пояса), либо None, если счёт ещё не синхронизировался
+        :rtype: datetime.datetime
+        """
+        with self.__lock:
+            row = self.__conn.execute('SELECT moment FROM sync_watermarks WHERE account_id = ?',
+                                      (account_id,)).fetchone()
+        return row and datetime.datetime.strptime(row[0], _MOMENT_FORMAT) or None
+
+    def seen(self, account_id: str) -> dict:
+        """
+        Отслеживаемые операции счёта
+
+        :param str account_id: Системный идентификатор счёта
+        :return: Словарь пар (статус, момент) по идентификаторам операций
+        :rtype: dict(str, tuple(OperationStatus, datetime.datetime))
+        """
+        with self.__lock:
+            rows = self.__conn.execute('SELECT operation_id, status, moment FROM sync_seen WHERE account_id = ?',
+                                       (account_id,)).fetchall()
+        return {x[0]: (OperationStatus[x[1]], datetime.datetime.strptime(x[2], _MOMENT_FORMAT)) for x in rows}
+
+    def save(self, account_id: str, watermark: datetime.datetime, seen: dict) -> None:
+        """
+        Атомарное сохранение отметки и отслеживаемых операций счёта.
+
+        Операции до дня отметки в исполненных (окончательных) статусах больше не отслеживаются.
+
+        :param str account_id: Системный идентификатор счёта
+        :param datetime.datetime watermark: Момент самой поздней полученной операции
+        :param dict seen: Словарь пар (статус, момент) по идентификаторам операций, полученных за проход
+        :return: None
+        :rtype: None
+        """
+        boundary = watermark.strftime('%Y-%m-%dT00:00:00')
+        with self.__lock, self.__conn:
+            self.__conn.execute('INSERT OR REPLACE INTO sync_watermarks (account_id, moment) VALUES (?, ?)',
+                                (account_id, watermark.strftime(_MOMENT_FORMAT)))
+            self.__conn.executemany('INSERT OR REPLACE INTO sync_seen (account_id, operation_id, status, moment) '
+                                    'VALUES (?, ?, ?, ?)',
+                                    [(account_id, k, v[0].name, v[1].strftime(_MOMENT_FORMAT))
+                                     for k, v in seen.items()])
+            self.__conn.execute('DELETE FROM sync_seen WHERE account_id = ? AND moment < ? AND status != ?',
+                                (account_id, boundary, OperationStatus.SendToBank.name))
+
+
+class OperationSync:
+    """
+    Инкрементальная синхронизация истории операций.
+
+    Каждый проход запрашивает операции начиная с дня отметки счёта (или с самой ранней неисполненной исходящей
+    операции) и возвращает только новые операции и операции со сменившимся статусом, например,
+    `SendToBank` → `Executed`.
+    """
+
+    def __init__(self, client: ModulbankClient, store: WatermarkStore, prefetch: int = 1):
+        """
+        Конструктор
+
+        :param ModulbankClient client: Клиент МодульБанка
+        :param WatermarkStore store: Хранилище отметок синхронизации
+        :param int prefetch: Количество одновременно запрашиваемых страниц истории операций
+        """
+        self.__client = client
+        self.__store = store
+        self.__prefetch = prefetch
+
+    def sync(self, account_id: str, date_from: datetime.date = None) -> list:
+        """
+        Получение новых и изменившихся операций счёта с сохранением отметки.
+
+        Метод в API: https://api.modulbank.ru/v1/operation-history/<account_id>
+
+        :param str account_id: Системный идентификатор счёта
+        :param datetime.date date_from: (опционально) Начало истории для первой синхронизации счёта
+        :return: Массив новых и изменившихся операций, представленных структурой :class:`Operation`
+        :rtype: list(Operation)
+        :raises NotAuthorizedModulbankException: Если не прошли авторизацию.
+        :raises UnexpectedResponseStatusModulbankException: Если статус ответа сервера отлиается от ожидаемого.
+        :raises UnexpectedResponseBodyModulbankException: Если не удалось обработать полученные данные.
+        """
+        watermark = self.__store.watermark(account_id)
+        seen = self.__store.seen(account_id)
+        boundary = None
+        if watermark is not None:
+            boundary = watermark.replace(hour=0, minute=0, second=0, microsecond=0)
+            pending = [v[1] for v in seen.values() if v[0] == OperationStatus.SendToBank]
+            date_from = min([watermark] + pending).date()
+
+        res = []
+        updates = {}
+        for op in self.__client.iter_operations(account_id, SearchOptions(date_from=date_from),
+                                                prefetch=self.__prefetch):
+            moment = (op.executed or op.created).replace(tzinfo=None)
+            if op.operation_id in seen:
+                if seen[op.operation_id][0] == op.status:
+                    continue
+            elif boundary is not None and moment < boundary and op.status != OperationStatus.SendToBank:
+                # Исполненная операция до дня отметки уже получена прошлыми проходами: окно запроса сдвинуто назад
+                # только ради неисполненных исходящих операций
+                continue
+            res.append(op)
+            updates[op.operation_id] = (op.status, moment)
+            if watermark is None or moment > watermark:
+                watermark = moment
+        if watermark is not None:
+            self.__store.save(account_id, watermark, updates)
+        log.debug('Synced %d operations of account %s', len(res), account_id)
+        return res
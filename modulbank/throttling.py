@@ -0,0 +1,196 @@
+import datetime
+import email.utils
+import random
+import threading
+import time
+
+# Статусы ответа, после которых запрос имеет смысл повторить
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов ("ведро с токенами").
+
+    Токены пополняются со скоростью `rate` в секунду, но не больше `burst`. Каждый запрос бронирует токен методом
+    :meth:`reserve`, который сразу возвращает время ожидания своей очереди: синхронный клиент ждёт его через
+    `time.sleep`, асинхронный - через `asyncio.sleep`. Один объект можно разделять между потоками и клиентами,
+    использующими один токен API.
+    """
+
+    def __init__(self, rate: float, burst: float = None, clock=time.monotonic):
+        """
+        Конструктор
+
+        :param float rate: Допустимое количество запросов в секунду
+        :param float burst: (опционально) Количество запросов, которые можно выполнить подряд без ожидания. По
+            умолчанию равно `rate`, но не меньше 1
+        :param clock: (опционально) Монотонные часы, возвращающие секунды
+        :raises ValueError: Если частота или объём не положительны
+        """
+        if rate <= 0:
+            raise ValueError('rate должен быть положительным: %s' % rate)
+        if burst is None:
+            burst = max(1.0, rate)
+        if burst <= 0:
+            raise ValueError('burst должен быть положительным: %s' % burst)
+        self.__rate = float(rate)
+        self.__burst = float(burst)
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__tokens = self.__burst
+        self.__updated = clock()
+
+    def __str__(self):
+        return '<{name} rate={rate} burst={burst}>'.format(name=self.__class__.__name__, rate=self.__rate,
+                                                           burst=self.__burst)
+
+    @property
+    def rate(self) -> float:
+        """
+        Допустимое количество запросов в секунду
+
+        :rtype: float
+        """
+        return self.__rate
+
+    def reserve(self) -> float:
+        """
+        Бронирование токена для одного запроса.
+
+        :return: Время в секундах, которое нужно подождать перед запросом (0, если токен есть сразу)
+        :rtype: float
+        """
+        with self.__lock:
+            now = self.__clock()
+            self.__tokens = min(self.__burst, self.__tokens + (now - self.__updated) * self.__rate)
+            self.__updated = now
+            self.__tokens -= 1
+            if self.__tokens >= 0:
+                return 0.0
+            return -self.__tokens / self.__rate
+
+    def acquire(self) -> None:
+        """
+        Бронирование токена с ожиданием своей очереди в текущем потоке.
+
+        :return: None
+        :rtype: None
+        """
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+
+def parse_retry_after(value: str) -> float:
+    """
+    Разбор заголовка `Retry-After`.
+
+    :param str value: Значение заголовка: число секунд либо HTTP-дата
+    :return: Время ожидания в секундах, либо None, если заголовка нет или его не удалось разобрать
+    :rtype: float
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (moment - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    Правила повтора запросов к API: экспоненциальная задержка со случайным разбросом и учётом `Retry-After`.
+
+    Чтение (`account-info`, балансы, история операций) повторяется после сбоев соединения и статусов из
+    `statuses`. Загрузка платёжек не идемпотентна: повтор после ошибки сервера или обрыва уже отправленного запроса
+    может создать черновик дважды, поэтому она повторяется только после статуса 429 и если соединение не удалось
+    установить.
+    """
+
+    def __init__(self, max_retries: int = 3, backoff: float = 0.5, max_delay: float = 30, jitter: bool = True,
+                 statuses=RETRY_STATUSES):
+        """
+        Конструктор
+
+        :param int max_retries: Максимальное количество повторов одного запроса
+        :param float backoff: Задержка перед первым повтором в секундах; перед каждым следующим - вдвое больше
+        :param float max_delay: Максимальная задержка в секундах. Если `Retry-After` требует ждать дольше, запрос не
+            повторяется
+        :param bool jitter: Выбирать ли задержку случайно от 0 до расчётной, чтобы повторы многих клиентов не
+            совпадали по времени
+        :param statuses: Статусы ответа, после которых запрос повторяется
+        :raises ValueError: Если количество повторов или задержка отрицательны
+        """
+        if max_retries < 0:
+            raise ValueError('max_retries не может быть отрицательным: %d' % max_retries)
+        if backoff < 0 or max_delay < 0:
+            raise ValueError('Задержки не могут быть отрицательными')
+        self.__max_retries = max_retries
+        self.__backoff = backoff
+        self.__max_delay = max_delay
+        self.__jitter = jitter
+        self.__statuses = frozenset(statuses)
+
+    def __str__(self):
+        return '<{name} max_retries={retries} backoff={backoff} max_delay={max_delay}>'.format(
+            name=self.__class__.__name__, retries=self.__max_retries, backoff=self.__backoff,
+            max_delay=self.__max_delay)
+
+    @property
+    def max_retries(self) -> int:
+        """
+        Максимальное количество повторов одного запроса
+
+        :rtype: int
+        """
+        return self.__max_retries
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Задержка перед повтором без учёта `Retry-After`.
+
+        :param int attempt: Номер повтора, начиная с 0
+        :return: Задержка в секундах
+        :rtype: float
+        """
+        delay = min(self.__max_delay, self.__backoff * 2 ** attempt)
+        if self.__jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def retry_delay(self, attempt: int, status: int = None, retry_after: str = None, sent: bool = True,
+                    idempotent: bool = True) -> float:
+        """
+        Решение о повторе запроса.
+
+        :param int attempt: Номер повтора, начиная с 0
+        :param int status: Статус ответа, либо None, если ответ не получен из-за сбоя соединения
+        :param str retry_after: Значение заголовка `Retry-After` ответа
+        :param bool sent: Мог ли запрос дойти до сервера. False - соединение не было установлено
+        :param bool idempotent: Безопасен ли повтор запроса, дошедшего до сервера
+        :return: Задержка перед повтором в секундах, либо None, если запрос повторять не нужно
+        :rtype: float
+        """
+        if attempt >= self.__max_retries:
+            return None
+        if status is None:
+            if idempotent or not sent:
+                return self.backoff(attempt)
+            return None
+        if status not in self.__statuses or not (idempotent or status == 429):
+            return None
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            return self.backoff(attempt)
+        if delay > self.__max_delay:
+            return None
+        return delay
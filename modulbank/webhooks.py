@@ -0,0 +1,373 @@
+import hashlib
+import hmac
+import logging
+import queue
+import threading
+import time
+
+from .dedup import DedupStore
+from .structs import NotifyRequest
+
+log = logging.getLogger(__name__)
+
+_STATUS_LINES = {
+    200: '200 OK',
+    400: '400 Bad Request',
+    403: '403 Forbidden',
+    405: '405 Method Not Allowed',
+    503: '503 Service Unavailable',
+}
+_STOP = object()
+
+
+def _remaining(deadline: float) -> float:
+    """
+    Время до крайнего срока в секундах, либо None, если срока нет.
+    """
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def _signature_prefix(token: str):
+    """
+    SHA1 с уже добавленным началом подписываемой строки: первыми 10 символами токена и разделителем.
+    """
+    return hashlib.sha1('{}&'.format(token[:10]).encode())
+
+
+class SignatureVerifier:
+    """
+    Проверка подписей уведомлений о транзакциях для одного или многих токенов.
+
+    Хэш начала подписываемой строки (`token[:10] + '&'`) вычисляется один раз на токен, дайджесты сравниваются за
+    постоянное время. Подпись проверяется по JSON-объекту либо по уведомлению из :meth:`NotifyRequest.from_bytes`:
+    :class:`Operation` не создаётся, пока подпись не прошла проверку, поэтому поддельные и мусорные запросы обходятся
+    дёшево. Токен уведомления выбирается по ИНН и КПП компании из `routes`, а если их там нет - используется `token`.
+    """
+
+    def __init__(self, token: str = None, routes: dict = None):
+        """
+        Конструктор
+
+        :param str token: (опционально) Токен по умолчанию
+        :param dict routes: (опционально) Токены по ИНН компании либо по паре (ИНН, КПП)
+        :raises ValueError: Если не задано ни одного токена
+        """
+        if token is None and not routes:
+            raise ValueError('Не задано ни одного токена')
+        self.__default = token is not None and _signature_prefix(token) or None
+        self.__routes = {key: _signature_prefix(value) for key, value in (routes or {}).items()}
+
+    def __str__(self):
+        return '<{name} routes={routes} default={default}>'.format(name=self.__class__.__name__,
+                                                                   routes=len(self.__routes),
+                                                                   default=self.__default is not None)
+
+    def __route(self, inn: str, kpp: str):
+        prefix = self.__routes.get((inn, kpp))
+        if prefix is None:
+            prefix = self.__routes.get(inn, self.__default)
+        return prefix
+
+    def knows(self, inn: str, kpp: str = '') -> bool:
+        """
+        Есть ли токен для компании
+
+        :param str inn: ИНН компании
+        :param str kpp: КПП компании
+        :return: True, если уведомления компании можно проверить
+        :rtype: bool
+        """
+        return self.__route(inn, kpp) is not None
+
+    def __check(self, inn: str, kpp: str, operation_id, signature) -> bool:
+        prefix = self.__route(inn, kpp)
+        if not isinstance(signature, str) or not isinstance(operation_id, str) or prefix is None:
+            return False
+        digest = prefix.copy()
+        digest.update(operation_id.encode())
+        return hmac.compare_digest(digest.hexdigest().encode(), signature.lower().encode())
+
+    def verify(self, obj: dict) -> bool:
+        """
+        Проверка подписи JSON-объекта уведомления.
+
+        :param dict obj: JSON-объект уведомления о транзакции из API МодульБанка
+        :return: Успешность проверки подписи. False также для объектов, не похожих на уведомление
+        :rtype: bool
+        """
+        if not isinstance(obj, dict) or not isinstance(obj.get('operation'), dict):
+            return False
+        return self.__check(obj.get('companyInn', ''), obj.get('companyKpp', obj.get('contragentKpp', '')),
+                            obj['operation'].get('id'), obj.get('SHA1Hash'))
+
+    def verify_request(self, notify: NotifyRequest) -> bool:
+        """
+        Проверка подписи уведомления, полученного :meth:`NotifyRequest.from_bytes`, без создания :class:`Operation`.
+
+        :param NotifyRequest notify: Уведомление о транзакции
+        :return: Успешность проверки подписи
+        :rtype: bool
+        """
+        return self.__check(notify.inn, notify.kpp, notify.operation_id, notify.signature)
+
+    def verify_batch(self, bodies) -> list:
+        """
+        Проверка подписей пачки необработанных тел запросов уведомлений.
+
+        :param bodies: Тела запросов (JSON, bytes)
+        :return: Уведомления :class:`NotifyRequest` в порядке тел запросов; None - для запросов с неверной подписью
+            или нераспознанным телом
+        :rtype: list(NotifyRequest)
+        """
+        res = []
+        for body in bodies:
+            try:
+                notify = NotifyRequest.from_bytes(body)
+            except ValueError:
+                res.append(None)
+                continue
+            res.append(self.verify_request(notify) and notify or None)
+        return res
+
+
+class WebhookIngestor:
+    """
+    Приём уведомлений о транзакциях (web-hook) с обработкой в фоне.
+
+    Тело запроса разбирается в :class:`NotifyRequest`, подпись проверяется, и уведомление сразу кладётся в
+    ограниченную очередь, а ответ отдаётся, не дожидаясь обработки. Очередь разбирает пул потоков, вызывающих
+    `handler`. Если очередь заполнена, запрос отклоняется статусом 503, и МодульБанк доставит уведомление повторно.
+
+    Компонент не зависит от веб-фреймворка: :meth:`submit` принимает тело запроса и возвращает HTTP-статус ответа, а
+    :meth:`wsgi_app` и :meth:`asgi_app` - готовые приложения WSGI и ASGI.
+    """
+
+    def __init__(self, token, handler, workers: int = 4, queue_size: int = 1000, inn: str = None,
+                 kpp: str = None, dedup: DedupStore = None):
+        """
+        Конструктор
+
+        :param token: Токен из ЛК МодульБанка, которым подписаны уведомления, либо :class:`SignatureVerifier` для
+            уведомлений многих компаний
+        :param handler: Обработчик уведомления: функция от :class:`NotifyRequest`. Вызывается в потоке пула
+        :param int workers: Количество потоков обработки
+        :param int queue_size: Максимальное количество уведомлений, ожидающих обработки
+        :param str inn: (опционально) ИНН компании: уведомления других компаний принимаются без обработки
+        :param str kpp: (опционально) КПП компании: уведомления других компаний принимаются без обработки
+        :param DedupStore dedup: (опционально) Хранилище обработанных уведомлений: повторные доставки принимаются без
+            обработки, а уведомление, обработчик которого выбросил исключение, будет обработано при повторной доставке
+        :raises ValueError: Если количество потоков или размер очереди меньше 1
+        """
+        if workers < 1:
+            raise ValueError('workers должен быть не меньше 1: %d' % workers)
+        if queue_size < 1:
+            raise ValueError('queue_size должен быть не меньше 1: %d' % queue_size)
+        self.__verifier = isinstance(token, SignatureVerifier) and token or SignatureVerifier(token)
+        self.__handler = handler
+        self.__inn = inn
+        self.__kpp = kpp
+        self.__dedup = dedup
+        self.__queue = queue.Queue(maxsize=queue_size)
+        self.__lock = threading.Lock()
+        self.__threads = [threading.Thread(target=self.__work, name='modulbank-webhook-%d' % i, daemon=True)
+                          for i in range(workers)]
+        self.__accepting = False
+        self.__started = False
+        self.__stopped = False
+        self.__stops_sent = 0
+        self.__counters = dict.fromkeys(('received', 'accepted', 'ignored', 'duplicate', 'invalid', 'forged',
+                                         'rejected', 'processed', 'failed'), 0)
+        self.__max_depth = 0
+
+    def __str__(self):
+        return '<{name} workers={workers} queue_size={size}>'.format(name=self.__class__.__name__,
+                                                                     workers=len(self.__threads),
+                                                                     size=self.__queue.maxsize)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __count(self, name: str) -> None:
+        with self.__lock:
+            self.__counters[name] += 1
+
+    @property
+    def metrics(self) -> dict:
+        """
+        Счётчики приёма и обработки уведомлений
+
+        `received` - получено запросов, `accepted` - поставлено в очередь, `ignored` - уведомлений других компаний,
+        `duplicate` - повторных доставок, `invalid` - нераспознанных тел запросов, `forged` - с неверной подписью,
+        `rejected` - отклонено из-за заполненной очереди или остановки, `processed` и `failed` - обработано успешно и
+        с исключением, `queue_depth` - ожидает обработки сейчас, `max_queue_depth` - наибольшая длина очереди,
+        `queue_size` - размер очереди.
+
+        :return: Снимок счётчиков
+        :rtype: dict(str, int)
+        """
+        with self.__lock:
+            res = dict(self.__counters)
+            res['max_queue_depth'] = self.__max_depth
+        res['queue_depth'] = self.__queue.qsize()
+        res['queue_size'] = self.__queue.maxsize
+        return res
+
+    def start(self) -> None:
+        """
+        Запуск потоков обработки и приёма уведомлений.
+
+        :return: None
+        :rtype: None
+        :raises RuntimeError: Если приём уже был остановлен: перезапуск не поддерживается, нужен новый объект
+        """
+        with self.__lock:
+            if self.__stopped:
+                raise RuntimeError('Приём уведомлений остановлен, перезапуск не поддерживается')
+            if not self.__started:
+                for thread in self.__threads:
+                    thread.start()
+                self.__started = True
+            self.__accepting = True
+
+    def stop(self, timeout: float = None) -> bool:
+        """
+        Плавная остановка: приём новых уведомлений прекращается, уже принятые дорабатываются.
+
+        Если потоки обработки не запускались, ничего не делает. Повторный вызов, например, после истечения `timeout`,
+        продолжает ожидание.
+
+        :param float timeout: (опционально) Максимальное время ожидания обработки очереди в секундах
+        :return: True, если все принятые уведомления обработаны и потоки остановлены
+        :rtype: bool
+        """
+        with self.__lock:
+            self.__accepting = False
+            if not self.__started:
+                return True
+            self.__stopped = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.__stops_sent < len(self.__threads):
+            try:
+                self.__queue.put(_STOP, timeout=_remaining(deadline))
+            except queue.Full:
+                return False
+            self.__stops_sent += 1
+        for thread in self.__threads:
+            if thread.is_alive():
+                thread.join(_remaining(deadline))
+        return not any(thread.is_alive() for thread in self.__threads)
+
+    def submit(self, body: bytes) -> int:
+        """
+        Приём уведомления.
+
+        :param bytes body: Тело запроса (JSON)
+        :return: HTTP-статус ответа: 200 - принято, 400 - тело не распознано, 403 - неверная подпись, 503 - очередь
+            заполнена или приём остановлен
+        :rtype: int
+        """
+        self.__count('received')
+        try:
+            notify = NotifyRequest.from_bytes(body)
+        except ValueError as e:
+            log.debug('Malformed notification: %r', e)
+            self.__count('invalid')
+            return 400
+        if not self.__verifier.verify_request(notify):
+            self.__count('forged')
+            return 403
+        if (self.__inn is not None and notify.inn != self.__inn) or (
+                self.__kpp is not None and notify.kpp != self.__kpp):
+            self.__count('ignored')
+            return 200
+        try:
+            status = notify.operation.status
+        except Exception as e:
+            log.debug('Malformed notification: %r', e)
+            self.__count('invalid')
+            return 400
+        if self.__dedup is not None and not self.__dedup.add(notify.operation_id, status):
+            self.__count('duplicate')
+            return 200
+        with self.__lock:
+            accepted = self.__accepting and not self.__queue.full()
+            if accepted:
+                self.__queue.put_nowait(notify)
+                self.__counters['accepted'] += 1
+                self.__max_depth = max(self.__max_depth, self.__queue.qsize())
+            else:
+                self.__counters['rejected'] += 1
+        if not accepted:
+            if self.__dedup is not None:
+                self.__dedup.discard(notify.operation_id, status)
+            return 503
+        return 200
+
+    def __work(self) -> None:
+        while True:
+            notify = self.__queue.get()
+            try:
+                if notify is _STOP:
+                    return
+                self.__handler(notify)
+            except Exception:
+                log.exception('Notification handler failed')
+                if self.__dedup is not None:
+                    self.__dedup.discard(notify.operation_id, notify.operation.status)
+                self.__count('failed')
+            else:
+                self.__count('processed')
+            finally:
+                self.__queue.task_done()
+
+    def wsgi_app(self, environ, start_response):
+        """
+        WSGI-приложение, принимающее уведомления POST-запросами.
+
+        :param dict environ: Окружение WSGI
+        :param start_response: Функция начала ответа WSGI
+        :return: Тело ответа
+        :rtype: list(bytes)
+        """
+        if environ.get('REQUEST_METHOD') != 'POST':
+            status = 405
+        else:
+            try:
+                length = int(environ.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                length = 0
+            status = self.submit(environ['wsgi.input'].read(length))
+        start_response(_STATUS_LINES[status], [('Content-Type', 'text/plain'), ('Content-Length', '0')])
+        return [b'']
+
+    async def asgi_app(self, scope, receive, send) -> None:
+        """
+        ASGI-приложение, принимающее уведомления POST-запросами.
+
+        :param dict scope: Описание соединения ASGI
+        :param receive: Сопрограмма получения сообщений ASGI
+        :param send: Сопрограмма отправки сообщений ASGI
+        :return: None
+        :rtype: None
+        """
+        if scope['type'] != 'http':
+            return
+        if scope.get('method') != 'POST':
+            status = 405
+        else:
+            chunks = []
+            while True:
+                message = await receive()
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            status = self.submit(b''.join(chunks))
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'text/plain'), (b'content-length', b'0')]})
+        await send({'type': 'http.response.body', 'body': b''})
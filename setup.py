@@ -32,15 +32,18 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.4",
         "Programming Language :: Python :: 3.5",
         "Programming Language :: Python :: 3.6",
     ],
     keywords='modulbank bank',
     packages=find_packages(),
+    python_requires='>=3.5.3',
     include_package_data=True,
     setup_requires=['pytest-runner'],
     install_requires=get_file_content('requirements.txt'),
+    extras_require={
+        'async': ['aiohttp>=3.3'],
+    },
     tests_require=get_file_content('requirements_test.txt'),
     test_suite='tests',
 )
@@ -0,0 +1,19 @@
+import pytest
+from decimal import Decimal
+
+import modulbank.structs as structs
+
+
+@pytest.fixture
+def payment_order():
+    return structs.PaymentOrder(
+        doc_num='994720', account_num='40802810670010011008', amount=Decimal(100.00), purpose='Для теста',
+        payer=structs.Contractor(name='Индивидуальный предприниматель Александров Александр Александрович',
+                                 inn='770400372208',
+                                 bank=structs.BankShort(account='40802810670010011008',
+                                                        name='МОСКОВСКИЙ ФИЛИАЛ АО КБ \"МОДУЛЬБАНК\"',
+                                                        bic='044525092', corr_acc='30101810645250000092')),
+        recipient=structs.Contractor(name='МОСКОВСКИЙ ФИЛИАЛ АО КБ \"МОДУЛЬБАНК\"', inn='2204000595', kpp='771543001',
+                                     bank=structs.BankShort(account='30102810675250000092',
+                                                            name='МОСКОВСКИЙ ФИЛИАЛ АО КБ \"МОДУЛЬБАНК\"',
+                                                            bic='044525092', corr_acc='30102810675250000092')))
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import os
+
+import pytest
+from decimal import Decimal
+
+import modulbank.structs as structs
+from modulbank import exceptions
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestServer  # noqa: E402
+
+from modulbank.async_client import AsyncModulbankClient  # noqa: E402
+from modulbank.throttling import RetryPolicy  # noqa: E402
+
+
+def json_from_file(filename):
+    with open('tests/data/' + filename) as json_file:
+        return json.load(json_file)
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def make_app(requests_log):
+    async def account_info(request):
+        requests_log.append(await request.json())
+        return web.json_response(json_from_file('accounts.json'))
+
+    async def balance(request):
+        if request.match_info['account_id'] == 'forbidden':
+            return web.Response(status=401)
+        return web.Response(text='630170.0')
+
+    async def operations(request):
+        requests_log.append(await request.json())
+        return web.json_response(json_from_file('operations_page1.json'))
+
+    async def upload(request):
+        requests_log.append(await request.json())
+        return web.json_response(json_from_file('operation_upload.json'))
+
+    app = web.Application()
+    app.router.add_post('/v1/account-info', account_info)
+    app.router.add_post('/v1/account-info/balance/{account_id}', balance)
+    app.router.add_post('/v1/operation-history/{account_id}', operations)
+    app.router.add_post('/v1/operation-upload/1c', upload)
+    return app
+
+
+def test_async_client():
+    requests_log = []
+
+    async def scenario():
+        server = TestServer(make_app(requests_log))
+        await server.start_server()
+        try:
+            async with AsyncModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True, page_size=10,
+                                            api_url=str(server.make_url('/v1/'))) as client:
+                companies = await client.accounts()
+                balances = await asyncio.gather(*[client.balance(str(i)) for i in range(20)])
+                ops = await client.operations('1')
+                with pytest.raises(exceptions.NotAuthorizedModulbankException):
+                    await client.balance('forbidden')
+                session = client.session
+            assert session.closed
+            return companies, balances, ops
+        finally:
+            await server.close()
+
+    companies, balances, ops = run(scenario())
+    assert isinstance(companies[0], structs.Company)
+    assert companies[0].bank_accounts[0].balance == Decimal(900000)
+    assert balances == [Decimal('630170.0')] * 20
+    assert len(ops) == 5
+    assert isinstance(ops[0], structs.Operation)
+    assert requests_log[1] == {'skip': 0, 'records': 10}
+
+
+def test_async_client_str():
+    client = AsyncModulbankClient(token=os.environ['MODULBANK_TOKEN'])
+    assert str(client) == "<AsyncModulbankClient token='…' sandbox_mode='False' page_size=50>"
+    assert client.session is None
+
+
+def test_async_client_retry():
+    calls = []
+
+    async def balance(request):
+        calls.append(request.path)
+        if len(calls) == 1:
+            return web.Response(status=429, headers={'Retry-After': '0'})
+        return web.Response(text='1.5')
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post('/v1/account-info/balance/{account_id}', balance)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with AsyncModulbankClient(token=os.environ['MODULBANK_TOKEN'], rate_limit=1000,
+                                            retry=RetryPolicy(backoff=0.001),
+                                            api_url=str(server.make_url('/v1/'))) as client:
+                res = await client.balance('1')
+            async with AsyncModulbankClient(token=os.environ['MODULBANK_TOKEN'],
+                                            api_url=str(server.make_url('/v1/'))) as client:
+                calls.clear()
+                with pytest.raises(exceptions.UnexpectedResponseStatusModulbankException):
+                    await client.balance('1')
+            return res
+        finally:
+            await server.close()
+
+    assert run(scenario()) == Decimal('1.5')
+    assert len(calls) == 1
+
+
+def test_async_create_payment_drafts_failed_chunk(payment_order):
+    calls = []
+
+    async def upload(request):
+        calls.append(await request.json())
+        if len(calls) == 2:
+            return web.Response(status=500)
+        return web.json_response({'totalLoaded': 2})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post('/v1/operation-upload/1c', upload)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with AsyncModulbankClient(token=os.environ['MODULBANK_TOKEN'],
+                                            api_url=str(server.make_url('/v1/'))) as client:
+                return await client.create_payment_drafts([payment_order] * 6, chunk_size=2)
+        finally:
+            await server.close()
+
+    res = run(scenario())
+    assert len(calls) == 3
+    assert res.total_loaded == 4
+    assert res.failed_orders == [2, 3]
+    assert isinstance(res.chunk_errors[0][1], exceptions.UnexpectedResponseStatusModulbankException)
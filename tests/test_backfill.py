@@ -0,0 +1,77 @@
+import copy
+import datetime
+import json
+import os
+import re
+
+import pytest
+import requests_mock
+
+from modulbank.backfill import Backfill, ShardStore, plan_shards
+from modulbank.client import ModulbankClient
+from modulbank.exceptions import UnexpectedResponseStatusModulbankException
+from modulbank.storage import OperationStore
+
+
+def json_from_file(filename):
+    with open('tests/data/' + filename) as json_file:
+        return json.load(json_file)
+
+
+def test_plan_shards():
+    d = datetime.date
+    assert plan_shards(d(2017, 12, 30), d(2018, 1, 2), 'day') == [
+        (d(2017, 12, 30), d(2017, 12, 30)), (d(2017, 12, 31), d(2017, 12, 31)), (d(2018, 1, 1), d(2018, 1, 1)),
+        (d(2018, 1, 2), d(2018, 1, 2))]
+    assert plan_shards(d(2018, 1, 3), d(2018, 1, 17), 'week') == [
+        (d(2018, 1, 3), d(2018, 1, 7)), (d(2018, 1, 8), d(2018, 1, 14)), (d(2018, 1, 15), d(2018, 1, 17))]
+    assert plan_shards(d(2015, 12, 15), d(2016, 3, 1)) == [
+        (d(2015, 12, 15), d(2015, 12, 31)), (d(2016, 1, 1), d(2016, 1, 31)), (d(2016, 2, 1), d(2016, 2, 29)),
+        (d(2016, 3, 1), d(2016, 3, 1))]
+    assert plan_shards(d(2018, 1, 2), d(2018, 1, 1)) == []
+    with pytest.raises(ValueError):
+        plan_shards(d(2018, 1, 1), d(2018, 1, 2), 'year')
+
+
+def test_backfill(tmpdir):
+    path = str(tmpdir.join('backfill.sqlite'))
+    sample = json_from_file('operations_page1.json')
+    failing = {'2016-02-01'}
+
+    def history(request, context):
+        body = request.json()
+        if body['from'] in failing:
+            context.status_code = 503
+            return []
+        month = int(body['from'][5:7])
+        # Каждый месяц - две свои операции и одна, повторяющаяся на границе соседнего отрезка
+        res = []
+        for i in (month, month + 1):
+            obj = copy.deepcopy(sample[i % len(sample)])
+            obj['id'] = 'op-%02d' % i
+            obj['executed'] = '2016-%02d-01T10:00:00' % min(i, 12)
+            res.append(obj)
+        return res
+
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True)
+    store = OperationStore(path)
+    backfill = Backfill(client, store, ShardStore(path), period='month', workers=4)
+    date_from, date_till = datetime.date(2016, 1, 1), datetime.date(2016, 3, 31)
+    with requests_mock.Mocker() as m:
+        m.post(re.compile("https://api.modulbank.ru/v1/operation-history/"), json=history)
+        with pytest.raises(UnexpectedResponseStatusModulbankException):
+            backfill.run(['acc1'], date_from, date_till)
+        assert backfill.pending(['acc1'], date_from, date_till) == [
+            ('acc1', (datetime.date(2016, 2, 1), datetime.date(2016, 2, 29)))]
+        assert [op.operation_id for op in backfill.operations()] == ['op-01', 'op-02', 'op-03', 'op-04']
+
+        failing.clear()
+        restarted = Backfill(client, store, ShardStore(path), period='month')
+        calls = m.call_count
+        assert restarted.run(['acc1'], date_from, date_till) == 2
+        assert m.call_count == calls + 1
+        assert restarted.run(['acc1'], date_from, date_till) == 0
+    ops = restarted.operations(account_id='acc1')
+    assert [op.operation_id for op in ops] == ['op-01', 'op-02', 'op-03', 'op-04']
+    assert [op.executed for op in ops] == sorted(op.executed for op in ops)
+    assert all(r.json()['till'] <= '2016-03-31' for r in m.request_history)
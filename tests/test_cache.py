@@ -0,0 +1,84 @@
+import json
+import os
+import time
+
+import pytest
+import requests_mock
+from decimal import Decimal
+
+from modulbank.cache import BaseCache, MemoryCache
+from modulbank.client import ModulbankClient
+
+
+def json_from_file(filename):
+    with open('tests/data/' + filename) as json_file:
+        return json.load(json_file)
+
+
+def test_memory_cache_lru():
+    cache = MemoryCache(max_size=2)
+    cache.set('a', 1, 60)
+    cache.set('b', 2, 60)
+    assert cache.lookup('a') == 1
+    cache.set('c', 3, 60)
+    assert cache.lookup('b') is None
+    assert cache.lookup('a') == 1
+    assert cache.lookup('c') == 3
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+    cache.delete_prefix('a')
+    assert cache.get('a') is None
+    cache.clear()
+    assert len(cache) == 0
+    with pytest.raises(ValueError):
+        MemoryCache(max_size=0)
+    with pytest.raises(TypeError):
+        BaseCache()
+
+
+def test_memory_cache_ttl():
+    cache = MemoryCache()
+    cache.set('a', 1, 0.01)
+    cache.set('b', 2, 60)
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    assert str(cache) == '<MemoryCache hits=0 misses=0>'
+
+
+# noinspection PyShadowingNames
+def test_client_cache(payment_order):
+    cache = MemoryCache()
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True, cache=cache,
+                             cache_ttl={'balance': 30})
+    account_id = '58c20343-5d3b-422c-b98b-a5ec037df782'
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/account-info", json=json_from_file('accounts.json'))
+        m.post("https://api.modulbank.ru/v1/account-info/balance/{id}".format(id=account_id), text='1.0')
+        m.post("https://api.modulbank.ru/v1/operation-upload/1c", json=json_from_file('operation_upload.json'))
+        assert client.accounts()[0].name == client.accounts()[0].name
+        assert client.balance(account_id) == client.balance(account_id) == Decimal('1.0')
+        assert m.call_count == 2
+        assert client.balances([account_id]) == {account_id: Decimal(50000)}
+        assert m.call_count == 2
+        client.create_payment_draft(payment_order)
+        client.accounts()
+        client.balance(account_id)
+        assert m.call_count == 5
+    assert client.cache is cache
+    assert (cache.hits, cache.misses) == (3, 4)
+
+
+def test_client_cache_scope():
+    cache = MemoryCache()
+    token = os.environ['MODULBANK_TOKEN']
+    clients = [ModulbankClient(token=token, sandbox_mode=True, cache=cache),
+               ModulbankClient(token=token, cache=cache),
+               ModulbankClient(token=token, cache=cache, api_url='http://localhost:8080/v1/')]
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/account-info", json=json_from_file('accounts.json'))
+        m.post("http://localhost:8080/v1/account-info", json=json_from_file('accounts.json'))
+        for client in clients + clients:
+            client.accounts()
+        assert m.call_count == 3
+    assert (cache.hits, cache.misses) == (3, 3)
@@ -1,14 +1,24 @@
 import json
 import os
+import re
 
+import codecs
 import datetime
+import decimal
+import io
 import pytest
+import pytz
+import requests
 import requests_mock
 from decimal import Decimal
 
-from modulbank.client import ModulbankClient, SearchOptions
-from modulbank.client_bank_exchange import ClientBankExchange
+from modulbank.client import ModulbankClient, SearchOptions, _build_exchange, _fill_client_bank_exchange
+from modulbank.client_bank_exchange import BalancesSection, ClientBankExchange, DocumentSection, ExchangeWriter, \
+    FilterSection, GeneralSection, iter_exchange
 import modulbank.structs as structs
+from modulbank import decoders
+from modulbank.exceptions import UnexpectedResponseBodyModulbankException, UnexpectedResponseStatusModulbankException, \
+    UnexpectedValueModulbankException
 
 
 @pytest.fixture
@@ -199,6 +209,163 @@ def test_create_payment_draft(client):
     assert len(res.document) > 100
 
 
+def test_create_payment_drafts(client, payment_order):
+    p = payment_order
+    orders = [structs.PaymentOrder(doc_num=str(100 + i), account_num=i == 4 and '40802810670010011009' or p.account_num,
+                                   amount=p.amount, purpose=p.purpose, payer=p.payer, recipient=p.recipient)
+              for i in range(5)]
+    responses = [{'json': {'totalLoaded': 1, 'errors': ['Документ №101: неверный БИК', 'Ошибка 1010']}},
+                 {'json': {'totalLoaded': 1}}, {'json': {'totalLoaded': 0, 'errors': ['Неверный счёт']}}]
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/operation-upload/1c", responses)
+        res = client.create_payment_drafts(orders, chunk_size=3)
+        with pytest.raises(ValueError):
+            client.create_payment_drafts(orders, chunk_size=0)
+    documents = [r.json()['document'] for r in m.request_history]
+    assert [x.count('СекцияДокумент=') for x in documents] == [3, 1, 1]
+    assert documents[0].count('КонецФайла') == 1
+    assert 'Номер=103' in documents[1] and 'Номер=104' in documents[2]
+    assert 'РасчСчет=40802810670010011009' in documents[2]
+    assert res.total_loaded == 2
+    assert len(res.responses) == 3
+    assert res.errors == ['Документ №101: неверный БИК', 'Ошибка 1010', 'Неверный счёт']
+    assert res.order_errors == [[], ['Документ №101: неверный БИК'], [], [], ['Неверный счёт']]
+    assert res.unmatched_errors == ['Ошибка 1010']
+
+
+def test_create_payment_drafts_failed_chunk(client, payment_order):
+    p = payment_order
+    orders = [structs.PaymentOrder(doc_num=str(100 + i), account_num=p.account_num, amount=p.amount,
+                                   purpose=p.purpose, payer=p.payer, recipient=p.recipient) for i in range(5)]
+    responses = [{'json': {'totalLoaded': 2}}, {'status_code': 500, 'text': 'Internal Server Error'},
+                 {'json': {'totalLoaded': 1}}]
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/operation-upload/1c", responses)
+        res = client.create_payment_drafts(orders, chunk_size=2)
+    assert m.call_count == 3
+    assert res.total_loaded == 3
+    assert len(res.responses) == 2
+    assert res.failed_orders == [2, 3]
+    assert len(res.chunk_errors) == 1
+    assert res.chunk_errors[0][0] == [2, 3]
+    assert isinstance(res.chunk_errors[0][1], UnexpectedResponseStatusModulbankException)
+    assert str(res).startswith('<PaymentBatchResponse loaded=3')
+
+
+def test_client_bank_exchange_documents(payment_order):
+    single = ClientBankExchange()
+    _fill_client_bank_exchange(payment_order, single)
+    batch = _build_exchange([(0, payment_order), (1, payment_order)])
+    batch.ОбщиеСведения.ВремяСоздания = single.ОбщиеСведения.ВремяСоздания
+    assert len(batch.documents) == 2
+    assert batch.documents[0] is batch.СекцияПлатежногоДокумента
+    head, sep, doc = single.document.partition('СекцияДокумент=')
+    assert batch.document == head + (sep + doc.replace('КонецФайла', '')) * 2 + 'КонецФайла'
+
+
+def _reference_section_document(section) -> str:
+    s = ""
+    for name in section._mandatory_fields:
+        value = section.__dict__[name]
+        if value is None:
+            value = ''
+        s += "{}={}\n".format(name, _reference_format_value(value))
+    for name in section._fields:
+        if name in section._mandatory_fields or section.__dict__[name] is None:
+            continue
+        s += "{}={}\n".format(name, _reference_format_value(section.__dict__[name]))
+    return s
+
+
+def _reference_format_value(value):
+    if isinstance(value, datetime.date):
+        return value.strftime('%d.%m.%Y')
+    if isinstance(value, datetime.time):
+        return value.strftime('%H:%M:%S')
+    if isinstance(value, Decimal):
+        return str(value.quantize(Decimal('.01'), rounding=decimal.ROUND_HALF_DOWN))
+    return value
+
+
+def test_client_bank_exchange_renderer(payment_order):
+    exchange = _build_exchange([(0, payment_order), (1, payment_order)])
+    section = exchange.documents[1]
+    section.Сумма = Decimal('10.125')
+    section.КвитанцияВремя = datetime.time(9, 5, 7)
+    section.ДатаОтсылкиДок = datetime.datetime(2018, 1, 2, 3, 4, 5)
+    section.СрокАкцепта = 5
+    exchange.СекцияОстатков.НачальныйОстаток = Decimal('-0.005')
+    sections = [exchange.ОбщиеСведения, exchange.УсловияОтбора, exchange.СекцияОстатков]
+    for x in sections + exchange.documents:
+        assert x.document == _reference_section_document(x)
+    reference = '1CClientBankExchange\n' + ''.join(_reference_section_document(x) for x in sections) + ''.join(
+        'СекцияДокумент=Платежное поручение\n' + _reference_section_document(x) + 'КонецДокумента\n'
+        for x in exchange.documents) + 'КонецФайла'
+    assert exchange.document == reference
+    assert 'Сумма=10.12\n' in reference and 'КвитанцияВремя=09:05:07\n' in reference
+
+
+def test_exchange_writer(payment_order):
+    exchange = _build_exchange([(0, payment_order), (1, payment_order), (2, payment_order)])
+    buf = io.BytesIO()
+    exchange.write(buf)
+    assert buf.getvalue() == exchange.document.encode('cp1251')
+
+    buf = io.BytesIO()
+    with ExchangeWriter(buf, exchange.ОбщиеСведения, exchange.УсловияОтбора, exchange.СекцияОстатков) as writer:
+        assert writer.write_documents(x for x in exchange.documents[:2]) == 2
+        before = len(buf.getvalue())
+        writer.write_document(exchange.documents[2])
+        assert len(buf.getvalue()) > before
+    assert writer.count == 3
+    assert buf.getvalue().decode('cp1251') == exchange.document
+    with pytest.raises(ValueError):
+        writer.write_document(exchange.documents[0])
+    exchange.СекцияПлатежногоДокумента.НазначениеПлатежа = 'Оплата ☃'
+    with pytest.raises(UnicodeEncodeError):
+        exchange.write(io.BytesIO())
+
+
+def test_iter_exchange(payment_order):
+    exchange = _build_exchange([(0, payment_order), (1, payment_order)])
+    exchange.СекцияОстатков.НачальныйОстаток = Decimal('10.5')
+    buf = io.BytesIO()
+    exchange.write(buf)
+    buf.seek(0)
+    res = list(iter_exchange(buf))
+    assert [type(x) for x in res] == [GeneralSection, FilterSection, DocumentSection, DocumentSection]
+    assert res[0].Отправитель == 'modulbank_python'
+    assert res[0].ДатаСоздания == exchange.ОбщиеСведения.ДатаСоздания
+    assert res[1].РасчСчет == payment_order.account_num
+    assert res[2].СекцияДокумент == 'Платежное поручение'
+    assert res[2].Сумма == Decimal('100.00') and res[2].ПлательщикКПП is None
+    assert res[0].document == exchange.ОбщиеСведения.document
+    assert res[1].document == exchange.УсловияОтбора.document
+    assert res[3].document == exchange.documents[1].document
+
+    buf.seek(0)
+    order = list(iter_exchange(buf, orders=True))[2]
+    assert isinstance(order, structs.PaymentOrder)
+    assert (order.doc_num, order.amount, order.date) == (payment_order.doc_num, Decimal(100), payment_order.date)
+    assert order.payer.name == payment_order.payer.name and order.payer.bank.bic == payment_order.payer.bank.bic
+    assert order.recipient.kpp == payment_order.recipient.kpp
+
+    statement = ('1CClientBankExchange\r\nВерсияФормата=1.03\r\nКодировка=Windows\r\nДатаНачала=01.10.2018\r\n'
+                 'СекцияРасчСчет\r\nРасчСчет=40802810670010011008\r\nНачальныйОстаток=1.23\r\nКонецРасчСчет\r\n'
+                 'СекцияДокумент=Банковский ордер\r\nНомер=7\r\nВидКомиссии=1\r\nКонецДокумента\r\nКонецФайла\r\n')
+    for data in (statement.encode('utf-8'), statement.encode('cp1251'), codecs.BOM_UTF8 + statement.encode('utf-8')):
+        res = list(iter_exchange(io.BytesIO(data)))
+        assert [type(x) for x in res] == [GeneralSection, FilterSection, BalancesSection, DocumentSection]
+        assert res[0].ВерсияФормата == '1.03' and res[1].ДатаНачала == datetime.date(2018, 10, 1)
+        assert res[2].НачальныйОстаток == Decimal('1.23')
+        assert res[3].СекцияДокумент == 'Банковский ордер' and res[3].ВидКомиссии == '1'
+    assert len(list(iter_exchange(statement.splitlines()))) == 4
+    for broken in ('', 'Файл', statement.replace('КонецФайла', ''), statement.replace('Номер=7', 'Номер'),
+                   statement.replace('1.23', '1,23')):
+        with pytest.raises(ValueError):
+            list(iter_exchange(io.BytesIO(broken.encode('cp1251'))))
+
+
 def test_company_str():
     data = json_from_file('accounts.json')
     c = structs.Company(data[0])
@@ -248,9 +415,267 @@ def test_notify_request(client: ModulbankClient):
     assert nr.inn == '1111111111'
     assert nr.kpp == ''
     assert nr.check_signature(client.token)
+    assert not nr.check_signature('wrong-token')
+
+
+# noinspection PyShadowingNames
+def test_notify_request_from_bytes(client: ModulbankClient):
+    data = json_from_file('new_operations.json')
+    nr = structs.NotifyRequest.from_bytes(json.dumps(data).encode())
+    assert nr.inn == '1111111111'
+    assert nr.operation_id == data['operation']['id']
+    assert nr.check_signature(client.token)
+    assert nr._NotifyRequest__operation is None
+    assert nr.operation.operation_id == data['operation']['id']
+    assert nr.operation is nr.operation
+    assert str(nr) == str(structs.NotifyRequest(data))
+    for body in (b'{', b'[]', b'{"operation": "x"}', b'\xff'):
+        with pytest.raises(ValueError):
+            structs.NotifyRequest.from_bytes(body)
 
 
 def test_notify_request_str():
     data = json_from_file('new_operations.json')
     nr = structs.NotifyRequest(data)
     assert str(nr).startswith('<NotifyRequest ')
+
+
+def test_client_shared_session():
+    with ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True, pool_size=4) as client:
+        session = client.session
+        with requests_mock.Mocker() as m:
+            m.post("https://api.modulbank.ru/v1/account-info", json=json_from_file('accounts.json'))
+            m.post("https://api.modulbank.ru/v1/account-info/balance/1", text="1.0")
+            client.accounts()
+            client.balance('1')
+        assert client.session is session
+        assert m.call_count == 2
+        assert m.request_history[0].headers['sandbox'] == 'on'
+        assert session.get_adapter('https://api.modulbank.ru/').poolmanager.connection_pool_kw['maxsize'] == 4
+
+
+def test_client_injected_session():
+    session = requests.Session()
+    adapter = requests_mock.Adapter()
+    session.mount('http://', adapter)
+    adapter.register_uri('POST', 'http://localhost:8000/v1/account-info/balance/1', text='42.5')
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], session=session,
+                             api_url='http://localhost:8000/v1/', timeout=(1, 5))
+    with client:
+        assert client.balance('1') == Decimal('42.5')
+    assert adapter.call_count == 1
+    assert session.adapters['http://'] is adapter
+
+
+def test_iter_operations():
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True, page_size=10)
+    account_id = '58c20343-5d3b-422c-b98b-a5ec037df782'
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/operation-history/{id}".format(id=account_id),
+               [{'json': json_from_file('operations_page0.json')}, {'json': json_from_file('operations_page1.json')}])
+        it = client.iter_operations(account_id, SearchOptions(date_from=datetime.date(2016, 4, 1)))
+        first = next(it)
+        assert isinstance(first, structs.Operation)
+        assert m.call_count == 1
+        res = [first] + list(it)
+    assert len(res) == 15
+    assert m.call_count == 2
+    assert m.request_history[0].json() == {'from': '2016-04-01', 'skip': 0, 'records': 10}
+    assert m.request_history[1].json() == {'from': '2016-04-01', 'skip': 10, 'records': 10}
+
+
+def test_iter_operations_prefetch():
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True, page_size=10)
+    account_id = '58c20343-5d3b-422c-b98b-a5ec037df782'
+    pages = [json_from_file('operations_page0.json')] * 3 + [json_from_file('operations_page1.json'), []]
+
+    def page_callback(request, context):
+        body = request.json()
+        assert body['records'] == 10
+        return pages[body['skip'] // 10]
+
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/operation-history/{id}".format(id=account_id), json=page_callback)
+        res = list(client.iter_operations(account_id, prefetch=3))
+        with pytest.raises(ValueError):
+            client.iter_operations(account_id, prefetch=0)
+    assert len(res) == 35
+    assert [op.doc_number for op in res[:10]] == [op.doc_number for op in res[10:20]]
+    assert res[30].operation_id == json_from_file('operations_page1.json')[0]['id']
+    skips = sorted(r.json()['skip'] for r in m.request_history)
+    assert skips[:4] == [0, 10, 20, 30]
+    assert len(skips) <= 6
+
+
+# noinspection PyShadowingNames
+def test_balances(client: ModulbankClient):
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/account-info", json=json_from_file('accounts.json'))
+        m.post(re.compile("https://api.modulbank.ru/v1/account-info/balance/"), text="1.5")
+        res = client.balances(['edb10116-5a93-4963-a53b-a5ec037177f0', 'unknown-1', 'unknown-2',
+                               '58c20343-5d3b-422c-b98b-a5ec037df782', 'unknown-1'])
+        assert m.call_count == 3
+        assert res == {'edb10116-5a93-4963-a53b-a5ec037177f0': Decimal(900000),
+                       '58c20343-5d3b-422c-b98b-a5ec037df782': Decimal(50000),
+                       'unknown-1': Decimal('1.5'), 'unknown-2': Decimal('1.5')}
+        res = client.balances(['edb10116-5a93-4963-a53b-a5ec037177f0'], max_age=60)
+        assert m.call_count == 3
+        assert res == {'edb10116-5a93-4963-a53b-a5ec037177f0': Decimal(900000)}
+        client.balances(['edb10116-5a93-4963-a53b-a5ec037177f0'])
+        assert m.call_count == 4
+        assert client.balances([]) == {}
+
+
+# noinspection PyShadowingNames
+def test_balances_after_upload(client: ModulbankClient, payment_order):
+    account_id = 'edb10116-5a93-4963-a53b-a5ec037177f0'
+    accounts = json_from_file('accounts.json')
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/account-info", json=accounts)
+        m.post("https://api.modulbank.ru/v1/operation-upload/1c", json=json_from_file('operation_upload.json'))
+        assert client.balances([account_id], max_age=600) == {account_id: Decimal(900000)}
+        client.create_payment_draft(payment_order)
+        accounts[0]['bankAccounts'][0]['balance'] = 899900.0
+        m.post("https://api.modulbank.ru/v1/account-info", json=accounts)
+        assert client.balances([account_id], max_age=600) == {account_id: Decimal(899900)}
+        assert m.call_count == 3
+
+
+def test_parse_moment():
+    moscow_tz = pytz.timezone('Europe/Moscow')
+    for value in ('2016-04-01T00:00:00', '2016-04-01T23:59:59.5', '2016-04-01T12:30:00.123456', '2016-4-1T1:2:3',
+                  '2010-10-31T02:30:00', '2011-03-27T02:30:00', '2014-10-26T01:30:00'):
+        try:
+            expected = datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S')
+        except ValueError:
+            expected = datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f')
+        assert structs._parse_moment(value) == expected
+        assert structs._localize(expected).utcoffset() == moscow_tz.localize(expected).utcoffset()
+    with pytest.raises(ValueError):
+        structs._parse_moment('2016-04-01T00:00:00.5', fractional=False)
+    with pytest.raises(ValueError):
+        structs._parse_moment('2016-04-01')
+
+
+def test_operation_unexpected_values():
+    data = json_from_file('operations.json')[0]
+    for key, value in (('status', 'Unknown'), ('category', None), ('currency', 'XXX'), ('executed', '01.04.2016'),
+                       ('created', 'now')):
+        with pytest.raises(UnexpectedValueModulbankException):
+            structs.Operation(dict(data, **{key: value}))
+
+
+def test_operation_slots():
+    data = json_from_file('operations.json')[0]
+    op = structs.Operation(dict(data, kbk=None, uin=None))
+    other = structs.Operation(dict(data, kbk=None))
+    for obj in (op, op.contractor, op.contractor.bank, op.budgetary_and_tax):
+        assert not hasattr(obj, '__dict__')
+    assert op.budgetary_and_tax is other.budgetary_and_tax
+    assert op.budgetary_and_tax.kbk is None
+    assert structs.Operation(dict(data, kbk='18210102010011000110')).budgetary_and_tax.kbk == '18210102010011000110'
+    assert 'operation_id:' + data['id'] in str(op)
+    account = structs.BankAccount(json_from_file('accounts.json')[0]['bankAccounts'][0])
+    assert not hasattr(account, '__dict__')
+    assert 'БИК:044525092' in str(account.bank)
+
+
+def test_lazy_operation():
+    data = json_from_file('operations.json')[0]
+    eager = structs.Operation(data)
+    lazy = structs.LazyOperation(dict(data, status='Unknown'))
+    assert isinstance(lazy, structs.Operation)
+    assert lazy.raw['id'] == data['id']
+    assert lazy.operation_id == eager.operation_id
+    assert lazy.amount == eager.amount
+    assert lazy.executed == eager.executed
+    assert lazy.contractor.inn == eager.contractor.inn
+    assert lazy.amount is lazy.amount
+    with pytest.raises(UnexpectedValueModulbankException):
+        lazy.status
+    with pytest.raises(UnexpectedValueModulbankException):
+        lazy.validate()
+    lazy = structs.LazyOperation(data).validate()
+    assert str(lazy) == str(eager).replace('<Operation ', '<LazyOperation ', 1)
+    assert structs.LazyOperation.amount.__doc__ == structs.Operation.amount.__doc__
+
+
+def test_operation_lazy_client():
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True, lazy=True)
+    account_id = '58c20343-5d3b-422c-b98b-a5ec037df782'
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/operation-history/{id}".format(id=account_id),
+               json=json_from_file('operations.json'))
+        res = client.operations(account_id)
+    assert isinstance(res[0], structs.LazyOperation)
+    assert res[0].amount == Decimal(100000)
+
+
+@pytest.mark.parametrize('decoder', [decoders.json_decoder, decoders.fast_decoder])
+def test_client_decoder(decoder):
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True, decoder=decoder)
+    account_id = '58c20343-5d3b-422c-b98b-a5ec037df782'
+    data = json_from_file('operations.json')
+    data[0]['amount'] = 1234.1
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/operation-history/{id}".format(id=account_id), json=data)
+        m.post("https://api.modulbank.ru/v1/account-info/balance/{id}".format(id=account_id), text='0.3')
+        res = client.operations(account_id)
+        assert client.balance(account_id) == Decimal('0.3')
+        m.post("https://api.modulbank.ru/v1/account-info/balance/{id}".format(id=account_id), text='"n/a"')
+        with pytest.raises(UnexpectedValueModulbankException):
+            client.balance(account_id)
+        m.post("https://api.modulbank.ru/v1/operation-history/{id}".format(id=account_id), text='[{')
+        with pytest.raises(UnexpectedResponseBodyModulbankException):
+            client.operations(account_id)
+    assert str(res[0].amount) == '1234.1'
+    assert res[1].amount == Decimal(100000)
+
+
+def test_decoder_amount_precision():
+    body = b'[{"amount": 12345678901234.567}, {"amount": 9999999999999.99}]'
+    res = [structs._to_decimal(x['amount']) for x in decoders.json_decoder(body)]
+    assert res == [Decimal('12345678901234.567'), Decimal('9999999999999.99')]
+    if decoders.orjson is not None:
+        assert structs._to_decimal(decoders.orjson_decoder(body)[1]['amount']) == Decimal('9999999999999.99')
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+def test_iter_json_array(chunk_size):
+    content = json.dumps([{'name': 'Сбербанк', 'amount': 1.1}, 12, [], 'a]b', None, 345], ensure_ascii=False)
+    content = content.encode('utf-8')
+    chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+    res = list(decoders.iter_json_array(chunks))
+    assert res == [{'name': 'Сбербанк', 'amount': Decimal('1.1')}, 12, [], 'a]b', None, 345]
+    assert list(decoders.iter_json_array([b' [ ', b']'])) == []
+    for broken in (b'[1, 2', b'[1 2]', b'{}', b'[1,]', b'[1] 2'):
+        with pytest.raises(ValueError):
+            list(decoders.iter_json_array([broken[:3], broken[3:]]))
+
+
+def test_iter_operations_stream():
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True, page_size=10)
+    account_id = '58c20343-5d3b-422c-b98b-a5ec037df782'
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/operation-history/{id}".format(id=account_id),
+               [{'json': json_from_file('operations_page0.json')}, {'json': json_from_file('operations_page1.json')}])
+        res = list(client.iter_operations(account_id, stream=True))
+        with pytest.raises(ValueError):
+            client.iter_operations(account_id, prefetch=2, stream=True)
+        m.post("https://api.modulbank.ru/v1/operation-history/{id}".format(id=account_id),
+               text='[' + json.dumps(json_from_file('operations.json')[0]) + ', {')
+        it = client.iter_operations(account_id, stream=True)
+        assert isinstance(next(it), structs.Operation)
+        with pytest.raises(UnexpectedResponseBodyModulbankException):
+            next(it)
+    assert len(res) == 15
+    assert [op.operation_id for op in res] == [x['id'] for x in json_from_file('operations_page0.json') +
+                                               json_from_file('operations_page1.json')]
+    assert isinstance(res[0].amount, Decimal)
+
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True, page_size=0)
+    with requests_mock.Mocker() as m:
+        m.post("https://api.modulbank.ru/v1/operation-history/{id}".format(id=account_id),
+               [{'json': json_from_file('operations_page0.json')}, {'json': []}])
+        assert len(list(client.iter_operations(account_id, stream=True))) == 10
+        assert m.call_count == 2
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+from decimal import Decimal
+
+import modulbank.structs as structs
+from modulbank.columnar import NULL_AMOUNT, NULL_TIMESTAMP, OperationColumns, _kopecks, _timestamp, \
+    decode_operations
+from modulbank.exceptions import UnexpectedValueModulbankException
+
+
+def raw_from_file(filename):
+    with open('tests/data/' + filename, 'rb') as json_file:
+        return json_file.read()
+
+
+def test_decode_operations():
+    raw = raw_from_file('operations.json')
+    columns = decode_operations([raw, raw.decode('utf-8'), json.loads(raw.decode('utf-8'))])
+    ops = [structs.Operation(x) for x in json.loads(raw.decode('utf-8'))] * 3
+    assert len(columns) == len(ops) == 45
+    assert columns.operation_id == [op.operation_id for op in ops]
+    assert list(columns.amount) == [int(op.amount * 100) for op in ops]
+    assert list(columns.executed) == [int(op.executed.timestamp()) * 1000000 for op in ops]
+    assert list(columns.status) == [op.status.value for op in ops]
+    assert list(columns.category) == [op.category.value for op in ops]
+    assert list(columns.currency) == [op.currency.value for op in ops]
+    assert columns.amount.itemsize == 8
+    assert columns.sum_amount() == sum(op.amount for op in ops)
+    assert columns.sum_amount(category=structs.OperationCategory.Credit) == Decimal('0.00')
+    assert columns.sum_amount(status=structs.OperationStatus.Received) == sum(op.amount for op in ops)
+    assert str(columns) == '<OperationColumns rows=45>'
+
+
+def test_decode_operations_single_page():
+    raw = raw_from_file('operations.json')
+    page = json.loads(raw.decode('utf-8'))
+    for single in (raw, raw.decode('utf-8'), page):
+        columns = decode_operations(single)
+        assert columns.operation_id == [x['id'] for x in page]
+    assert len(decode_operations([])) == 0
+
+
+def test_columnar_values():
+    assert _kopecks('100000.0') == 10000000
+    assert _kopecks('-0.5') == -50
+    assert _kopecks('12.345') == 1235
+    assert _kopecks('1e3') == 100000
+    assert _kopecks(7) == 700
+    assert _kopecks(0.1) == 10
+    assert _kopecks(Decimal('0.01')) == 1
+    assert _timestamp(None) == NULL_TIMESTAMP
+    assert _timestamp('1970-01-01T03:00:00.25') == 250000
+    assert _timestamp('2014-10-26T01:30:00') == _timestamp('2014-10-26T01:30:00.000000') == 1414276200000000
+    assert _timestamp('2016-4-1T0:0:0') == _timestamp('2016-04-01T00:00:00')
+
+
+def test_columnar_nulls_and_errors():
+    data = json.loads(raw_from_file('operations.json').decode('utf-8'))[:2]
+    data[0]['amountWithCommission'] = None
+    data[0]['executed'] = None
+    columns = OperationColumns()
+    columns.extend(data)
+    assert columns.amount_with_commission[0] == NULL_AMOUNT
+    assert columns.executed[0] == NULL_TIMESTAMP
+    with pytest.raises(UnexpectedValueModulbankException):
+        columns.extend([dict(data[1], status='Unknown')])
+    with pytest.raises(UnexpectedValueModulbankException):
+        columns.extend([dict(data[1], created='yesterday')])
+    assert len(columns) == 2
@@ -0,0 +1,47 @@
+import pytest
+
+from modulbank.dedup import DedupStore
+from modulbank.structs import OperationStatus
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1500000000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_dedup_memory():
+    clock = FakeClock()
+    store = DedupStore(max_size=2, retention=60, clock=clock)
+    assert store.add('op1', OperationStatus.SendToBank)
+    assert not store.add('op1', 'SendToBank')
+    assert store.add('op1', OperationStatus.Executed)
+    assert store.add('op2', OperationStatus.Executed)
+    assert len(store) == 2
+    assert store.add('op1', OperationStatus.SendToBank)  # вытеснена из LRU
+    clock.now += 61
+    assert store.add('op2', OperationStatus.Executed)  # срок хранения истёк
+    store.discard('op2', OperationStatus.Executed)
+    assert store.add('op2', OperationStatus.Executed)
+    with pytest.raises(ValueError):
+        DedupStore(max_size=0)
+
+
+def test_dedup_sqlite(tmpdir):
+    path = str(tmpdir.join('dedup.sqlite'))
+    clock = FakeClock()
+    store = DedupStore(path, max_size=1, retention=3600, clock=clock)
+    assert store.add('op1', OperationStatus.Executed)
+    assert store.add('op2', OperationStatus.Executed)
+    assert not store.add('op1', OperationStatus.Executed)  # из базы, хотя вытеснена из памяти
+    store.discard('op2', OperationStatus.Executed)
+    store.close()
+
+    restarted = DedupStore(path, retention=3600, clock=clock)
+    assert not restarted.add('op1', OperationStatus.Executed)
+    assert restarted.add('op2', OperationStatus.Executed)
+    assert restarted.add('op1', OperationStatus.Received)
+    clock.now += 3601
+    assert DedupStore(path, retention=3600, clock=clock).add('op1', OperationStatus.Executed)
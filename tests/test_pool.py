@@ -0,0 +1,63 @@
+import datetime
+import json
+import re
+
+import pytest
+import requests_mock
+
+import modulbank.structs as structs
+from modulbank.exceptions import NotAuthorizedModulbankException
+from modulbank.pool import ModulbankClientPool
+
+
+def json_from_file(filename):
+    with open('tests/data/' + filename) as json_file:
+        return json.load(json_file)
+
+
+def token_of(request):
+    return request.headers['Authorization'][len('Bearer '):]
+
+
+def test_pool():
+    accounts = json_from_file('accounts.json')
+    operations = json_from_file('operations_page1.json')
+
+    def account_info(request, context):
+        if token_of(request) == 'revoked':
+            context.status_code = 401
+            return []
+        return accounts
+
+    def history(request, context):
+        if token_of(request) == 'broken' and request.path.endswith('04fb0f74-1ce1-4014-bde4-a5ec0396b592'):
+            context.status_code = 500
+            return []
+        return operations
+
+    with ModulbankClientPool(['good', 'revoked', 'broken', 'good'], sandbox_mode=True, rate_limit=1000,
+                             workers=4) as pool:
+        assert len(pool) == 3
+        assert pool.client('good').session is pool.session
+        with requests_mock.Mocker() as m:
+            m.post("https://api.modulbank.ru/v1/account-info", json=account_info)
+            m.post(re.compile("https://api.modulbank.ru/v1/operation-history/"), json=history)
+            companies = pool.accounts()
+            res = pool.operations(datetime.date(2018, 1, 1))
+        balances = pool.map(lambda client: client.token.upper(), tokens=['good'])
+
+    assert not companies.ok
+    assert set(companies.results) == {'good', 'broken'}
+    assert isinstance(companies.results['good'][0], structs.Company)
+    assert isinstance(companies.errors['revoked'], NotAuthorizedModulbankException)
+    assert list(res.results) == ['good']
+    assert set(res.errors) == {'revoked', 'broken'}
+    assert len(res.results['good']) == 4 * len(operations)
+    executed = [op.executed for op in res.results['good']]
+    assert executed == sorted(executed)
+    history_requests = [r for r in m.request_history if 'operation-history' in r.path]
+    assert all(r.json()['from'] == '2018-01-01' for r in history_requests)
+    assert balances.results == {'good': 'GOOD'}
+    assert str(balances) == '<PoolResult results=1 errors=0>'
+    with pytest.raises(ValueError):
+        ModulbankClientPool(['good'], workers=0)
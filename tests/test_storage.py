@@ -0,0 +1,66 @@
+import copy
+import datetime
+import json
+
+from decimal import Decimal
+
+import modulbank.structs as structs
+from modulbank.storage import OperationStore
+
+
+def json_from_file(filename):
+    with open('tests/data/' + filename) as json_file:
+        return json.load(json_file)
+
+
+def make_operations():
+    data = copy.deepcopy(json_from_file('operations.json'))[:4]
+    data[0].update(executed='2016-03-31T10:00:00', amount=10.5, contragentInn='7700000000')
+    data[1].update(status='Executed', category='Credit', created='2016-04-01T00:00:00.125000',
+                   kbk='18210102010011000110', payerStatus='01')
+    data[2].update(executed='2016-04-03T12:00:00', amount=250000.0)
+    data[3].update(amount='7.005')
+    return [structs.Operation(x) for x in data]
+
+
+def test_operation_store(tmpdir):
+    path = str(tmpdir.join('operations.sqlite'))
+    ops = make_operations()
+    store = OperationStore(path)
+    assert store.save(ops[:3], account_id='acc1') == 3
+    assert store.save(ops, account_id='acc2') == 4
+    store.close()
+
+    store = OperationStore(path)
+    assert len(store) == 4
+    op = store.get(ops[1].operation_id)
+    assert op.status == structs.OperationStatus.Executed
+    assert op.category == structs.OperationCategory.Credit
+    assert op.amount == ops[1].amount
+    assert op.created == ops[1].created
+    assert op.executed == ops[1].executed
+    assert op.contractor.inn == ops[1].contractor.inn
+    assert op.contractor.bank.bic == ops[1].contractor.bank.bic
+    assert op.budgetary_and_tax.kbk == '18210102010011000110'
+    assert op.budgetary_and_tax.payer_status == '01'
+    assert store.get(ops[0].operation_id).budgetary_and_tax is None
+    assert store.get('missing') is None
+
+    assert [x.executed for x in store.query()] == sorted(x.executed for x in ops)
+    assert [x.operation_id for x in store.query(inn='7700000000')] == [ops[0].operation_id]
+    assert len(store.query(date_from=datetime.date(2016, 4, 1), date_till=datetime.date(2016, 4, 1))) == 2
+    assert len(store.query(status=structs.OperationStatus.Received)) == 3
+    assert len(store.query(category=structs.OperationCategory.Credit)) == 1
+    assert [x.amount for x in store.query(amount_min=Decimal('10'), amount_max=Decimal('11'))] == [Decimal('10.5')]
+    assert len(store.query(amount_min=Decimal(200000))) == 1
+    assert len(store.query(amount_min=Decimal('10.5'), amount_max=Decimal('10.5'))) == 1
+    assert store.query(amount_min=Decimal('10.51'), amount_max=Decimal('10.99')) == []
+    plan = ' '.join(str(x) for x in store._OperationStore__conn.execute(
+        'EXPLAIN QUERY PLAN SELECT operation_id FROM operations WHERE amount_kopecks >= 0'))
+    assert 'operations_amount_kopecks' in plan
+    assert [x.amount for x in store.query(amount_min=Decimal('7.005'), amount_max=Decimal('7.01'))] == [
+        Decimal('7.005')]
+    assert store.query(amount_max=Decimal('7.004')) == []
+    assert len(store.query(account_id='acc2', limit=2)) == 2
+    assert str(store).startswith('<OperationStore ')
+    store.close()
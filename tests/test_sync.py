@@ -0,0 +1,78 @@
+import copy
+import datetime
+import json
+import os
+
+import requests_mock
+
+from modulbank.client import ModulbankClient
+from modulbank.structs import OperationStatus
+from modulbank.sync import OperationSync, WatermarkStore
+
+ACCOUNT_ID = '58c20343-5d3b-422c-b98b-a5ec037df782'
+URL = "https://api.modulbank.ru/v1/operation-history/{id}".format(id=ACCOUNT_ID)
+
+
+def json_from_file(filename):
+    with open('tests/data/' + filename) as json_file:
+        return json.load(json_file)
+
+
+def make_operations():
+    ops = copy.deepcopy(json_from_file('operations.json'))[:4]
+    ops[0]['created'] = '2016-03-20T10:00:00'
+    ops[0]['executed'] = None
+    ops[0]['status'] = 'SendToBank'
+    ops[1]['executed'] = ops[1]['created'] = '2016-03-25T12:00:00'
+    ops[2]['executed'] = ops[2]['created'] = '2016-04-01T09:30:00'
+    return ops
+
+
+def test_operation_sync(tmpdir):
+    path = str(tmpdir.join('sync.sqlite'))
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True)
+    ops = make_operations()
+    with requests_mock.Mocker() as m:
+        m.post(URL, json=ops[:3])
+        res = OperationSync(client, WatermarkStore(path)).sync(ACCOUNT_ID, date_from=datetime.date(2016, 1, 1))
+        assert [op.operation_id for op in res] == [x['id'] for x in ops[:3]]
+        assert m.last_request.json()['from'] == '2016-01-01'
+
+        store = WatermarkStore(path)
+        assert store.watermark(ACCOUNT_ID) == datetime.datetime(2016, 4, 1, 9, 30)
+        assert set(store.seen(ACCOUNT_ID)) == {ops[0]['id'], ops[2]['id']}
+
+        ops[0]['status'] = 'Executed'
+        ops[0]['executed'] = '2016-04-02T08:00:00'
+        m.post(URL, json=[ops[0], ops[2], ops[3]])
+        res = OperationSync(client, store).sync(ACCOUNT_ID)
+        assert m.last_request.json()['from'] == '2016-03-20'
+        assert [op.operation_id for op in res] == [ops[0]['id'], ops[3]['id']]
+        assert res[0].status == OperationStatus.Executed
+        assert store.watermark(ACCOUNT_ID) == datetime.datetime(2016, 4, 2, 8, 0)
+
+        m.post(URL, json=[ops[0]])
+        assert OperationSync(client, store).sync(ACCOUNT_ID) == []
+        assert m.last_request.json()['from'] == '2016-04-02'
+        assert set(store.seen(ACCOUNT_ID)) == {ops[0]['id']}
+    store.close()
+
+
+def test_operation_sync_pending_window():
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True)
+    ops = make_operations()
+    store = WatermarkStore()
+    sync = OperationSync(client, store)
+    with requests_mock.Mocker() as m:
+        m.post(URL, json=ops[:3])
+        assert len(sync.sync(ACCOUNT_ID, date_from=datetime.date(2016, 1, 1))) == 3
+        for _ in range(2):
+            m.post(URL, json=ops[:3])
+            assert sync.sync(ACCOUNT_ID) == []
+            assert m.last_request.json()['from'] == '2016-03-20'
+
+        ops[0]['status'] = 'Executed'
+        ops[0]['executed'] = '2016-04-02T08:00:00'
+        m.post(URL, json=ops[:4])
+        assert [op.operation_id for op in sync.sync(ACCOUNT_ID)] == [ops[0]['id'], ops[3]['id']]
+    store.close()
@@ -0,0 +1,87 @@
+import os
+import re
+
+import pytest
+import requests
+import requests_mock
+from decimal import Decimal
+
+from modulbank.client import ModulbankClient
+from modulbank.exceptions import UnexpectedResponseStatusModulbankException
+from modulbank.throttling import RetryPolicy, TokenBucket, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+    clock.now += 1.0
+    assert bucket.reserve() == 0.5
+    clock.now += 10
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.5
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+    assert str(TokenBucket(rate=0.5)) == '<TokenBucket rate=0.5 burst=1.0>'
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert 0 < parse_retry_after('Fri, 31 Dec 9999 23:59:59 GMT')
+
+
+def test_retry_policy():
+    policy = RetryPolicy(max_retries=3, backoff=0.5, max_delay=10, jitter=False)
+    assert [policy.retry_delay(i, 503) for i in range(4)] == [0.5, 1.0, 2.0, None]
+    assert policy.retry_delay(0, 429, retry_after='7') == 7
+    assert policy.retry_delay(0, 429, retry_after='60') is None
+    assert policy.retry_delay(0, 400) is None
+    assert policy.retry_delay(0) == 0.5
+    assert policy.retry_delay(0, 503, idempotent=False) is None
+    assert policy.retry_delay(0, 429, idempotent=False) == 0.5
+    assert policy.retry_delay(0, idempotent=False) is None
+    assert policy.retry_delay(0, sent=False, idempotent=False) == 0.5
+    assert all(0 <= RetryPolicy(backoff=1).backoff(2) <= 4 for _ in range(100))
+    with pytest.raises(ValueError):
+        RetryPolicy(max_retries=-1)
+
+
+def test_client_retry(payment_order):
+    client = ModulbankClient(token=os.environ['MODULBANK_TOKEN'], sandbox_mode=True, rate_limit=1000,
+                             retry=RetryPolicy(max_retries=2, backoff=0.001, jitter=False))
+    with requests_mock.Mocker() as m:
+        m.post(re.compile("https://api.modulbank.ru/v1/account-info/balance/"),
+               [{'status_code': 429, 'headers': {'Retry-After': '0'}}, {'status_code': 502},
+                {'text': '1.5'}])
+        assert client.balance('1') == Decimal('1.5')
+        assert m.call_count == 3
+        m.post(re.compile("https://api.modulbank.ru/v1/account-info/balance/"),
+               [{'exc': requests.exceptions.ConnectTimeout}, {'status_code': 503}, {'status_code': 503}])
+        with pytest.raises(UnexpectedResponseStatusModulbankException):
+            client.balance('1')
+        assert m.call_count == 6
+
+        m.post("https://api.modulbank.ru/v1/operation-upload/1c",
+               [{'status_code': 429}, {'status_code': 500}, {'json': {'totalLoaded': 1}}])
+        with pytest.raises(UnexpectedResponseStatusModulbankException):
+            client.create_payment_draft(payment_order)
+        assert m.call_count == 8
+        m.post("https://api.modulbank.ru/v1/operation-upload/1c",
+               [{'exc': requests.exceptions.ReadTimeout}, {'json': {'totalLoaded': 1}}])
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            client.create_payment_draft(payment_order)
+        m.post("https://api.modulbank.ru/v1/operation-upload/1c",
+               [{'exc': requests.exceptions.ConnectTimeout}, {'json': {'totalLoaded': 1}}])
+        assert client.create_payment_draft(payment_order).total_loaded == 1
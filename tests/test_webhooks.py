@@ -0,0 +1,202 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import pytest
+import requests
+
+from modulbank.dedup import DedupStore
+from modulbank.webhooks import SignatureVerifier, WebhookIngestor
+
+
+def json_from_file(filename):
+    with open('tests/data/' + filename) as json_file:
+        return json.load(json_file)
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def make_notification(token: str, operation_id: str, inn: str = '1111111111') -> bytes:
+    obj = copy.deepcopy(json_from_file('new_operations.json'))
+    obj['companyInn'] = inn
+    obj['operation']['id'] = operation_id
+    obj['SHA1Hash'] = hashlib.sha1('{}&{}'.format(token[:10], operation_id).encode()).hexdigest()
+    return json.dumps(obj).encode('utf-8')
+
+
+def test_webhook_ingestor_submit():
+    token = os.environ['MODULBANK_TOKEN']
+    handled = []
+    busy = threading.Event()
+    release = threading.Event()
+
+    def handler(notify):
+        busy.set()
+        release.wait(5)
+        handled.append(notify.operation.operation_id)
+
+    ingestor = WebhookIngestor(token, handler, workers=1, queue_size=2, inn='1111111111')
+    assert ingestor.submit(make_notification(token, 'early')) == 503
+    with ingestor:
+        assert ingestor.submit(b'not json') == 400
+        assert ingestor.submit(b'[]') == 400
+        assert ingestor.submit(make_notification('forged-token', 'x')) == 403
+        assert ingestor.submit(make_notification(token, 'other', inn='2222222222')) == 200
+        statuses = [ingestor.submit(make_notification(token, 'op0'))]
+        assert busy.wait(5)
+        statuses += [ingestor.submit(make_notification(token, 'op%d' % i)) for i in range(1, 5)]
+        assert statuses == [200, 200, 200, 503, 503]
+        release.set()
+    metrics = ingestor.metrics
+    assert metrics['processed'] == metrics['accepted'] == statuses.count(200)
+    assert handled == ['op%d' % i for i in range(statuses.count(200))]
+    assert metrics['rejected'] == 1 + statuses.count(503)
+    assert (metrics['invalid'], metrics['forged'], metrics['ignored']) == (2, 1, 1)
+    assert metrics['queue_depth'] == 0 and metrics['max_queue_depth'] == 2
+    assert ingestor.submit(make_notification(token, 'late')) == 503
+
+
+def test_webhook_ingestor_http():
+    token = os.environ['MODULBANK_TOKEN']
+    handled = []
+    lock = threading.Lock()
+
+    def handler(notify):
+        with lock:
+            handled.append(notify.operation.operation_id)
+
+    ingestor = WebhookIngestor(token, handler, workers=4, queue_size=10000)
+    server = make_server('127.0.0.1', 0, ingestor.wsgi_app, server_class=ThreadingWSGIServer,
+                         handler_class=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = 'http://127.0.0.1:%d/modulbank' % server.server_port
+    bodies = [make_notification(token, 'op%d' % i) for i in range(500)]
+    try:
+        ingestor.start()
+        with requests.Session() as session, ThreadPoolExecutor(max_workers=16) as executor:
+            session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=16))
+            statuses = list(executor.map(lambda body: session.post(url, data=body).status_code, bodies))
+            assert session.get(url).status_code == 405
+        assert ingestor.stop(timeout=10)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert statuses == [200] * len(bodies)
+    assert sorted(handled) == sorted('op%d' % i for i in range(len(bodies)))
+    assert ingestor.metrics['processed'] == len(bodies)
+
+
+def test_webhook_ingestor_asgi():
+    token = os.environ['MODULBANK_TOKEN']
+    handled = []
+    body = make_notification(token, 'asgi')
+    messages = [{'type': 'http.request', 'body': body[:10], 'more_body': True},
+                {'type': 'http.request', 'body': body[10:]}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        with WebhookIngestor(token, lambda notify: handled.append(notify.operation.operation_id)) as ingestor:
+            loop.run_until_complete(ingestor.asgi_app({'type': 'http', 'method': 'POST'}, receive, send))
+    finally:
+        loop.close()
+    assert sent[0]['status'] == 200
+    assert handled == ['asgi']
+
+
+def test_webhook_ingestor_dedup():
+    token = os.environ['MODULBANK_TOKEN']
+    handled = []
+    attempts = []
+
+    def handler(notify):
+        attempts.append(notify.operation.operation_id)
+        if notify.operation.operation_id == 'flaky' and attempts.count('flaky') == 1:
+            raise RuntimeError('ledger is unavailable')
+        handled.append(notify.operation.operation_id)
+
+    dedup = DedupStore()
+    with WebhookIngestor(token, handler, workers=1, dedup=dedup) as ingestor:
+        for operation_id in ('op1', 'op1', 'op2', 'op1', 'flaky'):
+            assert ingestor.submit(make_notification(token, operation_id)) == 200
+    with WebhookIngestor(token, handler, workers=1, dedup=dedup) as again:
+        for operation_id in ('op2', 'flaky', 'flaky'):
+            assert again.submit(make_notification(token, operation_id)) == 200
+    assert again.metrics['duplicate'] == 2
+    assert ingestor.metrics['duplicate'] == 2
+    assert ingestor.metrics['failed'] == 1
+    assert handled == ['op1', 'op2', 'flaky']
+
+    rejected = WebhookIngestor(token, handler, workers=1, dedup=dedup)
+    assert rejected.submit(make_notification(token, 'late')) == 503
+    with rejected:
+        assert rejected.submit(make_notification(token, 'late')) == 200
+    assert handled[-1] == 'late'
+    assert rejected.metrics['duplicate'] == 0
+
+
+def test_signature_verifier():
+    token = os.environ['MODULBANK_TOKEN']
+    other = 'other-company-token'
+    verifier = SignatureVerifier(token, routes={'2222222222': other, ('3333333333', '770101001'): other})
+    assert str(verifier) == '<SignatureVerifier routes=2 default=True>'
+    junk = json.loads(make_notification('forged-token', 'junk'))
+    junk['operation']['status'] = 'Bogus'
+    kpp_routed = json.loads(make_notification(other, 'kpp', inn='3333333333'))
+    kpp_routed['companyKpp'] = '770101001'
+    bodies = [make_notification(token, 'op1'), make_notification(other, 'op2', inn='2222222222'),
+              make_notification(token, 'op3', inn='2222222222'), json.dumps(junk).encode(), b'{', b'[]',
+              json.dumps(kpp_routed).encode()]
+    res = verifier.verify_batch(bodies)
+    assert [x and x.operation.operation_id for x in res] == ['op1', 'op2', None, None, None, None, 'kpp']
+    assert res[6].kpp == '770101001'
+    assert verifier.knows('2222222222') and not SignatureVerifier(routes={'1': token}).knows('2')
+    upper = json.loads(bodies[0])
+    upper['SHA1Hash'] = upper['SHA1Hash'].upper()
+    assert verifier.verify(upper)
+    upper['SHA1Hash'] = 'Ж' + upper['SHA1Hash'][1:]
+    assert not verifier.verify(upper)
+    assert not SignatureVerifier(routes={'2222222222': other}).verify(json.loads(bodies[0]))
+    with pytest.raises(ValueError):
+        SignatureVerifier()
+
+    with WebhookIngestor(verifier, lambda notify: None) as ingestor:
+        assert [ingestor.submit(body) for body in bodies] == [200, 200, 403, 403, 400, 400, 200]
+
+
+def test_webhook_ingestor_lifecycle():
+    token = os.environ['MODULBANK_TOKEN']
+    handled = []
+    ingestor = WebhookIngestor(token, lambda notify: handled.append(notify.operation_id), workers=2, queue_size=1)
+    assert ingestor.stop(timeout=1)
+    assert ingestor.stop(timeout=1)
+    ingestor.start()
+    ingestor.start()
+    assert ingestor.submit(make_notification(token, 'op1')) == 200
+    assert ingestor.stop(timeout=5)
+    assert ingestor.stop(timeout=5)
+    assert handled == ['op1']
+    assert ingestor.submit(make_notification(token, 'op2')) == 503
+    with pytest.raises(RuntimeError):
+        ingestor.start()